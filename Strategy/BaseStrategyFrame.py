@@ -1,4 +1,8 @@
 import backtrader as bt
+from Strategy import indcache
+from Strategy.ledger import TradeLedger
+from Strategy.logsink import PrintSink
+from Strategy.profiler import Profile
 
 
 class BaseStrategyFrame(bt.Strategy):
@@ -9,16 +13,59 @@ class BaseStrategyFrame(bt.Strategy):
     All Strategy inherit this class.
 
     Args:
-        doprint (int): Whather to print message.
+        printlog (bool): Whather to log message.
+        logsink (object): Where log records go (see logsink.py),
+            print to stdout if None.
+        sharedind (bool): Whether to read indicators from the shared
+            indicator cache (see indcache.py).
+        profile (bool): Whether to time the indicators, next, notify and
+            log phases (see profiler.py), reported at stop.
     """
 
-    params = (("printlog", False),)
+    # How many bars before the current one next() reads (`x[-2]` -> 2).
+    # With cerebro's exactbars=1 every line only keeps the bars its
+    # consumers' minimum periods need; this keeps enough for next() too.
+    lookback = 0
 
-    def log(self, txt, dt=None, doprint=False):
-        """Logging function fot this strategy"""
+    params = (
+        ("printlog", False),
+        ("logsink", None),
+        ("sharedind", False),
+        ("profile", False),
+    )
+
+    def log(self, txt, dt=None, doprint=False, args=()):
+        """
+        Logging function fot this strategy.
+
+        `txt % args` is only formatted by the sink, when logging is enabled.
+        """
         if self.params.printlog or doprint:
             dt = dt or self.datas[0].datetime.date(0)
-            print("%s, %s" % (dt.isoformat(), txt))
+            self._logsink.write(dt, txt, args)
+
+    def log_bar(self):
+        """Log the OHLC snapshot of the current bar, read only when enabled"""
+        if self.params.printlog:
+            self.log(
+                "O:%.2f, H:%.2f, L:%.2f, C:%.2f",
+                args=(
+                    self.dataopen[0],
+                    self.datahigh[0],
+                    self.datalow[0],
+                    self.dataclose[0],
+                ),
+            )
+
+    def indicator(self, cls, *args, **kwargs):
+        """
+        Create a backtrader indicator, shared through the indicator cache
+        when `sharedind` is on and cerebro preloads the data.
+        """
+        # cerebro turns preload off by itself, e.g. with exactbars >= 1
+        if self.params.sharedind and self.env._dopreload:
+            cls = indcache.shared(cls, kwargs)
+        return cls(*args, **kwargs)
 
     def __init__(self):
         # Keep a reference to the "close" line in the data[0] dataseries
@@ -32,6 +79,48 @@ class BaseStrategyFrame(bt.Strategy):
         self.buyprice = None
         self.buycomm = None
 
+        # closed trades, filled by notify_order / notify_trade (see ledger.py)
+        self.ledger = TradeLedger()
+
+        self._logsink = self.params.logsink or PrintSink()
+
+        self.profile = None
+        if self.params.profile:
+            self.profile = Profile()
+            self.next = self.profile.timed("next", self.next, samples=True)
+            self._notify = self.profile.timed("notify", self._notify)
+            self.log = self.profile.timed("log", self.log)
+            self.log_bar = self.profile.timed("log", self.log_bar)
+
+    def qbuffer(self, savemem=0, replaying=False):
+        if savemem > 0 and self._minperiod <= self.lookback:
+            # the first next() calls would look back past the first bar,
+            # which only the unbounded lines tolerate (reading garbage)
+            raise ValueError(
+                "%s looks back %d bars, more than its minimum period %d allows "
+                "with exactbars=1"
+                % (type(self).__name__, self.lookback, self._minperiod)
+            )
+        super(BaseStrategyFrame, self).qbuffer(savemem, replaying)
+        if self.lookback:
+            for obj in self.datas + self.getindicators():
+                for line in obj.lines:
+                    line.minbuffer(self.lookback + 1)
+        # recursive indicators (EMA, ...) read their own previous bar: with
+        # period 1 their minimum period alone would keep just the current one
+        pending = list(self.getindicators())
+        while pending:
+            ind = pending.pop()
+            for line in ind.lines:
+                line.minbuffer(2)
+            pending.extend(ind.getindicators())
+
+    def _profile_indicators(self):
+        # indicators are created by the subclass __init__, after ours
+        for ind in self.getindicators():
+            ind._next = self.profile.timed("indicators", ind._next)
+            ind._once = self.profile.timed("indicators", ind._once)
+
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
             # Buy/Sell order submitted/accepted to/by broker - Nothing to do
@@ -42,31 +131,32 @@ class BaseStrategyFrame(bt.Strategy):
         if order.status in [order.Completed]:
             if order.isbuy():
                 self.log(
-                    "BUY EXECUTED, Price: %.2f, Size: %.2f, Cost: %.2f, Comm %.2f, Cash %.2f"
-                    % (
+                    "BUY EXECUTED, Price: %.2f, Size: %.2f, Cost: %.2f, Comm %.2f, Cash %.2f",
+                    args=(
                         order.executed.price,
                         order.executed.size,
                         order.executed.value,
                         order.executed.comm,
                         self.broker.getcash(),
-                    )
+                    ),
                 )
 
                 self.buyprice = order.executed.price
                 self.buycomm = order.executed.comm
             else:  # Sell
                 self.log(
-                    "SELL EXECUTED, Price: %.2f, Size: %.2f, Cost: %.2f, Comm %.2f, Cash %.2f"
-                    % (
+                    "SELL EXECUTED, Price: %.2f, Size: %.2f, Cost: %.2f, Comm %.2f, Cash %.2f",
+                    args=(
                         order.executed.price,
                         order.executed.size,
                         order.executed.value,
                         order.executed.comm,
                         self.broker.getcash(),
-                    )
+                    ),
                 )
 
             self.bar_executed = len(self)
+            self.ledger.order_completed(len(self) - 1, order)
 
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
             self.log("Order Canceled/Margin/Rejected")
@@ -78,12 +168,20 @@ class BaseStrategyFrame(bt.Strategy):
         if not trade.isclosed:
             return
 
-        self.log("OPERATION PROFIT, GROSS %.2f, NET %.2f" % (trade.pnl, trade.pnlcomm))
+        self.ledger.trade_closed(trade)
+        self.log(
+            "OPERATION PROFIT, GROSS %.2f, NET %.2f", args=(trade.pnl, trade.pnlcomm)
+        )
 
     def start(self):
         # self.log('Ending Value %.2f' % self.broker.getvalue(), doprint=True)
+        if self.profile is not None:
+            self._profile_indicators()
         print("=== Backtesting Start! ===")
 
     def stop(self):
         # self.log('Ending Value %.2f' % self.broker.getvalue(), doprint=True)
+        self._logsink.flush()
+        if self.profile is not None:
+            print(self.profile.report())
         print("=== Backtesting Finished! ===")
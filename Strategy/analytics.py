@@ -0,0 +1,219 @@
+"""
+Vectorized performance statistics of equity curves.
+
+Every function takes one curve of shape (bars,) or a batch of curves of
+shape (runs, bars) (e.g. the equity of every combination of a sweep,
+stacked) and works along the last axis: it returns a float for one
+curve and an array of one value per run for a batch.
+
+`EquityCurve` records a cerebro run's portfolio value and position into
+preallocated arrays, so no backtrader analyzer runs per bar for these
+statistics.
+"""
+import collections
+import math
+
+import backtrader as bt
+import numpy as np
+
+Curve = collections.namedtuple("Curve", ["equity", "position", "close"])
+Curve.__doc__ = """
+    Per bar series of a run, recorded at each bar close.
+
+    Args:
+        equity (np.ndarray): portfolio value.
+        position (np.ndarray): position size.
+        close (np.ndarray): close price of the data.
+    """
+
+
+def _scalar(x):
+    return float(x) if np.ndim(x) == 0 else x
+
+
+def returns(equity):
+    """Bar to bar simple returns, one fewer than bars."""
+    equity = np.asarray(equity, dtype=np.float64)
+    return equity[..., 1:] / equity[..., :-1] - 1.0
+
+
+def sharpe(equity, periods=252, riskfree=0.0):
+    """
+    Annualized Sharpe ratio of the bar returns.
+
+    Args:
+        equity (np.ndarray): equity curve(s).
+        periods (int): bars per year.
+        riskfree (float): yearly risk free rate.
+
+    Returns:
+        float or np.ndarray: nan when the returns do not vary.
+    """
+    excess = returns(equity) - riskfree / periods
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = excess.std(axis=-1, ddof=1)
+        ratio = excess.mean(axis=-1) / np.where(std > 0, std, np.nan)
+    return _scalar(ratio * math.sqrt(periods))
+
+
+def sortino(equity, periods=252, riskfree=0.0):
+    """
+    Annualized Sortino ratio: mean excess return over downside deviation.
+
+    Returns:
+        float or np.ndarray: nan when no bar return is below the risk free one.
+    """
+    excess = returns(equity) - riskfree / periods
+    downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2, axis=-1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = excess.mean(axis=-1) / np.where(downside > 0, downside, np.nan)
+    return _scalar(ratio * math.sqrt(periods))
+
+
+def max_drawdown(equity):
+    """
+    Largest drop from a running peak, and the longest time under a peak.
+
+    Returns:
+        (float, int) or (np.ndarray, np.ndarray): drawdown in percent
+            (same as `sweep.max_drawdown`) and duration in bars, from a
+            peak to the bar that makes a new one (or the last bar).
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if not equity.shape[-1]:
+        return _scalar(np.zeros(equity.shape[:-1])), _scalar(
+            np.zeros(equity.shape[:-1], dtype=np.int64)
+        )
+    peak = np.maximum.accumulate(equity, axis=-1)
+    drawdown = np.max((peak - equity) / peak, axis=-1) * 100.0
+
+    index = np.arange(equity.shape[-1])
+    atpeak = np.where(equity >= peak, index, 0)
+    since = index - np.maximum.accumulate(atpeak, axis=-1)
+    duration = since.max(axis=-1)
+    return _scalar(drawdown), (int(duration) if np.ndim(duration) == 0 else duration)
+
+
+def cagr(equity, periods=252, dates=None):
+    """
+    Compound annual growth rate, in percent.
+
+    Args:
+        equity (np.ndarray): equity curve(s).
+        periods (int): bars per year, to count years when `dates` is None.
+        dates (np.ndarray): date ordinals of the bars (e.g. `OHLCV.date`),
+            to count calendar years instead.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if dates is not None:
+        years = (dates[-1] - dates[0]) / 365.25
+    else:
+        years = (equity.shape[-1] - 1) / periods
+    if years <= 0:
+        return _scalar(np.zeros(equity.shape[:-1]))
+    growth = equity[..., -1] / equity[..., 0]
+    return _scalar((growth ** (1.0 / years) - 1.0) * 100.0)
+
+
+def exposure(position):
+    """Fraction of bars with a position open, in percent."""
+    position = np.asarray(position)
+    return _scalar(np.mean(position != 0, axis=-1) * 100.0)
+
+
+def turnover(position, price, equity, periods=252):
+    """
+    Yearly traded value over the mean portfolio value.
+
+    Args:
+        position (np.ndarray): position size at each bar.
+        price (np.ndarray): price the position changes are valued at,
+            the data's close (shape (bars,) or one row per run).
+        equity (np.ndarray): portfolio value at each bar.
+        periods (int): bars per year.
+    """
+    position = np.asarray(position, dtype=np.float64)
+    traded = np.abs(np.diff(position, axis=-1, prepend=0.0)) * price
+    years = max(position.shape[-1] - 1, 1) / periods
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = traded.sum(axis=-1) / np.mean(equity, axis=-1) / years
+    return _scalar(ratio)
+
+
+def win_rate(pnl):
+    """
+    Percent of closed trades with a positive pnl.
+
+    Args:
+        pnl (np.ndarray): pnl of each trade (e.g. `TradeLedger.pnlcomm`);
+            for a batch, rows padded with nan (nan trades are skipped).
+
+    Returns:
+        float or np.ndarray: nan with no trades.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    closed = np.sum(~np.isnan(pnl), axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.sum(pnl > 0, axis=-1) / np.where(closed > 0, closed, np.nan)
+    return _scalar(rate * 100.0)
+
+
+def summary(equity, position=None, price=None, pnl=None, periods=252, riskfree=0.0):
+    """
+    All statistics of equity curve(s), those that need `position`,
+    `price` or `pnl` only when given.
+
+    Returns:
+        dict: name -> float (one curve) or np.ndarray (a batch).
+    """
+    drawdown, duration = max_drawdown(equity)
+    stats = dict(
+        sharpe=sharpe(equity, periods, riskfree),
+        sortino=sortino(equity, periods, riskfree),
+        drawdown=drawdown,
+        drawdown_bars=duration,
+        cagr=cagr(equity, periods),
+    )
+    if position is not None:
+        stats["exposure"] = exposure(position)
+        if price is not None:
+            stats["turnover"] = turnover(position, price, equity, periods)
+    if pnl is not None:
+        stats["win_rate"] = win_rate(pnl)
+    return stats
+
+
+class EquityCurve(bt.Analyzer):
+    """
+    Record the portfolio value, position and close of every bar into
+    arrays sized to the data up front (grown by doubling when the data
+    is not preloaded).
+
+    `get_analysis()` returns a `Curve`.
+    """
+
+    def start(self):
+        size = max(self.data.buflen(), 256)
+        self._equity = np.empty(size)
+        self._position = np.empty(size)
+        self._close = np.empty(size)
+        self._n = 0
+
+    def _grow(self):
+        size = 2 * len(self._equity)
+        self._equity = np.resize(self._equity, size)
+        self._position = np.resize(self._position, size)
+        self._close = np.resize(self._close, size)
+
+    def next(self):
+        i = self._n
+        if i == len(self._equity):
+            self._grow()
+        self._equity[i] = self.strategy.broker.getvalue()
+        self._position[i] = self.strategy.position.size
+        self._close[i] = self.data.close[0]
+        self._n = i + 1
+
+    def get_analysis(self):
+        n = self._n
+        return Curve(self._equity[:n], self._position[:n], self._close[:n])
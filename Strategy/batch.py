@@ -0,0 +1,343 @@
+"""
+Batch backtest of one strategy over a directory of symbol csv files.
+
+Symbols are streamed through a process pool with a bounded number of
+jobs in flight, so only a few feeds are in memory at any time. Each
+finished symbol is appended to a csv results file right away; running
+the same batch again skips the symbols already in it, so a crashed or
+interrupted batch picks up where it stopped. The run settings are kept
+next to it (`<output>.json`); resuming with other ones raises ValueError.
+
+Example:
+    python -m Strategy.batch RsiStrategy ./sample_data -o results.csv \\
+        --param period=14 kbuy=70 ksell=30
+"""
+import argparse
+import ast
+import concurrent.futures
+import contextlib
+import csv
+import datetime
+import fnmatch
+import json
+import os
+
+import backtrader as bt
+
+from Strategy import zwpy_sta
+from Strategy.bounded import run_bounded
+from Strategy.broker import SlimBroker
+from Strategy.data import ArrayData
+from Strategy.feedcache import load_cached
+from Strategy.sweep import max_drawdown
+from Strategy.vectorized import closed_trades, run_vectorized, strategy_params
+
+COLUMNS = ["symbol", "status", "bars", "value", "trades", "drawdown", "error"]
+
+
+def symbols(directory, patterns=("*.csv", "*.txt")):
+    """
+    Symbol csv files of a directory.
+
+    Args:
+        directory (str): directory of Yahoo format csv files.
+        patterns (tuple): file name patterns to include.
+
+    Returns:
+        list of (str, str): (symbol, path) sorted by symbol; the symbol
+            is the file name without extension.
+    """
+    found = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and any(fnmatch.fnmatch(name, p) for p in patterns):
+            found.append((os.path.splitext(name)[0], path))
+    return found
+
+
+def read_results(path):
+    """
+    Rows of a results file, the last one of each symbol.
+
+    Returns:
+        dict: symbol -> row dict (values as strings).
+    """
+    rows = {}
+    if os.path.exists(path):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                rows[row["symbol"]] = row
+    return rows
+
+
+def settings_path(output):
+    """Sidecar file of a results file, holding its run settings."""
+    return output + ".json"
+
+
+def check_settings(output, settings):
+    """
+    Check that a results file was made with `settings`, or record them.
+
+    A results file without a sidecar (new, or from an older version) gets
+    one with `settings`.
+
+    Args:
+        output (str): csv results file.
+        settings (dict): json-able run settings.
+
+    Raises:
+        ValueError: listing the settings that differ from the recorded ones.
+    """
+    path = settings_path(output)
+    # through json, as they are read back: tuples become lists, ...
+    settings = json.loads(json.dumps(settings))
+    if os.path.exists(path):
+        with open(path) as f:
+            stored = json.load(f)
+        diffs = [
+            "%s=%r (asked %r)" % (name, stored.get(name), settings[name])
+            for name in settings
+            if stored.get(name) != settings[name]
+        ]
+        if diffs:
+            raise ValueError("%s was made with %s" % (output, ", ".join(diffs)))
+        return
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(settings, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _repair(path):
+    """Drop a partly written last line, left by a crash during a write."""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def _run_vectorized(strategy, data, params, broker):
+    result = run_vectorized(strategy, data, **broker, **params)
+    return result.value, closed_trades(result.trades), max_drawdown(result.equity)
+
+
+def _run_cerebro(strategy, data, params, broker, slim=False):
+    cerebro = bt.Cerebro(stdstats=False)
+    if slim:
+        cerebro.broker = SlimBroker()
+    cerebro.addstrategy(strategy, **params)
+    cerebro.adddata(ArrayData(ohlcv=data))
+    cerebro.broker.setcash(broker["cash"])
+    cerebro.addsizer(bt.sizers.PercentSizerInt, percents=broker["percents"])
+    cerebro.broker.setcommission(commission=broker["commission"])
+    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name="trades")
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name="drawdown")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        strat = cerebro.run()[0]
+    trades = strat.analyzers.trades.get_analysis()
+    drawdown = strat.analyzers.drawdown.get_analysis()
+    return (
+        cerebro.broker.getvalue(),
+        trades.get("total", {}).get("closed", 0),
+        drawdown["max"]["drawdown"],
+    )
+
+
+def _run_slim(strategy, data, params, broker):
+    return _run_cerebro(strategy, data, params, broker, slim=True)
+
+
+def _run_bounded(strategy, data, params, broker):
+    result = run_bounded(strategy, data, **broker, **params)
+    return result.value, len(result.ledger), max_drawdown(result.curve.equity)
+
+
+ENGINES = dict(
+    vectorized=_run_vectorized,
+    cerebro=_run_cerebro,
+    slim=_run_slim,
+    bounded=_run_bounded,
+)
+
+
+def _run_symbol(job):
+    symbol, path, strategy, params, broker, engine, dates, cachedir, adjclose = job
+    row = dict(symbol=symbol, status="ok", bars=0, error="")
+    try:
+        data = load_cached(path, cachedir, *dates, adjclose=adjclose)
+        row["bars"] = len(data.date)
+        if row["bars"]:
+            value, trades, drawdown = ENGINES[engine](strategy, data, params, broker)
+        else:
+            value, trades, drawdown = broker["cash"], 0, 0.0
+        row.update(value=value, trades=trades, drawdown=drawdown)
+    except Exception as e:
+        row.update(status="error", error="%s: %s" % (type(e).__name__, e))
+    return row
+
+
+def batch(
+    strategy,
+    directory,
+    output,
+    params=None,
+    processes=None,
+    queue_size=None,
+    engine="vectorized",
+    fromdate=None,
+    todate=None,
+    cachedir=None,
+    cash=10000.0,
+    percents=90,
+    commission=0.0,
+    retry_errors=True,
+    adjclose=True,
+):
+    """
+    Backtest a strategy on every symbol of a directory.
+
+    Feeds are read through the feed cache (see feedcache.py), so files
+    stored newest first need no `reverse`.
+
+    Args:
+        strategy (type): a strategy class (any bt.Strategy for the
+            cerebro engine, a zwpy_sta strategy for the vectorized one).
+        directory (str): directory of Yahoo format csv files.
+        output (str): csv results file, appended to and resumed from.
+        params (dict): strategy parameters.
+        processes (int): worker processes (default: cpu count).
+        queue_size (int): max symbols in flight (default: 2 per process).
+        engine (str): "vectorized" (`run_vectorized`), "cerebro", "slim"
+            (cerebro with `SlimBroker`, see broker.py) or "bounded"
+            (cerebro in bounded memory, see bounded.py).
+        fromdate, todate (datetime.date): date range of every feed.
+        cachedir (str): feed cache directory (default: next to the csv).
+        cash (float): starting cash.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio.
+        retry_errors (bool): run again symbols that failed last time.
+        adjclose (bool): trade back-adjusted (default) or raw prices.
+
+    Returns:
+        dict: counts of symbols "done" now, "skipped" (already in output)
+            and "errors" now.
+
+    Raises:
+        ValueError: if `output` was made with other settings (strategy,
+            params, engine, dates, broker or `adjclose`).
+    """
+    params = params or {}
+    broker = dict(cash=cash, percents=percents, commission=commission)
+    dates = (fromdate, todate)
+    check_settings(
+        output,
+        dict(
+            strategy=strategy.__name__,
+            params=strategy_params(strategy, **params),  # fails on a bad name
+            engine=engine,
+            dates=[d and d.isoformat() for d in dates],
+            broker=broker,
+            adjclose=adjclose,
+        ),
+    )
+
+    if os.path.exists(output):
+        _repair(output)
+    done = read_results(output)
+    finished = {
+        s for s, row in done.items() if row["status"] == "ok" or not retry_errors
+    }
+    todo = [(s, p) for s, p in symbols(directory) if s not in finished]
+    counts = dict(done=0, skipped=len(finished), errors=0)
+
+    processes = processes or os.cpu_count() or 1
+    queue_size = queue_size or 2 * processes
+
+    new = not os.path.exists(output) or os.path.getsize(output) == 0
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+    with open(output, "a", newline="") as f, executor:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        if new:
+            writer.writeheader()
+
+        jobs = iter(
+            (s, p, strategy, params, broker, engine, dates, cachedir, adjclose)
+            for s, p in todo
+        )
+        pending = set()
+        while True:
+            for job in jobs:
+                pending.add(executor.submit(_run_symbol, job))
+                if len(pending) >= queue_size:
+                    break
+            if not pending:
+                break
+            ready, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in ready:
+                row = future.result()
+                writer.writerow(row)
+                counts["done"] += 1
+                counts["errors"] += row["status"] == "error"
+            f.flush()
+
+    return counts
+
+
+def _parse_params(items):
+    """Parse `name=value` command line items."""
+    params = {}
+    for item in items or []:
+        name, _, text = item.partition("=")
+        params[name] = ast.literal_eval(text)
+    return params
+
+
+def _parse_date(text):
+    return datetime.datetime.strptime(text, "%Y-%m-%d")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("strategy", help="strategy class name in zwpy_sta")
+    parser.add_argument("directory", help="directory of Yahoo format csv files")
+    parser.add_argument("-o", "--output", default="results.csv")
+    parser.add_argument("--param", nargs="+", metavar="NAME=VALUE")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="vectorized")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=None)
+    parser.add_argument("--fromdate", type=_parse_date)
+    parser.add_argument("--todate", type=_parse_date)
+    parser.add_argument("--cachedir", default=None)
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--percents", type=int, default=90)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument("--raw", action="store_true", help="unadjusted prices")
+    args = parser.parse_args(argv)
+
+    try:
+        counts = batch(
+            getattr(zwpy_sta, args.strategy),
+            args.directory,
+            args.output,
+            params=_parse_params(args.param),
+            processes=args.processes,
+            queue_size=args.queue_size,
+            engine=args.engine,
+            fromdate=args.fromdate,
+            todate=args.todate,
+            cachedir=args.cachedir,
+            cash=args.cash,
+            percents=args.percents,
+            commission=args.commission,
+            adjclose=not args.raw,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print("done %(done)d, skipped %(skipped)d, errors %(errors)d" % counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+Benchmark suite for data feeds, indicators and strategies.
+
+Cases run on synthetic OHLCV with the return, range and volume
+statistics of the sample files, at several multiples of their length:
+
+- feed/<file>/<loader>: load a csv file (backtrader, data.py row by row or
+  bulk, feedcache).
+- indicator/<name>: `cerebro.run()` of a strategy only building the
+  indicator, on a preloaded `ArrayData` feed (indicator/none: no indicator).
+- kernel/<name>: the NumPy version of the indicator (indicators.py).
+- strategy/<name>: full `cerebro.run()` of a zwpy_sta strategy.
+
+Each case runs in a fresh process, so its peak RSS is its own.
+Results print as a table and can be saved as a json baseline
+and compared against one later.
+
+Example:
+    python -m Strategy.bench --scales 1 10 --save baseline.json
+    python -m Strategy.bench --scales 1 10 --compare baseline.json
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import backtrader as bt
+import numpy as np
+
+from Strategy import indicators, zwpy_sta
+from Strategy.data import OHLCV, ArrayData, load_yahoo_csv, read_yahoo_csv
+from Strategy.feedcache import build_cache, load_cached
+from Strategy.utils import VolumeWeightedAveragePrice
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+_SAMPLEDIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_data")
+
+# name -> (csv file, stored newest first)
+SAMPLES = {
+    "orcl": (os.path.join(_SAMPLEDIR, "orcl-1995-2014.txt"), False),
+    "600401": (os.path.join(_SAMPLEDIR, "600401_yahoo.csv"), True),
+}
+
+# the base sample of the indicator, kernel and strategy cases
+BASE = "orcl"
+
+STRATEGIES = [
+    "Tim0Strategy",
+    "SmaStrategy",
+    "CmaStrategy",
+    "VwapStrategy",
+    "BBandsStrategy",
+    "TurStrategy",
+    "MacdV1Strategy",
+    "MacdV2Strategy",
+    "KdjV1Strategy",
+    "KdjV2Strategy",
+    "RsiStrategy",
+]
+
+
+# ===== synthetic data =====
+
+
+def synthetic(data, scale, seed=0):
+    """
+    Synthetic OHLCV with the statistics of `data`, `scale` times as long.
+
+    Close follows a random walk with the mean and deviation of the log
+    returns of `data`; open gaps, high/low ranges and volumes are drawn
+    from its distributions too. Bars fall on consecutive weekdays.
+
+    Args:
+        data (OHLCV): sample data.
+        scale (int): length multiple.
+        seed (int): random seed.
+
+    Returns:
+        OHLCV: prices rounded to cents, adjclose equal to close.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(data.close) * scale
+    ok = (data.close > 0) & (data.open > 0) & (data.low > 0)
+    close, opn = data.close[ok], data.open[ok]
+    high, low, volume = data.high[ok], data.low[ok], data.volume[ok]
+
+    logret = np.diff(np.log(close))
+    gap = np.log(opn[1:] / close[:-1])
+    up = np.log(high / np.maximum(opn, close))
+    down = np.log(np.minimum(opn, close) / low)
+    logvol = np.log(volume[volume > 0])
+
+    c = close[0] * np.exp(np.cumsum(rng.normal(logret.mean(), logret.std(), n)))
+    prev = np.concatenate([[close[0]], c[:-1]])
+    o = prev * np.exp(rng.normal(gap.mean(), gap.std(), n))
+    h = np.maximum(o, c) * np.exp(rng.choice(up, n))
+    l = np.minimum(o, c) * np.exp(-rng.choice(down, n))
+    v = np.round(np.exp(rng.normal(logvol.mean(), logvol.std(), n)))
+
+    start = np.datetime64("1990-01-01")
+    days = np.busday_offset(start, np.arange(n), roll="forward")
+    date = days.astype(np.int64) + datetime.date(1970, 1, 1).toordinal()
+
+    o, h, l, c = (np.maximum(np.round(x, 2), 0.01) for x in (o, h, l, c))
+    h = np.maximum(h, np.maximum(o, c))
+    l = np.minimum(l, np.minimum(o, c))
+    return OHLCV(date, o, h, l, c, c, v)
+
+
+def write_yahoo_csv(path, data, reverse=False):
+    """
+    Write an `OHLCV` as a Yahoo format csv file, oldest first (newest
+    first if `reverse`, like 600401_yahoo.csv).
+    """
+    dates = (data.date - datetime.date(1970, 1, 1).toordinal()).astype("datetime64[D]")
+    rows = list(
+        zip(
+            dates.astype(str).tolist(),
+            data.open.tolist(),
+            data.high.tolist(),
+            data.low.tolist(),
+            data.close.tolist(),
+            data.adjclose.tolist(),
+            data.volume.tolist(),
+        )
+    )
+    if reverse:
+        rows.reverse()
+    with open(path, "w") as f:
+        f.write("Date,Open,High,Low,Close,Adj Close,Volume\n")
+        for row in rows:
+            f.write("%s,%.2f,%.2f,%.2f,%.2f,%.2f,%d\n" % row)
+
+
+# ===== cases =====
+
+
+# feeds take the csv path and whether it is stored newest first
+def _feed_backtrader(path, reverse):
+    data = bt.feeds.YahooFinanceCSVData(dataname=path, reverse=reverse)
+    bt.Cerebro().adddata(data)  # the feed needs an environment to start
+    data._start()
+    data.preload()
+    return data.buflen()  # preload rewinds the feed: len() is 0
+
+
+def _feed_numpy(path, reverse):
+    return len(read_yahoo_csv(path, reverse=reverse).date)
+
+
+def _feed_bulk(path, reverse):
+    return len(load_yahoo_csv(path).date)  # detects the order
+
+
+def _feed_cached(path, reverse):
+    data = load_cached(path)  # sorted when the cache is built
+    # the columns are memmapped: read every page, as the other feeds do
+    for column in data:
+        column.sum()
+    return len(data.date)
+
+
+FEEDS = dict(
+    backtrader=_feed_backtrader,
+    numpy=_feed_numpy,
+    bulk=_feed_bulk,
+    feedcache=_feed_cached,
+)
+
+# name -> (indicator class, kwargs, data line names)
+INDICATORS = dict(
+    none=None,
+    sma=(bt.indicators.SimpleMovingAverage, dict(period=15), ["close"]),
+    vwap=(VolumeWeightedAveragePrice, dict(period=15), None),
+    bbands=(bt.indicators.BBands, dict(period=20), ["close"]),
+    highest=(bt.indicators.Highest, dict(period=30), ["high"]),
+    lowest=(bt.indicators.Lowest, dict(period=15), ["low"]),
+    macd=(bt.indicators.MACD, dict(), ["close"]),
+    stochastic=(
+        bt.indicators.StochasticFast,
+        dict(period=1, period_dfast=3, movav=bt.indicators.EMA, safediv=True),
+        None,
+    ),
+    rsi=(
+        bt.indicators.RelativeStrengthIndex,
+        dict(period=14, movav=bt.indicators.EMA, safediv=False),
+        ["close"],
+    ),
+)
+
+# name -> function of an OHLCV
+KERNELS = dict(
+    sma=lambda d: indicators.sma(d.close, 15),
+    vwap=lambda d: indicators.vwap(d.high, d.low, d.close, d.volume, 15),
+    bbands=lambda d: indicators.bbands(d.close, 20),
+    highest=lambda d: indicators.highest(d.high, 30),
+    lowest=lambda d: indicators.lowest(d.low, 15),
+    macd=lambda d: indicators.macd(d.close),
+    stochastic=lambda d: indicators.stochastic_fast(d.high, d.low, d.close, 1, 3),
+    rsi=lambda d: indicators.rsi(d.close, 14),
+)
+
+
+class _IndicatorOnly(bt.Strategy):
+    params = (("name", "none"),)
+
+    def __init__(self):
+        spec = INDICATORS[self.p.name]
+        if spec is not None:
+            cls, kwargs, lines = spec
+            inputs = [getattr(self.data, x) for x in lines] if lines else [self.data]
+            cls(*inputs, **kwargs)
+
+
+def _cerebro(data, strategy, **params):
+    cerebro = bt.Cerebro()
+    cerebro.addstrategy(strategy, **params)
+    cerebro.adddata(ArrayData(ohlcv=data))
+    cerebro.broker.setcash(10000)
+    cerebro.addsizer(bt.sizers.PercentSizerInt, percents=90)
+    return cerebro
+
+
+def _setup(kind, name, path, reverse=False):
+    """The function timed by a case; its inputs are loaded beforehand."""
+    if kind == "feed":
+        return lambda: FEEDS[name](path, reverse)
+    # through the feed cache: parsing the csv would inflate the peak RSS
+    data = OHLCV(*(np.array(c) for c in load_cached(path)))
+    if kind == "kernel":
+        return lambda: KERNELS[name](data)
+    if kind == "indicator":
+        return lambda: _cerebro(data, _IndicatorOnly, name=name).run(stdstats=False)
+    return lambda: _cerebro(data, getattr(zwpy_sta, name)).run()
+
+
+def _peak_rss():
+    """Peak RSS of this process in bytes, None if unknown."""
+    # ru_maxrss survives fork + exec on Linux (it would count the parent),
+    # the VmHWM of /proc does not
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_case(kind, name, path, reverse, bars, repeat, budget):
+    func = _setup(kind, name, path, reverse)
+    times = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        while not times or (
+            len(times) < repeat and time.perf_counter() - start < budget
+        ):
+            t = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t)
+    seconds = min(times)
+    return dict(
+        seconds=seconds,
+        bars=bars,
+        bars_per_sec=bars / seconds if seconds else None,
+        peak_rss=_peak_rss(),
+        runs=len(times),
+    )
+
+
+def cases(scales):
+    """
+    Every benchmark case.
+
+    Returns:
+        list of (str, str, str, int): (kind, name, sample, scale).
+    """
+    found = []
+    for scale in scales:
+        for sample in SAMPLES:
+            for loader in FEEDS:
+                found.append(("feed", loader, sample, scale))
+        for name in INDICATORS:
+            found.append(("indicator", name, BASE, scale))
+        for name in KERNELS:
+            found.append(("kernel", name, BASE, scale))
+        for name in STRATEGIES:
+            found.append(("strategy", name, BASE, scale))
+    return found
+
+
+def case_id(kind, name, sample, scale):
+    if kind == "feed":
+        return "feed/%s/%s/x%d" % (sample, name, scale)
+    return "%s/%s/x%d" % (kind, name, scale)
+
+
+def run(scales=(1, 10, 100), only=None, repeat=3, budget=2.0, seed=0, workdir=None):
+    """
+    Run the benchmark cases.
+
+    Args:
+        scales (tuple): history length multiples.
+        only (list of str): run only the cases whose id starts with one
+            of these prefixes (e.g. "strategy/Rsi", "feed/").
+        repeat (int): runs per case, the fastest counts.
+        budget (float): seconds after which a case stops repeating.
+        seed (int): random seed of the synthetic data.
+        workdir (str): where the synthetic csv files go (default: a temp dir).
+
+    Returns:
+        dict: case id -> seconds, bars, bars_per_sec, peak_rss (bytes), runs.
+    """
+    selected = [
+        c for c in cases(scales) if not only or case_id(*c).startswith(tuple(only))
+    ]
+    tmp = workdir or tempfile.mkdtemp(prefix="zwpy-bench-")
+    os.makedirs(tmp, exist_ok=True)
+    paths, bars = {}, {}
+    for _, _, sample, scale in selected:
+        if (sample, scale) not in paths:
+            path, reverse = SAMPLES[sample]
+            data = synthetic(read_yahoo_csv(path, reverse=reverse), scale, seed)
+            paths[sample, scale] = os.path.join(tmp, "%s_x%d.csv" % (sample, scale))
+            bars[sample, scale] = len(data.date)
+            # in the sample's own order: the feeds of 600401 read newest first
+            write_yahoo_csv(paths[sample, scale], data, reverse)
+            build_cache(paths[sample, scale])
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    try:
+        for kind, name, sample, scale in selected:
+            # one fresh process per case, for its own peak RSS
+            with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+                reverse = SAMPLES[sample][1]
+                args = (kind, name, paths[sample, scale], reverse, bars[sample, scale])
+                future = pool.submit(_run_case, *args, repeat, budget)
+                results[case_id(kind, name, sample, scale)] = future.result()
+    finally:
+        if workdir is None:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Cases slower than in the baseline by more than `tolerance`.
+
+    Returns:
+        list of (str, float, float): case id, baseline and current seconds.
+    """
+    slower = []
+    for key, row in results.items():
+        base = baseline.get(key)
+        if base and row["seconds"] > base["seconds"] * (1.0 + tolerance):
+            slower.append((key, base["seconds"], row["seconds"]))
+    return slower
+
+
+def format_table(results):
+    """Format benchmark results as a plain text table."""
+    header = ("case", "bars", "seconds", "bars/sec", "peak MiB")
+    lines = ["%-36s %10s %10s %14s %10s" % header]
+    for key, r in results.items():
+        rss = "%.1f" % (r["peak_rss"] / 2 ** 20) if r["peak_rss"] else "-"
+        lines.append(
+            "%-36s %10d %10.4f %14.0f %10s"
+            % (key, r["bars"], r["seconds"], r["bars_per_sec"] or 0, rss)
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--only", nargs="+", metavar="PREFIX")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="JSON", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="baseline to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run(args.scales, args.only, args.repeat, args.budget, args.seed)
+    print(format_table(results))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            meta = dict(
+                date=datetime.datetime.now().isoformat(timespec="seconds"),
+                python=platform.python_version(),
+                machine=platform.machine(),
+                backtrader=bt.__version__,
+                numpy=np.__version__,
+            )
+            json.dump(dict(meta=meta, results=results), f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        slower = compare(results, baseline, args.tolerance)
+        for key, before, now in slower:
+            print("SLOWER %s: %.4fs -> %.4fs" % (key, before, now))
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Memory-bounded backtest: ring buffers instead of the full line history.
+
+`run_bounded` runs cerebro with `exactbars=1`: every line (data,
+indicators, observers) keeps only as many bars as its consumers look
+back, worked out from their minimum periods plus the strategy's
+`lookback` (see `BaseStrategyFrame`). The feed streams from the arrays a
+chunk at a time, so memory does not grow with the length of the
+history. Results come back compact: the trade ledger and the equity
+curve arrays.
+
+Results match the default preloaded mode for the zwpy_sta strategies
+with params that give every line a history: the lines of recursive
+indicators (EMA and the MACD, RSI, KDJ built on it) keep at least two
+bars even with period 1, and params whose minimum period is not longer
+than the strategy's `lookback` (e.g. CmaStrategy with maperiod=1 or 2)
+are refused, since next() would read before the first bar.
+
+Example:
+    python -m Strategy.bounded MacdV2Strategy ./sample_data/orcl-1995-2014.txt \\
+        --param fast_period=8 slow_period=30
+"""
+import argparse
+import collections
+import contextlib
+import os
+
+import backtrader as bt
+
+from Strategy import zwpy_sta
+from Strategy.analytics import EquityCurve, max_drawdown
+from Strategy.data import ArrayData
+from Strategy.feedcache import load_cached
+from Strategy.incremental import _parse_params
+from Strategy.sweep import _parse_date
+
+BoundedResult = collections.namedtuple(
+    "BoundedResult", ["value", "ledger", "curve", "buffers"]
+)
+BoundedResult.__doc__ = """
+    Result of `run_bounded`.
+
+    Args:
+        value (float): final portfolio value.
+        ledger (TradeLedger): closed trades.
+        curve (Curve): equity, position and close of every bar.
+        buffers (dict): line owner name -> bars kept by its ring buffers.
+    """
+
+
+def ring_sizes(strategy):
+    """
+    Bars kept per data feed and indicator of a strategy run with
+    `exactbars=1` (the longest of its lines).
+
+    Returns:
+        dict: name -> bars.
+    """
+    sizes = {}
+    owners = [("data%d" % i, d) for i, d in enumerate(strategy.datas)]
+    owners += [(type(ind).__name__, ind) for ind in strategy.getindicators()]
+    for name, obj in owners:
+        maxlen = max(getattr(line, "maxlen", 0) for line in obj.lines)
+        while name in sizes:
+            name += "'"
+        sizes[name] = maxlen
+    return sizes
+
+
+def run_bounded(strategy, data, cash=10000.0, percents=90, commission=0.0, **params):
+    """
+    Backtest a strategy keeping only the bars its lines need.
+
+    Args:
+        strategy (type): a BaseStrategyFrame strategy (e.g. from zwpy_sta).
+        data (OHLCV): price arrays (e.g. memory-mapped by `load_cached`).
+        cash (float): starting cash.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio.
+        params: strategy parameters.
+
+    Returns:
+        BoundedResult
+
+    Raises:
+        ValueError: if the strategy's minimum period is not longer than
+            its `lookback` with these params.
+    """
+    cerebro = bt.Cerebro(stdstats=False, exactbars=1)
+    cerebro.addstrategy(strategy, **params)
+    cerebro.adddata(ArrayData(ohlcv=data))
+    cerebro.broker.setcash(cash)
+    cerebro.addsizer(bt.sizers.PercentSizerInt, percents=percents)
+    cerebro.broker.setcommission(commission=commission)
+    cerebro.addanalyzer(EquityCurve, _name="curve")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        strat = cerebro.run()[0]
+    return BoundedResult(
+        cerebro.broker.getvalue(),
+        strat.ledger,
+        strat.analyzers.curve.get_analysis(),
+        ring_sizes(strat),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("strategy", help="strategy class name in zwpy_sta")
+    parser.add_argument("datapath", help="Yahoo format csv file")
+    parser.add_argument("--param", nargs="+", metavar="NAME=VALUE")
+    parser.add_argument("--fromdate", type=_parse_date)
+    parser.add_argument("--todate", type=_parse_date)
+    parser.add_argument("--cachedir", default=None)
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--percents", type=int, default=90)
+    parser.add_argument("--commission", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    data = load_cached(args.datapath, args.cachedir, args.fromdate, args.todate)
+    result = run_bounded(
+        getattr(zwpy_sta, args.strategy),
+        data,
+        cash=args.cash,
+        percents=args.percents,
+        commission=args.commission,
+        **_parse_params(args.param)
+    )
+    print(
+        "Final value %.2f, %d closed trades, max drawdown %.2f%%"
+        % (result.value, len(result.ledger), max_drawdown(result.curve.equity)[0])
+    )
+    print("bars kept: " + ", ".join("%s %d" % kv for kv in result.buffers.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Slim broker for the long-only, market order strategies of zwpy_sta.
+
+`SlimBroker` replaces backtrader's `BackBroker` for strategies that, like
+every `BaseStrategyFrame` strategy, hold one long position in one asset,
+send market orders only and pay a stock-like commission (`setcommission`).
+Orders fill at the next bar's open with `BackBroker`'s cash arithmetic,
+so cash, value, trades and commissions are the same; but a bar without a
+pending order costs a multiplication and an addition, with no order
+queues, notification clones, interest or margin bookkeeping.
+
+Example:
+    cerebro = bt.Cerebro()
+    cerebro.broker = SlimBroker()
+    cerebro.broker.setcash(10000)
+    cerebro.broker.setcommission(commission=0.001425)
+"""
+import collections
+
+import backtrader as bt
+
+
+class SlimBroker(bt.broker.BrokerBase):
+    """
+    Broker simulating long-only market orders, filled at the next open.
+
+    Differences with `BackBroker`:
+        - other order types (limit, stop, close, ...) and orders that
+          would go short are rejected;
+        - strategies are notified of an order once, when it is completed
+          (or rejected, canceled, out of margin), not when it is
+          submitted and accepted;
+        - no slippage, volume filler, cheat-on-open/close, credit
+          interest, order or fund history.
+
+    Args:
+        cash (float): starting cash.
+        fundstartval (float): starting value of a fund share.
+    """
+
+    params = (("cash", 10000.0), ("fundstartval", 100.0))
+
+    def init(self):
+        super(SlimBroker, self).init()
+        self.startingcash = self.cash = self.p.cash
+        self._value = self.cash
+        self.positions = collections.defaultdict(bt.Position)
+        self.pending = []
+        self.notifs = collections.deque()
+
+    def get_cash(self):
+        """Returns the current cash (alias: `getcash`)."""
+        return self.cash
+
+    getcash = get_cash
+
+    def set_cash(self, cash):
+        """Sets the cash parameter (alias: `setcash`)."""
+        self.startingcash = self.cash = self.p.cash = cash
+        self._value = cash
+
+    setcash = set_cash
+
+    def get_value(self, datas=None, mkt=False, lever=False):
+        """
+        Returns the portfolio value, or that of the positions of the given
+        datas (alias: `getvalue`).
+        """
+        if datas is None:
+            return self._value - self.cash if mkt else self._value
+        return sum(self.positions[d].size * d.close[0] for d in datas)
+
+    getvalue = get_value
+
+    def get_fundshares(self):
+        return self.startingcash / self.p.fundstartval
+
+    fundshares = property(get_fundshares)
+
+    def get_fundvalue(self):
+        return self._value / self.get_fundshares()
+
+    fundvalue = property(get_fundvalue)
+
+    def getposition(self, data):
+        return self.positions[data]
+
+    def get_orders_open(self, safe=False):
+        return [o.clone() for o in self.pending] if safe else list(self.pending)
+
+    def orderstatus(self, order):
+        return order.status
+
+    def get_notification(self):
+        return self.notifs.popleft() if self.notifs else None
+
+    def _notify(self, order):
+        # the order is final: no clone needed to hide later changes, only
+        # its executions marked as new for the strategy's trade updates
+        order.executed.markpending()
+        self.notifs.append(order)
+
+    def buy(self, owner, data, size, **kwargs):
+        return self._submit(bt.BuyOrder, owner, data, size, **kwargs)
+
+    def sell(self, owner, data, size, **kwargs):
+        return self._submit(bt.SellOrder, owner, data, size, **kwargs)
+
+    def _submit(
+        self,
+        cls,
+        owner,
+        data,
+        size,
+        price=None,
+        plimit=None,
+        exectype=None,
+        valid=None,
+        tradeid=0,
+        oco=None,
+        trailamount=None,
+        trailpercent=None,
+        parent=None,
+        transmit=True,
+        histnotify=False,
+        _checksubmit=True,
+        **kwargs
+    ):
+        order = cls(
+            owner=owner,
+            data=data,
+            size=size,
+            price=price,
+            pricelimit=plimit,
+            exectype=exectype,
+            valid=valid,
+            tradeid=tradeid,
+            trailamount=trailamount,
+            trailpercent=trailpercent,
+            parent=parent,
+            transmit=transmit,
+            histnotify=histnotify,
+        )
+        order.addinfo(**kwargs)
+        return self.submit(order)
+
+    def submit(self, order):
+        order.submit()
+        size = self.positions[order.data].size
+        size += sum(o.size for o in self.pending if o.data is order.data)
+        market = order.exectype == bt.Order.Market and order.parent is None
+        if not market or size + order.size < 0:
+            order.reject()
+            self._notify(order)
+        else:
+            order.accept()
+            self.pending.append(order)
+        return order
+
+    def cancel(self, order, bracket=False):
+        try:
+            self.pending.remove(order)
+        except ValueError:
+            return False
+        order.cancel()
+        self._notify(order)
+        return True
+
+    def _settle(self, size, price, position, comminfo, pseudo=False):
+        """
+        Cash after executing `size` at `price` against `position`, with
+        `BackBroker._execute`'s arithmetic (negative: not enough cash).
+        A `pseudo` execution is the submission check: closed at `price`,
+        no profit and loss.
+
+        Returns:
+            (cash, closedvalue, closedcomm, openedvalue, openedcomm, pnl)
+        """
+        cash = self.cash
+        _, _, opened, closed = position.pseudoupdate(size, price)
+        pprice = price if pseudo else position.price
+        pnl = closedvalue = closedcomm = openedvalue = openedcomm = 0.0
+        if closed:
+            if not pseudo:
+                pnl = comminfo.profitandloss(-closed, pprice, price)
+            closedvalue = comminfo.getoperationcost(closed, pprice)
+            closecash = closedvalue
+            if closedvalue > 0:
+                closecash /= comminfo.get_leverage()
+            cash += closecash + pnl * comminfo.stocklike
+            closedcomm = comminfo.getcommission(closed, price)
+            cash -= closedcomm
+        if opened:
+            openedvalue = comminfo.getoperationcost(opened, price)
+            opencash = openedvalue
+            if openedvalue > 0:
+                opencash /= comminfo.get_leverage()
+            cash -= opencash
+            openedcomm = comminfo.getcommission(opened, price)
+            cash -= openedcomm
+        return cash, closedvalue, closedcomm, openedvalue, openedcomm, pnl
+
+    def _execute(self, order):
+        data = order.data
+        position = self.positions[data]
+        comminfo = self.getcommissioninfo(data)
+
+        # BackBroker checks the cash at the creation price first ...
+        created = order.created.price
+        if self._settle(order.size, created, position, comminfo, pseudo=True)[0] < 0:
+            order.margin()
+            self._notify(order)
+            return
+
+        # ... then fills at the open
+        price = data.open[0]
+        cash, closedvalue, closedcomm, openedvalue, openedcomm, pnl = self._settle(
+            order.size, price, position, comminfo
+        )
+        if cash < 0.0:
+            order.margin()
+            self._notify(order)
+            return
+
+        psize, pprice, opened, closed = position.pseudoupdate(order.size, price)
+        self.cash = cash
+        position.update(order.size, price, data.datetime.datetime())
+        order.execute(
+            data.datetime[0],
+            order.size,
+            price,
+            closed,
+            closedvalue,
+            closedcomm,
+            opened,
+            openedvalue,
+            openedcomm,
+            comminfo.margin,
+            pnl,
+            psize,
+            pprice,
+        )
+        order.addcomminfo(comminfo)
+        self._notify(order)
+
+    def next(self):
+        if self.pending:
+            pending, self.pending = self.pending, []
+            for order in pending:
+                if order.data.datetime[0] <= order.created.dt:
+                    self.pending.append(order)  # created on this bar
+                else:
+                    self._execute(order)
+
+        # value as BackBroker._get_value computes it for long positions
+        value = 0.0
+        for data, position in self.positions.items():
+            size = position.size
+            if size:
+                comminfo = self.getcommissioninfo(data)
+                close = data.close[0]
+                dvalue = size * close
+                unrealized = comminfo.profitandloss(size, position.price, close)
+                value += (dvalue - unrealized) / comminfo.get_leverage()
+                value += unrealized
+        self._value = self.cash + value
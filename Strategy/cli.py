@@ -0,0 +1,161 @@
+"""
+Command line entry point: list the strategies of zwpy_sta and backtest one.
+
+Startup only reads the strategy registry (see registry.py); backtrader,
+NumPy and the data feeds are imported when a backtest runs, matplotlib
+only with `--plot`. Listing, help and parameter errors take a few tens
+of milliseconds.
+
+Example:
+    python -m Strategy.cli list
+    python -m Strategy.cli show RsiStrategy
+    python -m Strategy.cli run RsiStrategy ./sample_data/600401_yahoo.csv \\
+        --fromdate 2015-01-01 --param period=14 kbuy=70 ksell=30 --stats
+"""
+import argparse
+import contextlib
+import datetime
+import os
+
+from Strategy import registry
+
+# params of BaseStrategyFrame, left out of `list`
+_BASE_PARAMS = ("printlog", "logsink", "sharedind", "profile")
+
+
+def _parse_date(text):
+    return datetime.datetime.strptime(text, "%Y-%m-%d")
+
+
+def _list(args):
+    for spec in registry.strategies().values():
+        own = [p for p in spec.params if p[0] not in _BASE_PARAMS]
+        print(("%-16s %s" % (spec.name, " ".join("%s=%r" % p for p in own))).rstrip())
+
+
+def _show(args):
+    spec = args.spec
+    print(spec.name)
+    print()
+    print(spec.doc)
+    print()
+    print("params:")
+    for name, default in spec.params:
+        print("    %s = %r" % (name, default))
+
+
+def _run(args):
+    params = args.params
+    strategy = registry.load(args.strategy)
+
+    if args.engine == "vectorized":
+        return _run_vectorized(args, strategy, params)
+
+    import backtrader as bt
+
+    from Strategy.data import FastYahooCSVData
+
+    cerebro = bt.Cerebro(stdstats=False)
+    if args.engine == "slim":
+        from Strategy.broker import SlimBroker
+
+        cerebro.broker = SlimBroker()
+    cerebro.addstrategy(strategy, **params)
+    cerebro.adddata(
+        FastYahooCSVData(
+            dataname=args.datapath, fromdate=args.fromdate, todate=args.todate
+        )
+    )
+    cerebro.broker.setcash(args.cash)
+    cerebro.addsizer(bt.sizers.PercentSizerInt, percents=args.percents)
+    cerebro.broker.setcommission(commission=args.commission)
+    if args.stats or args.plot:
+        from Strategy.analytics import EquityCurve
+
+        cerebro.addanalyzer(EquityCurve, _name="curve")
+
+    with contextlib.ExitStack() as stack:
+        if args.quiet:
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        strat = cerebro.run()[0]
+    print("Final Portfolio Value: %.2f" % cerebro.broker.getvalue())
+
+    if args.stats:
+        from Strategy.analytics import summary
+
+        curve = strat.analyzers.curve.get_analysis()
+        pnl = strat.ledger.pnlcomm
+        stats = summary(curve.equity, curve.position, curve.close, pnl)
+        for name, value in stats.items():
+            print("%-14s %.2f" % (name, value))
+    if args.plot:
+        from Strategy.plot import plot_strategy
+
+        plot_strategy(args.plot, strat, width=args.width, height=args.height)
+
+
+def _run_vectorized(args, strategy, params):
+    from Strategy.analytics import summary
+    from Strategy.data import load_yahoo_csv
+    from Strategy.vectorized import run_vectorized
+
+    if args.plot:
+        raise SystemExit("--plot needs a cerebro run (--engine cerebro or slim)")
+    data = load_yahoo_csv(args.datapath, args.fromdate, args.todate)
+    result = run_vectorized(
+        strategy,
+        data,
+        cash=args.cash,
+        percents=args.percents,
+        commission=args.commission,
+        **params
+    )
+    print("Final Portfolio Value: %.2f" % result.value)
+    if args.stats:
+        pnl = [t.pnlcomm for t in result.trades if t.exit_bar is not None]
+        stats = summary(result.equity, result.position, data.close, pnl)
+        for name, value in stats.items():
+            print("%-14s %.2f" % (name, value))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="strategies and their own params")
+
+    show = commands.add_parser("show", help="docstring and params of a strategy")
+    show.add_argument("strategy")
+
+    run = commands.add_parser("run", help="backtest a strategy on a csv file")
+    run.add_argument("strategy", help="strategy class name in zwpy_sta")
+    run.add_argument("datapath", help="Yahoo format csv file, in either date order")
+    run.add_argument("--param", nargs="+", metavar="NAME=VALUE")
+    run.add_argument(
+        "--engine", choices=["cerebro", "slim", "vectorized"], default="cerebro"
+    )
+    run.add_argument("--fromdate", type=_parse_date)
+    run.add_argument("--todate", type=_parse_date)
+    run.add_argument("--cash", type=float, default=10000.0)
+    run.add_argument("--percents", type=int, default=90)
+    run.add_argument("--commission", type=float, default=0.0)
+    run.add_argument("--stats", action="store_true", help="print equity statistics")
+    run.add_argument("--plot", metavar="PNG", help="save a plot of the run")
+    run.add_argument("--width", type=int, default=3000)
+    run.add_argument("--height", type=int, default=1800)
+    run.add_argument("-q", "--quiet", action="store_true", help="no strategy output")
+    args = parser.parse_args(argv)
+
+    if args.command != "list":
+        try:
+            args.spec = registry.get(args.strategy)
+            if args.command == "run":
+                args.params = registry.parse_params(args.strategy, args.param)
+        except (KeyError, TypeError, ValueError) as e:
+            parser.error(e.args[0])
+    dict(list=_list, show=_show, run=_run)[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
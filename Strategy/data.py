@@ -0,0 +1,360 @@
+"""
+Defines helpers to load OHLCV data as NumPy arrays.
+
+The arrays hold exactly the values backtrader's `YahooFinanceCSVData`
+feeds into a strategy (adjusted by `Adj Close` unless `adjclose=False`,
+and rounded), so array based tools give the same answers as `cerebro.run()`.
+`ArrayData` feeds such arrays back to backtrader.
+"""
+import array
+import collections
+import csv
+import datetime
+import io
+import mmap
+import os
+
+import backtrader as bt
+import numpy as np
+
+# Same default as backtrader feeds: a daily bar is stamped at the end of day.
+SESSIONEND = datetime.time(23, 59, 59, 999990)
+
+OHLCV = collections.namedtuple(
+    "OHLCV", ["date", "open", "high", "low", "close", "adjclose", "volume"]
+)
+OHLCV.__doc__ = """
+    Column arrays of one symbol, sorted by ascending date.
+
+    Args:
+        date (np.ndarray): int64 proleptic Gregorian ordinals.
+        open, high, low, close, adjclose, volume (np.ndarray): float64 columns.
+    """
+
+
+def date_bounds(fromdate=None, todate=None):
+    """
+    Convert backtrader style fromdate/todate into inclusive date ordinals.
+
+    Bars are stamped at `SESSIONEND`, so a `datetime` todate at midnight
+    excludes the bar of that day, like it does in backtrader.
+
+    Args:
+        fromdate (datetime.date or datetime.datetime): first date to load.
+        todate (datetime.date or datetime.datetime): last date to load.
+
+    Returns:
+        (int, int): lowest and highest ordinal to keep.
+    """
+    lo, hi = -(2 ** 62), 2 ** 62
+    if fromdate is not None:
+        lo = fromdate.toordinal()
+        if isinstance(fromdate, datetime.datetime) and fromdate.time() > SESSIONEND:
+            lo += 1
+    if todate is not None:
+        hi = todate.toordinal()
+        if isinstance(todate, datetime.datetime) and todate.time() < SESSIONEND:
+            hi -= 1
+    return lo, hi
+
+
+def _adjust_row(tokens, decimals=2, adjclose=True):
+    """Apply YahooFinanceCSVData adjclose / round rules to one csv row."""
+    o, h, l, c, adjustedclose = (float(x) for x in tokens[1:6])
+    try:
+        v = float(tokens[6])
+    except (IndexError, ValueError):
+        v = 0.0
+
+    if adjclose:
+        adjfactor = c / adjustedclose
+        o /= adjfactor
+        h /= adjfactor
+        l /= adjfactor
+        c = adjustedclose
+        v *= adjfactor
+
+    return (
+        round(o, decimals),
+        round(h, decimals),
+        round(l, decimals),
+        round(c, decimals),
+        adjustedclose,
+        round(v, 0),
+    )
+
+
+def read_yahoo_csv(path, fromdate=None, todate=None, reverse=False, adjclose=True):
+    """
+    Read a Yahoo format csv file into an `OHLCV` of NumPy arrays.
+
+    Args:
+        path (str): csv file path.
+        fromdate (datetime.date): do not load bars before this date.
+        todate (datetime.date): do not load bars after this date.
+        reverse (bool): the file is stored newest first (e.g. 600401_yahoo.csv).
+        adjclose (bool): back-adjust open, high, low, close and volume by
+            the `Adj Close` ratio (backtrader's default); False keeps the
+            raw prices, like `YahooFinanceCSVData(adjclose=False)`.
+
+    Returns:
+        OHLCV: column arrays sorted by ascending date.
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header, if not empty
+        rows = [r for r in reader if r and "null" not in r[1:]]
+
+    if reverse:
+        rows.reverse()
+
+    lo, hi = date_bounds(fromdate, todate)
+    dates, values = [], []
+    for r in rows:
+        d = r[0]
+        ordinal = datetime.date(int(d[0:4]), int(d[5:7]), int(d[8:10])).toordinal()
+        if lo <= ordinal <= hi:
+            dates.append(ordinal)
+            values.append(_adjust_row(r, adjclose=adjclose))
+
+    cols = np.array(values, dtype=np.float64).reshape(-1, 6).T
+    return OHLCV(np.array(dates, dtype=np.int64), *cols)
+
+
+def _round(values, decimals):
+    """Python's `round` for an array (`np.round` can differ at ties)."""
+    out = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if tie.any():
+        out[tie] = [round(x, decimals) for x in values[tie].tolist()]
+    return out
+
+
+def _ordinals(year, month, day):
+    """`date.toordinal()` of date arrays."""
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 305
+
+
+def _newlines(buf, chunk=1 << 26):
+    """Offsets of the newline bytes of a buffer, scanned a chunk at a time."""
+    found = [np.empty(0, np.int64)]
+    for start in range(0, len(buf), chunk):
+        part = np.frombuffer(buf, np.uint8, min(chunk, len(buf) - start), start)
+        found.append(np.flatnonzero(part == 10) + start)
+    return np.concatenate(found)
+
+
+def _load_mapped(buf, fromdate, todate, adjclose):
+    """`load_yahoo_csv` of a mapped file, None if it is not in plain layout."""
+    newlines = _newlines(buf)
+    if not len(newlines):
+        return None
+    starts = newlines + 1
+    stops = np.append(newlines[1:], len(buf))
+    keep = stops - starts > 1  # skip blank lines
+    starts, stops = starts[keep], stops[keep]
+    if not len(starts):
+        return OHLCV(np.empty(0, np.int64), *(np.empty(0) for _ in range(6)))
+    if (stops - starts < 12).any():
+        return None
+
+    # dates: the first 10 bytes of every line, YYYY-MM-DD
+    raw = np.frombuffer(buf, np.uint8)[starts[:, None] + np.arange(11)]
+    digits = raw.astype(np.int64) - 48
+    dashes = (raw[:, 4] == 45) & (raw[:, 7] == 45) & (raw[:, 10] == 44)
+    numbers = digits[:, [0, 1, 2, 3, 5, 6, 8, 9]]
+    if not dashes.all() or ((numbers < 0) | (numbers > 9)).any():
+        return None
+    year = numbers[:, :4] @ np.array([1000, 100, 10, 1])
+    month = numbers[:, 4] * 10 + numbers[:, 5]
+    day = numbers[:, 6] * 10 + numbers[:, 7]
+    dates = _ordinals(year, month, day)
+    del raw
+
+    steps = np.diff(dates)
+    if (steps >= 0).all():
+        descending = False
+    elif (steps <= 0).all():
+        descending, dates = True, dates[::-1]
+    else:
+        return None
+
+    lo, hi = date_bounds(fromdate, todate)
+    first, last = np.searchsorted(dates, [lo, hi + 1])
+    if first >= last:
+        return OHLCV(np.empty(0, np.int64), *(np.empty(0) for _ in range(6)))
+    lines = slice(first, last)
+    if descending:
+        n = len(dates)
+        lines = slice(n - last, n - first)
+
+    # the selected rows are one contiguous byte range, in either order
+    text = buf[starts[lines.start] : stops[lines.stop - 1]]
+    try:
+        cols = np.loadtxt(
+            io.BytesIO(text), delimiter=",", usecols=range(1, 7), ndmin=2
+        )
+    except ValueError:  # "null" rows, missing volume, ...
+        return None
+    if descending:
+        cols = cols[::-1]
+    if len(cols) != last - first:
+        return None
+
+    # same operations as _adjust_row, for the bit for bit same values
+    o, h, l, c, adjustedclose, v = (np.ascontiguousarray(x) for x in cols.T)
+    if adjclose:
+        adjfactor = c / adjustedclose
+        o, h, l, c = o / adjfactor, h / adjfactor, l / adjfactor, adjustedclose
+        v = v * adjfactor
+    return OHLCV(
+        np.ascontiguousarray(dates[first:last]),
+        _round(o, 2),
+        _round(h, 2),
+        _round(l, 2),
+        _round(c, 2),
+        adjustedclose,
+        np.round(v, 0),
+    )
+
+
+def load_yahoo_csv(path, fromdate=None, todate=None, adjclose=True):
+    """
+    Bulk load a Yahoo format csv file, in either date order.
+
+    The file is memory-mapped: the dates are parsed from the first bytes
+    of every line at once, the sort order is detected from them, the
+    date range is found by binary search and only its rows are parsed
+    (by NumPy's C reader). Files in another layout (e.g. with "null"
+    rows) go through `read_yahoo_csv`.
+
+    Args:
+        path (str): csv file path, oldest or newest first.
+        fromdate (datetime.date): do not load bars before this date.
+        todate (datetime.date): do not load bars after this date.
+        adjclose (bool): back-adjusted (default) or raw prices,
+            see `read_yahoo_csv`.
+
+    Returns:
+        OHLCV: column arrays sorted by ascending date, with the same
+            values as `read_yahoo_csv`.
+    """
+    data = None
+    if os.path.getsize(path):
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as buf:
+            data = _load_mapped(buf, fromdate, todate, adjclose)
+    if data is None:
+        data = read_yahoo_csv(path, fromdate, todate, adjclose=adjclose)
+        order = np.argsort(data.date, kind="stable")
+        data = OHLCV(*(column[order] for column in data))
+    return data
+
+
+class ArrayData(bt.feed.DataBase):
+    """
+    Data feed over `OHLCV` arrays, no parsing at all.
+
+    When preloading, the line buffers are filled in one go.
+    Subclasses can override `_getdata` to provide the arrays.
+
+    Args:
+        ohlcv (OHLCV): column arrays sorted by ascending date.
+    """
+
+    lines = ("adjclose",)
+
+    params = (("ohlcv", None),)
+
+    def _getdata(self):
+        return self.p.ohlcv
+
+    def start(self):
+        super(ArrayData, self).start()
+        data = self._getdata()
+
+        lo, hi = date_bounds(self.p.fromdate, self.p.todate)
+        first, last = np.searchsorted(data.date, [lo, hi + 1])
+
+        sessionend = self.p.sessionend or SESSIONEND
+        frac = bt.date2num(datetime.datetime.combine(datetime.date(1, 1, 1), sessionend))
+        self._dtoffset = frac - 1.0
+        self._columns = dict(
+            datetime=data.date[first:last],
+            open=data.open[first:last],
+            high=data.high[first:last],
+            low=data.low[first:last],
+            close=data.close[first:last],
+            volume=data.volume[first:last],
+            adjclose=data.adjclose[first:last],
+        )
+        self._size = last - first
+        self._rows = None
+        self._first = 0
+        self._idx = 0
+
+    def _values(self, lo, hi):
+        """Rows `lo:hi` of every line, as (line, float64 array)."""
+        for name, column in self._columns.items():
+            if name == "datetime":
+                values = column[lo:hi] + self._dtoffset
+            else:
+                values = np.asarray(column[lo:hi], dtype=np.float64)
+            yield getattr(self.lines, name), values
+        yield self.lines.openinterest, np.zeros(hi - lo)
+
+    def preload(self):
+        if self._filters or self._ffilters or self._tzinput:
+            return super(ArrayData, self).preload()
+
+        for line, values in self._values(0, self._size):
+            line.array = array.array("d", np.ascontiguousarray(values).tobytes())
+        self._idx = self._size
+        self.home()
+
+    # rows converted to Python floats at a time when not preloading, so
+    # a bounded memory run (exactbars) holds no full copy of the data
+    _chunk = 4096
+
+    def _load(self):
+        i = self._idx
+        if i >= self._size:
+            return False
+        if self._rows is None or i - self._first >= self._chunk:
+            hi = min(i + self._chunk, self._size)
+            self._rows = [(line, v.tolist()) for line, v in self._values(i, hi)]
+            self._first = i
+
+        j = i - self._first
+        for line, values in self._rows:
+            line[0] = values[j]
+        self._idx = i + 1
+        return True
+
+
+class FastYahooCSVData(ArrayData):
+    """
+    Yahoo format csv data feed loaded with `load_yahoo_csv` and preloaded
+    in bulk.
+
+    A drop-in for `bt.feeds.YahooFinanceCSVData` (with default rounding);
+    the `reverse` parameter is not needed.
+
+    Args:
+        dataname (str): csv file path.
+        adjclose (bool): back-adjusted (default) or raw prices.
+    """
+
+    params = (("adjclose", True),)
+
+    def _getdata(self):
+        return load_yahoo_csv(
+            self.p.dataname, self.p.fromdate, self.p.todate, self.p.adjclose
+        )
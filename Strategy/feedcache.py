@@ -0,0 +1,257 @@
+"""
+Binary columnar cache for csv data feeds.
+
+Each csv file is parsed once into a `.col` file: a small json header,
+then the date column as int64 ordinals and the float64 OHLCV columns,
+sorted by ascending date. Later loads memory-map the columns.
+
+The header records the source mtime, size and sha1; a cache whose
+source changed is rebuilt on the next load.
+
+Back-adjusted prices (backtrader's default) and raw prices have one
+cache file each. `build_caches` precomputes both for a directory, so
+no run pays for parsing or adjusting.
+
+Example:
+    python -m Strategy.feedcache ./symbols --processes 8
+"""
+import argparse
+import concurrent.futures
+import fnmatch
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from Strategy.data import OHLCV, ArrayData, date_bounds, load_yahoo_csv
+
+MAGIC = b"ZWPYCOL1"
+VERSION = 1
+
+
+def cache_path(path, cachedir=None, adjclose=True):
+    """
+    Cache file of a csv file (default: `.feedcache` next to the csv),
+    `<name>.col` for adjusted prices, `<name>.raw.col` for raw ones.
+    """
+    path = os.path.abspath(path)
+    cachedir = cachedir or os.path.join(os.path.dirname(path), ".feedcache")
+    suffix = ".col" if adjclose else ".raw.col"
+    return os.path.join(cachedir, os.path.basename(path) + suffix)
+
+
+def _sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return dict(mtime_ns=st.st_mtime_ns, size=st.st_size, sha1=_sha1(path))
+
+
+def _write(cachefile, header, data):
+    """Write header and columns to a temp file, then move it in place."""
+    os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+    text = json.dumps(header).encode()
+    text += b" " * (-len(text) % 8)
+
+    tmp = "%s.%d.tmp" % (cachefile, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(text)).tobytes())
+        f.write(text)
+        f.write(np.ascontiguousarray(data.date, dtype=np.int64).tobytes())
+        for column in data[1:]:
+            f.write(np.ascontiguousarray(column, dtype=np.float64).tobytes())
+    os.replace(tmp, cachefile)
+
+
+def _read_header(cachefile):
+    with open(cachefile, "rb") as f:
+        if f.read(8) != MAGIC:
+            raise ValueError("Not a feed cache file: %s" % cachefile)
+        length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        return json.loads(f.read(length)), 16 + length
+
+
+def _map(cachefile, offset, rows):
+    if not rows:
+        return OHLCV(np.empty(0, dtype=np.int64), *np.empty((6, 0)))
+    date = np.memmap(cachefile, dtype=np.int64, mode="r", offset=offset, shape=(rows,))
+    columns = np.memmap(
+        cachefile, dtype=np.float64, mode="r", offset=offset + 8 * rows, shape=(6, rows)
+    )
+    return OHLCV(date, *columns)
+
+
+def build_cache(path, cachedir=None, adjclose=True):
+    """
+    Parse a Yahoo format csv file and write its cache file.
+
+    Rows are sorted by date, so newest first files need no `reverse`.
+
+    Args:
+        path (str): Yahoo format csv file.
+        cachedir (str): cache directory (default: `.feedcache` next to the csv).
+        adjclose (bool): back-adjusted (default) or raw prices.
+
+    Returns:
+        str: the cache file path.
+    """
+    cachefile = cache_path(path, cachedir, adjclose)
+    stamp = _stamp(path)
+    data = load_yahoo_csv(path, adjclose=adjclose)
+
+    header = dict(
+        version=VERSION,
+        source=os.path.abspath(path),
+        adjclose=adjclose,
+        rows=len(data.date),
+    )
+    header.update(stamp)
+    _write(cachefile, header, data)
+    return cachefile
+
+
+def load_cached(
+    path, cachedir=None, fromdate=None, todate=None, verify=False, adjclose=True
+):
+    """
+    Load a csv file through its cache, building or rebuilding it when needed.
+
+    The cache is used as is when the source mtime and size match
+    (and its sha1 too, if `verify`). When only the mtime changed,
+    the sha1 decides: same content refreshes the stamp without parsing.
+
+    Args:
+        path (str): Yahoo format csv file.
+        cachedir (str): cache directory (default: `.feedcache` next to the csv).
+        fromdate (datetime.date): do not load bars before this date.
+        todate (datetime.date): do not load bars after this date.
+        verify (bool): always compare the source sha1.
+        adjclose (bool): back-adjusted (default) or raw prices.
+
+    Returns:
+        OHLCV: memory-mapped column arrays sorted by ascending date.
+    """
+    cachefile = cache_path(path, cachedir, adjclose)
+    header = None
+    if os.path.exists(cachefile):
+        header, offset = _read_header(cachefile)
+        st = os.stat(path)
+        same = (
+            header.get("version") == VERSION
+            and header["mtime_ns"] == st.st_mtime_ns
+            and header["size"] == st.st_size
+        )
+        if not same or verify:
+            sha1 = _sha1(path)
+            if header.get("version") != VERSION or header["sha1"] != sha1:
+                header = None
+            elif not same:
+                data = _map(cachefile, offset, header["rows"])
+                header.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+                _write(cachefile, header, OHLCV(*(np.array(c) for c in data)))
+
+    if header is None:
+        build_cache(path, cachedir, adjclose)
+
+    header, offset = _read_header(cachefile)
+    data = _map(cachefile, offset, header["rows"])
+
+    lo, hi = date_bounds(fromdate, todate)
+    first, last = np.searchsorted(data.date, [lo, hi + 1])
+    return OHLCV(*(column[first:last] for column in data))
+
+
+def _build_one(job):
+    path, cachedir, adjclose = job
+    load_cached(path, cachedir, adjclose=adjclose)
+    return path
+
+
+def build_caches(
+    directory,
+    cachedir=None,
+    processes=None,
+    variants=(True, False),
+    patterns=("*.csv", "*.txt"),
+):
+    """
+    Build (or refresh) the cache files of every csv file of a directory,
+    on a process pool; up to date caches are left alone.
+
+    Args:
+        directory (str): directory of Yahoo format csv files.
+        cachedir (str): cache directory (default: `.feedcache` in `directory`).
+        processes (int): worker processes (default: cpu count).
+        variants (tuple of bool): `adjclose` values to build.
+        patterns (tuple): file name patterns to include.
+
+    Returns:
+        int: number of csv files.
+    """
+    paths = [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if any(fnmatch.fnmatch(name, p) for p in patterns)
+        and os.path.isfile(os.path.join(directory, name))
+    ]
+    jobs = [(path, cachedir, adjclose) for path in paths for adjclose in variants]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        for _ in executor.map(_build_one, jobs, chunksize=8):
+            pass
+    return len(paths)
+
+
+class CachedCSVData(ArrayData):
+    """
+    Yahoo format csv data feed read through the binary cache.
+
+    A drop-in for `bt.feeds.YahooFinanceCSVData` (with default rounding);
+    the `reverse` parameter is not needed.
+
+    Args:
+        dataname (str): csv file path.
+        cachedir (str): cache directory (default: `.feedcache` next to the csv).
+        verify (bool): always compare the source sha1.
+        adjclose (bool): back-adjusted (default) or raw prices.
+    """
+
+    params = (("cachedir", None), ("verify", False), ("adjclose", True))
+
+    def _getdata(self):
+        return load_cached(
+            self.p.dataname,
+            self.p.cachedir,
+            verify=self.p.verify,
+            adjclose=self.p.adjclose,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("directory", help="directory of Yahoo format csv files")
+    parser.add_argument("--cachedir", default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    variants = parser.add_mutually_exclusive_group()
+    variants.add_argument("--adjusted-only", action="store_true")
+    variants.add_argument("--raw-only", action="store_true")
+    args = parser.parse_args(argv)
+
+    variants = (True, False)
+    if args.adjusted_only:
+        variants = (True,)
+    elif args.raw_only:
+        variants = (False,)
+    count = build_caches(args.directory, args.cachedir, args.processes, variants)
+    print("%d files cached" % count)
+
+
+if __name__ == "__main__":
+    main()
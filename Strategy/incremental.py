@@ -0,0 +1,680 @@
+"""
+Incremental backtest of the zwpy_sta strategies, resumable from a checkpoint.
+
+`IncrementalBacktest` processes bars one at a time with streaming
+indicators (EMA accumulators, SumN / Highest / Lowest windows) and the
+same order logic as `vectorized.run_vectorized`. Its whole state
+(indicators, position, pending order, cash) pickles to a checkpoint,
+so a later run only processes the bars added since, with the same
+signals and fills as a full re-run. A checkpoint also records the
+strategy, its params, the broker settings and the data file; resuming
+it with other ones raises ValueError. It also keeps the last bars it
+processed, and `update` refuses data that rewrote them (prices
+back-adjusted again after a dividend or split): use raw prices
+(`--raw`) for runs that are resumed while the data keeps growing.
+
+Example (nightly):
+    python -m Strategy.incremental RsiStrategy ./data/orcl.csv \\
+        --checkpoint ./orcl-rsi.ckpt --param period=14 kbuy=70 ksell=30
+"""
+import argparse
+import ast
+import collections
+import datetime
+import math
+import os
+import pickle
+
+from Strategy import zwpy_sta
+from Strategy.vectorized import Trade, strategy_params
+
+NAN = float("nan")
+
+# format of the checkpoint files written by `IncrementalBacktest.save`
+CHECKPOINT_VERSION = 2
+
+Order = collections.namedtuple("Order", ["side", "size", "created"])
+Order.__doc__ = """
+    An order created at a bar's close, to fill at the next bar's open.
+
+    Args:
+        side (str): "buy" or "sell".
+        size (int): number of shares.
+        created (int): bar index where it was created.
+    """
+
+
+def _div(a, b):
+    # NumPy semantics: x / 0 is +-inf, 0 / 0 is nan
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+# ===== streaming indicators =====
+# Each is called with the newest input value and returns the newest output,
+# with the same values as the functions of indicators.py.
+
+
+class SumN(object):
+    """Moving sum (math.fsum over the window), nan until the window is full."""
+
+    def __init__(self, period):
+        self.window = collections.deque(maxlen=period)
+
+    def __call__(self, x):
+        self.window.append(x)
+        if len(self.window) < self.window.maxlen:
+            return NAN
+        return math.fsum(self.window)
+
+
+class SMA(SumN):
+    """Simple moving average."""
+
+    def __call__(self, x):
+        return super(SMA, self).__call__(x) / self.window.maxlen
+
+
+class Highest(SumN):
+    """Highest value over the window."""
+
+    def __call__(self, x):
+        self.window.append(x)
+        return max(self.window) if len(self.window) == self.window.maxlen else NAN
+
+
+class Lowest(SumN):
+    """Lowest value over the window."""
+
+    def __call__(self, x):
+        self.window.append(x)
+        return min(self.window) if len(self.window) == self.window.maxlen else NAN
+
+
+class EMA(object):
+    """Exponential moving average seeded with the SMA of the first valid values."""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (1.0 + period)
+        self.alpha1 = 1.0 - self.alpha
+        self.seed = []
+        self.prev = None
+
+    def __call__(self, x):
+        if self.prev is not None:
+            self.prev = self.prev * self.alpha1 + x * self.alpha
+            return self.prev
+        if self.seed or x == x:
+            self.seed.append(x)
+            if len(self.seed) == self.period:
+                self.prev = math.fsum(self.seed) / self.period
+                self.seed = []
+                return self.prev
+        return NAN
+
+
+class BBands(object):
+    """Bollinger bands, returns (mid, top, bot)."""
+
+    def __init__(self, period, devfactor=2.0):
+        self.mid = SMA(period)
+        self.meansq = SMA(period)
+        self.devfactor = devfactor
+
+    def __call__(self, x):
+        mid = self.mid(x)
+        meansq = self.meansq(x ** 2)
+        stddev = self.devfactor * abs(meansq - mid ** 2) ** 0.5
+        return mid, mid + stddev, mid - stddev
+
+
+class MACD(object):
+    """MACD, returns (macd, signal)."""
+
+    def __init__(self, period_me1=12, period_me2=26, period_signal=9):
+        self.me1 = EMA(period_me1)
+        self.me2 = EMA(period_me2)
+        self.signal = EMA(period_signal)
+
+    def __call__(self, x):
+        line = self.me1(x) - self.me2(x)
+        return line, self.signal(line)
+
+
+class StochasticFast(object):
+    """StochasticFast with EMA smoothing and safediv, returns (k, d)."""
+
+    def __init__(self, period=1, period_dfast=3):
+        self.highest = Highest(period)
+        self.lowest = Lowest(period)
+        self.dfast = EMA(period_dfast)
+
+    def __call__(self, high, low, close):
+        hh, ll = self.highest(high), self.lowest(low)
+        knum, kden = close - ll, hh - ll
+        if kden != kden:
+            k = NAN
+        else:
+            k = 100.0 * (knum / kden) if kden != 0 else 0.0
+        return k, self.dfast(k)
+
+
+class RSI(object):
+    """RSI with EMA smoothing (safediv=False)."""
+
+    def __init__(self, period=14):
+        self.up = EMA(period)
+        self.down = EMA(period)
+        self.last = None
+
+    def __call__(self, x):
+        diff = x - self.last if self.last is not None else NAN
+        self.last = x
+        upday = max(diff, 0.0) if diff == diff else NAN
+        downday = max(-diff, 0.0) if diff == diff else NAN
+        rs = _div(self.up(upday), self.down(downday))
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+class CrossOver(object):
+    """Crossover of two lines: 1, -1 or 0."""
+
+    def __init__(self):
+        self.nzd = None
+
+    def __call__(self, a, b):
+        diff = a - b
+        before = self.nzd if self.nzd is not None else NAN
+        if self.nzd is None or diff != 0 or diff != diff:
+            self.nzd = diff
+        if before < 0.0 and a > b:
+            return 1
+        if before > 0.0 and a < b:
+            return -1
+        return 0
+
+
+# ===== strategy signals =====
+# Each class takes the merged strategy params; calling it with a bar
+# (open, high, low, close, volume) returns the (buy, sell) conditions
+# of `vectorized.SIGNALS`.
+
+
+class _Tim0Signals(object):
+    def __init__(self, p):
+        self.minperiod = 1
+
+    def __call__(self, o, h, l, c, v):
+        return True, False
+
+
+class _SmaSignals(object):
+    def __init__(self, p):
+        self.minperiod = p["maperiod"]
+        self.sma = SMA(p["maperiod"])
+
+    def __call__(self, o, h, l, c, v):
+        ma = self.sma(c)
+        return c > ma, c < ma
+
+
+class _CmaSignals(_SmaSignals):
+    def __init__(self, p):
+        super(_CmaSignals, self).__init__(p)
+        self.lags = collections.deque([(NAN, NAN)] * 2, maxlen=2)
+
+    def __call__(self, o, h, l, c, v):
+        ma = self.sma(c)
+        ma_lag2, close_lag2 = self.lags[0]
+        self.lags.append((ma, c))
+        up = (c > ma) and (close_lag2 < ma_lag2) and (c > close_lag2)
+        down = (c < ma) and (close_lag2 > ma_lag2) and (c < close_lag2)
+        return up, down
+
+
+class _VwapSignals(object):
+    def __init__(self, p):
+        self.minperiod = p["maperiod"]
+        self.kvwap = p["kvwap"]
+        self.typprice = SumN(p["maperiod"])
+        self.volume = SumN(p["maperiod"])
+
+    def __call__(self, o, h, l, c, v):
+        vw = _div(self.typprice(((c + h + l) / 3) * v), self.volume(v))
+        ok = vw > 0
+        buy = ok and c > vw * (1 + self.kvwap)
+        sell = ok and c < vw * (1 - self.kvwap) and c > 0
+        return buy, sell
+
+
+class _BBandsSignals(object):
+    def __init__(self, p):
+        self.minperiod = p["BBandsperiod"]
+        self.bbands = BBands(p["BBandsperiod"])
+
+    def __call__(self, o, h, l, c, v):
+        _, top, bot = self.bbands(c)
+        return c < bot, c > top
+
+
+class _TurSignals(object):
+    def __init__(self, p):
+        self.minperiod = max(p["n_high"], p["n_low"])
+        self.highest = Highest(p["n_high"])
+        self.lowest = Lowest(p["n_low"])
+        self.last = (NAN, NAN)
+
+    def __call__(self, o, h, l, c, v):
+        hh, ll = self.last
+        self.last = (self.highest(h), self.lowest(l))
+        return c > hh, c < ll
+
+
+class _MacdV1Signals(object):
+    def __init__(self, p):
+        slow = max(p["fast_period"], p["slow_period"])
+        self.minperiod = slow + p["signal_period"] - 1
+        self.macd = MACD(p["fast_period"], p["slow_period"], p["signal_period"])
+
+    def __call__(self, o, h, l, c, v):
+        line, _ = self.macd(c)
+        return line > 0, line < 0
+
+
+class _MacdV2Signals(_MacdV1Signals):
+    def __call__(self, o, h, l, c, v):
+        line, signal = self.macd(c)
+        return line > signal, line < signal
+
+
+class _KdjV1Signals(object):
+    def __init__(self, p):
+        self.minperiod = p["period_dfast"]
+        self.kd = StochasticFast(1, p["period_dfast"])
+
+    def __call__(self, o, h, l, c, v):
+        k, _ = self.kd(h, l, c)
+        return k > 90, k < 10
+
+
+class _KdjV2Signals(_KdjV1Signals):
+    def __init__(self, p):
+        super(_KdjV2Signals, self).__init__(p)
+        self.minperiod = p["period_dfast"] + 1
+        self.cross = CrossOver()
+
+    def __call__(self, o, h, l, c, v):
+        k, d = self.kd(h, l, c)
+        cross = self.cross(k, d)
+        return cross == 1, cross == -1
+
+
+class _RsiSignals(object):
+    def __init__(self, p):
+        self.minperiod = p["period"] + 1
+        self.kbuy, self.ksell = p["kbuy"], p["ksell"]
+        self.rsi = RSI(p["period"])
+
+    def __call__(self, o, h, l, c, v):
+        r = self.rsi(c)
+        return r > self.kbuy, r < self.ksell
+
+
+SIGNALS = {
+    zwpy_sta.Tim0Strategy: _Tim0Signals,
+    zwpy_sta.SmaStrategy: _SmaSignals,
+    zwpy_sta.CmaStrategy: _CmaSignals,
+    zwpy_sta.VwapStrategy: _VwapSignals,
+    zwpy_sta.BBandsStrategy: _BBandsSignals,
+    zwpy_sta.TurStrategy: _TurSignals,
+    zwpy_sta.MacdV1Strategy: _MacdV1Signals,
+    zwpy_sta.MacdV2Strategy: _MacdV2Signals,
+    zwpy_sta.KdjV1Strategy: _KdjV1Signals,
+    zwpy_sta.KdjV2Strategy: _KdjV2Signals,
+    zwpy_sta.RsiStrategy: _RsiSignals,
+}
+
+
+# ===== backtest =====
+
+
+class IncrementalBacktest(object):
+    """
+    Bar by bar backtest whose state can be saved and resumed.
+
+    Fills, sizing and margin checks are those of `run_vectorized`
+    (and so of `cerebro.run()` with `PercentSizerInt`).
+
+    Args:
+        strategy (type): a strategy class from zwpy_sta.
+        cash (float): starting cash.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio.
+        params: overrides of the strategy params.
+
+    Attributes:
+        source (str): absolute path of the data file, None if unknown;
+            kept in the checkpoint to check resumed runs.
+        bars (int): bars processed so far.
+        date (int): date ordinal of the last processed bar.
+        cash (float): cash after the last bar.
+        size (int): position size.
+        order (Order): order created at the last bar, None if none.
+        trades (list of Trade): trades so far (the open one has no exit).
+        value (float): portfolio value at the last close.
+        recent (deque of tuple): (date, open, high, low, close, volume) of
+            the last `minperiod` bars processed, to check resumed data.
+    """
+
+    def __init__(self, strategy, cash=10000.0, percents=90, commission=0.0, **params):
+        self.strategy = strategy
+        self.params = strategy_params(strategy, **params)
+        self.start_cash = cash
+        self.percents = percents
+        self.commission = commission
+        self.source = None
+        for cls in strategy.__mro__:
+            if cls in SIGNALS:
+                self.signals = SIGNALS[cls](self.params)
+                break
+        else:
+            raise ValueError("No incremental signals for %s" % strategy.__name__)
+
+        self.bars = 0
+        self.date = None
+        self.cash = cash
+        self.size = 0
+        self.order = None
+        self.trades = []
+        self.value = cash
+        self.recent = collections.deque(maxlen=max(self.signals.minperiod, 1))
+        self._entry = None  # (bar, price, commission) of the open trade
+
+    def _fill(self, o):
+        i, order, comm = self.bars, self.order, self.commission
+        self.order = None
+        if order.side == "buy":
+            left = self.cash - order.size * o
+            fee = order.size * comm * o
+            left -= fee
+            if left < 0.0:  # margin: rejected at execution
+                return
+            self.cash, self.size = left, order.size
+            self._entry = (i, o, fee)
+            self.trades.append(Trade(i, o, None, None, self.size, fee, None, None))
+        else:
+            bar, price, fee = self._entry
+            pnl = self.size * (o - price)
+            exitfee = self.size * comm * o
+            self.cash += self.size * price + pnl
+            self.cash -= exitfee
+            pnlcomm = pnl - fee - exitfee
+            fees = fee + exitfee
+            self.trades[-1] = Trade(bar, price, i, o, self.size, fees, pnl, pnlcomm)
+            self.size, self._entry = 0, None
+
+    def step(self, date, o, h, l, c, v):
+        """
+        Process one bar.
+
+        Returns:
+            Order: the order created at this bar's close, None if none.
+        """
+        if self.order is not None:
+            self._fill(o)
+
+        buy, sell = self.signals(o, h, l, c, v)
+        if self.bars >= self.signals.minperiod - 1:
+            if not self.size and buy:
+                stake = int(self.cash / c * (self.percents / 100))
+                # submission check at the creation price
+                cost = stake * c + stake * self.commission * c
+                if stake and self.cash - cost >= 0.0:
+                    self.order = Order("buy", stake, self.bars)
+            elif self.size and sell:
+                self.order = Order("sell", self.size, self.bars)
+
+        created = self.order
+        self.value = self.cash + self.size * c
+        self.recent.append((date, o, h, l, c, v))
+        self.date = date
+        self.bars += 1
+        return created
+
+    def seen(self, bar):
+        """
+        Whether `bar` (as passed to `step`) is not newer than the last one
+        processed.
+
+        Raises:
+            ValueError: if it is one of the `recent` bars with other
+                values, or a new bar between them.
+        """
+        date = bar[0]
+        if self.date is None or date > self.date:
+            return False
+        if self.recent and date >= self.recent[0][0]:
+            for old in self.recent:
+                if old[0] == date and all(
+                    a == b or (a != a and b != b) for a, b in zip(old, bar)
+                ):
+                    return True
+            raise ValueError(
+                "bar of %s changed since the checkpoint (prices adjusted again?):"
+                " start a new run, or use raw prices"
+                % datetime.date.fromordinal(date)
+            )
+        return True
+
+    def update(self, data):
+        """
+        Process the bars of `data` newer than the last processed one.
+
+        Args:
+            data (OHLCV): price arrays, may include the bars already seen.
+
+        Returns:
+            list of (int, Order): (date ordinal, order) of the orders
+                created by the new bars; the last one may still be pending
+                (`self.order`), to fill at the next bar's open.
+
+        Raises:
+            ValueError: if the bars of `data` already seen differ from
+                the processed ones (e.g. prices adjusted again after a
+                dividend), as the state no longer matches them.
+        """
+        columns = (data.date, data.open, data.high, data.low, data.close, data.volume)
+        first = 0
+        if self.date is not None:
+            # from the oldest bar still in `recent`, to check them again
+            first = int((data.date <= self.date).sum())
+            first -= min(first, len(self.recent))
+        created = []
+        for bar in zip(*(column[first:].tolist() for column in columns)):
+            if self.seen(bar):
+                continue
+            order = self.step(*bar)
+            if order is not None:
+                created.append((bar[0], order))
+        return created
+
+    def save(self, path):
+        """
+        Write the state to a checkpoint file (atomically).
+
+        The file holds a plain dict: the strategy by name, its params,
+        the broker settings, the data file and the bar state.
+        """
+        state = dict(vars(self))
+        del state["strategy"]
+        checkpoint = dict(
+            version=CHECKPOINT_VERSION,
+            strategy=self.strategy.__name__,
+            params=self.params,
+            broker=dict(
+                cash=self.start_cash,
+                percents=self.percents,
+                commission=self.commission,
+            ),
+            source=self.source,
+            state=state,
+        )
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "wb") as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a checkpoint file written by `save`.
+
+        Raises:
+            ValueError: if the file is not a checkpoint of this version.
+        """
+        with open(path, "rb") as f:
+            checkpoint = pickle.load(f)
+        if (
+            not isinstance(checkpoint, dict)
+            or checkpoint.get("version") != CHECKPOINT_VERSION
+        ):
+            raise ValueError(
+                "%s is not a version %d checkpoint" % (path, CHECKPOINT_VERSION)
+            )
+        run = cls.__new__(cls)
+        vars(run).update(checkpoint["state"])
+        run.strategy = getattr(zwpy_sta, checkpoint["strategy"])
+        return run
+
+    def check(self, strategy, cash=10000.0, percents=90, commission=0.0, **params):
+        """
+        Check that this run is the one the arguments would start.
+
+        Raises:
+            ValueError: listing the strategy, params or broker settings
+                that differ.
+        """
+        if strategy is not self.strategy:
+            raise ValueError(
+                "checkpoint was made with strategy %s (asked %s)"
+                % (self.strategy.__name__, strategy.__name__)
+            )
+        wanted = strategy_params(strategy, **params)
+        wanted.update(cash=float(cash), percents=percents, commission=commission)
+        stored = dict(self.params)
+        stored.update(
+            cash=float(self.start_cash),
+            percents=self.percents,
+            commission=self.commission,
+        )
+        diffs = [
+            "%s=%r (asked %r)" % (name, stored[name], wanted[name])
+            for name in wanted
+            if stored.get(name) != wanted[name]
+        ]
+        if diffs:
+            raise ValueError("checkpoint was made with " + ", ".join(diffs))
+
+
+def resume(
+    path, strategy, cash=10000.0, percents=90, commission=0.0, source=None, **params
+):
+    """
+    Load the checkpoint at `path` if it exists, else start a new run.
+
+    Args:
+        path (str): checkpoint file (None: always start a new run).
+        strategy, cash, percents, commission, params: see
+            `IncrementalBacktest`; a checkpoint must have the same.
+        source (str): data file; a checkpoint of another file is
+            refused. None skips the check (e.g. a live stream).
+
+    Raises:
+        ValueError: if the checkpoint does not match the arguments.
+    """
+    if path is None or not os.path.exists(path):
+        run = IncrementalBacktest(
+            strategy, cash=cash, percents=percents, commission=commission, **params
+        )
+        if source is not None:
+            run.source = os.path.abspath(source)
+        return run
+
+    run = IncrementalBacktest.load(path)
+    run.check(strategy, cash=cash, percents=percents, commission=commission, **params)
+    if source is not None:
+        source = os.path.abspath(source)
+        if run.source is not None and run.source != source:
+            raise ValueError(
+                "checkpoint was made with data %s (asked %s)" % (run.source, source)
+            )
+        run.source = source
+    return run
+
+
+def _parse_params(items):
+    """Parse `name=value` command line items."""
+    params = {}
+    for item in items or []:
+        name, _, text = item.partition("=")
+        params[name] = ast.literal_eval(text)
+    return params
+
+
+def main(argv=None):
+    from Strategy.feedcache import load_cached
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("strategy", help="strategy class name in zwpy_sta")
+    parser.add_argument("datapath", help="Yahoo format csv file")
+    parser.add_argument("--checkpoint", required=True, help="state file")
+    parser.add_argument("--param", nargs="+", metavar="NAME=VALUE")
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--percents", type=int, default=90)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="raw prices: not rewritten by later dividends / splits",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        run = resume(
+            args.checkpoint,
+            getattr(zwpy_sta, args.strategy),
+            cash=args.cash,
+            percents=args.percents,
+            commission=args.commission,
+            source=args.datapath,
+            **_parse_params(args.param)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    before = run.bars
+    try:
+        created = run.update(load_cached(args.datapath, adjclose=not args.raw))
+    except ValueError as e:
+        parser.error(str(e))
+    run.save(args.checkpoint)
+
+    print("%d new bars, value %.2f" % (run.bars - before, run.value))
+    for date, order in created:
+        day = datetime.date.fromordinal(date)
+        print("%s %s CREATE, size %d" % (day, order.side.upper(), order.size))
+    if run.order is not None:
+        print("pending: %s %d at next open" % (run.order.side.upper(), run.order.size))
+
+
+if __name__ == "__main__":
+    # run the imported module's main: checkpoints then pickle the signal
+    # classes as Strategy.incremental.*, not __main__.*, so live.py and
+    # other importers can load them
+    from Strategy.incremental import main
+
+    main()
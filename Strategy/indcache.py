@@ -0,0 +1,279 @@
+"""
+Shared indicator cache.
+
+Indicator arrays are computed once per (input data, indicator, params)
+and handed to every consumer: strategies in one cerebro, parameter
+combinations of a sweep, or the vectorized engine. Input data is
+identified by a hash of its values, so separate runs over the same
+feed hit the cache too. Entries are evicted least recently used first
+when the cache grows over its memory budget.
+
+`Shared*` classes are backtrader indicators reading their lines from the
+cache; strategies get them with `BaseStrategyFrame.indicator` when the
+`sharedind` param is True. They need preloaded data (cerebro's default).
+"""
+import array
+import collections
+import hashlib
+
+import backtrader as bt
+import numpy as np
+
+from Strategy import indicators
+
+
+class IndicatorCache(object):
+    """
+    LRU cache of indicator arrays with a memory budget.
+
+    Args:
+        budget (int): max bytes of cached arrays.
+
+    Attributes:
+        hits, misses (int): lookup counters.
+    """
+
+    def __init__(self, budget=256 << 20):
+        self.budget = budget
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def get(self, key, compute):
+        """
+        Return the arrays cached under `key`, calling `compute()` on a miss.
+
+        Cached arrays are read-only, since every consumer shares them.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        value = compute()
+        arrays = value if isinstance(value, tuple) else (value,)
+        for a in arrays:
+            a.flags.writeable = False
+        size = sum(a.nbytes for a in arrays)
+        if size <= self.budget:
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+        return value
+
+    def cached(self, func, *arrays, **params):
+        """
+        `func(*arrays, **params)` through the cache.
+
+        Args:
+            func (callable): an indicator function from indicators.py.
+            arrays (np.ndarray): input arrays, keyed by their values.
+            params: keyword arguments of `func`.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for a in arrays:
+            digest.update(np.ascontiguousarray(a, dtype=np.float64).tobytes())
+            digest.update(repr(np.shape(a)).encode())
+        params_key = tuple(sorted(params.items()))
+        key = (func.__module__, func.__name__, digest.digest(), params_key)
+        return self.get(key, lambda: func(*arrays, **params))
+
+
+# default cache of the process
+CACHE = IndicatorCache()
+
+
+def cached(func, *arrays, **params):
+    """`func(*arrays, **params)` through the default cache `CACHE`."""
+    return CACHE.cached(func, *arrays, **params)
+
+
+def _values(line):
+    return np.frombuffer(line.array[: line.buflen()], dtype=np.float64)
+
+
+class _SharedIndicator(bt.Indicator):
+    """
+    Base of the backtrader indicators read from `CACHE`.
+
+    Subclasses set `kernel` (a function of indicators.py returning one
+    array per line), `_inputs` and `_kwargs`, and `fixed`: params that
+    must keep these values for the kernel to apply.
+    """
+
+    kernel = None
+    fixed = {}
+
+    def __init__(self):
+        self.addminperiod(self._getminperiod())
+        self._cached = None
+        super(_SharedIndicator, self).__init__()
+
+    @classmethod
+    def accepts(cls, kwargs):
+        """Whether the kernel computes the indicator for these params"""
+        return all(kwargs.get(k, v) == v for k, v in cls.fixed.items())
+
+    def _getminperiod(self):
+        return self.p.period
+
+    def _inputs(self):
+        return (self.data,)
+
+    def _kwargs(self):
+        return dict(period=self.p.period)
+
+    def _compute(self):
+        if self._cached is None:
+            inputs = [_values(x) for x in self._inputs()]
+            values = CACHE.cached(type(self).kernel, *inputs, **self._kwargs())
+            self._cached = values if isinstance(values, tuple) else (values,)
+        return self._cached
+
+    def once(self, start, end):
+        for line, values in zip(self.lines, self._compute()):
+            line.array[start:end] = array.array("d", values[start:end].tobytes())
+
+    # lines with a shorter period (e.g. MACD's macd) have values during warm-up
+    preonce = once
+
+    def prenext(self):
+        self.next()
+
+    def next(self):
+        i = len(self) - 1
+        for line, values in zip(self.lines, self._compute()):
+            line[0] = values[i]
+
+
+def _macd(x, **params):
+    # shares the macd and signal arrays with vectorized.py
+    macd, signal = cached(indicators.macd, x, **params)
+    return macd, signal, macd - signal
+
+
+def _like(cls):
+    """Lines, params, plotinfo and plotlines of a backtrader indicator class."""
+    return (
+        cls.lines.getlinealiases(),
+        cls.params._getitems(),
+        dict(cls.plotinfo._getitems()),
+        dict(cls.plotlines._getitems()),
+    )
+
+
+class SharedSMA(_SharedIndicator):
+    """Shared bt.indicators.SimpleMovingAverage"""
+
+    lines, params, plotinfo, plotlines = _like(bt.indicators.SimpleMovingAverage)
+    kernel = staticmethod(indicators.sma)
+
+
+class SharedEMA(_SharedIndicator):
+    """Shared bt.indicators.EMA"""
+
+    lines, params, plotinfo, plotlines = _like(bt.indicators.EMA)
+    kernel = staticmethod(indicators.ema)
+
+
+class SharedHighest(_SharedIndicator):
+    """Shared bt.indicators.Highest"""
+
+    lines, params, plotinfo, plotlines = _like(bt.indicators.Highest)
+    kernel = staticmethod(indicators.highest)
+
+
+class SharedLowest(_SharedIndicator):
+    """Shared bt.indicators.Lowest"""
+
+    lines, params, plotinfo, plotlines = _like(bt.indicators.Lowest)
+    kernel = staticmethod(indicators.lowest)
+
+
+class SharedBBands(_SharedIndicator):
+    """Shared bt.indicators.BBands (SMA based)"""
+
+    lines, params, plotinfo, plotlines = _like(bt.indicators.BBands)
+    kernel = staticmethod(indicators.bbands)
+    fixed = dict(movav=bt.indicators.MovAv.Simple)
+
+    def _kwargs(self):
+        return dict(period=self.p.period, devfactor=self.p.devfactor)
+
+
+class SharedMACD(_SharedIndicator):
+    """Shared bt.indicators.MACD (EMA based)"""
+
+    lines, params, plotinfo, plotlines = _like(bt.indicators.MACD)
+    kernel = staticmethod(_macd)
+    fixed = dict(movav=bt.indicators.MovAv.Exponential)
+
+    def _getminperiod(self):
+        return max(self.p.period_me1, self.p.period_me2) + self.p.period_signal - 1
+
+    def _kwargs(self):
+        return dict(
+            period_me1=self.p.period_me1,
+            period_me2=self.p.period_me2,
+            period_signal=self.p.period_signal,
+        )
+
+
+class SharedStochasticFast(_SharedIndicator):
+    """Shared bt.indicators.StochasticFast with EMA smoothing and safediv"""
+
+    lines, params, plotinfo, plotlines = _like(bt.indicators.StochasticFast)
+    kernel = staticmethod(indicators.stochastic_fast)
+    fixed = dict(movav=bt.indicators.EMA, safediv=True, safezero=0.0)
+
+    def _getminperiod(self):
+        return self.p.period + self.p.period_dfast - 1
+
+    def _inputs(self):
+        return (self.data.high, self.data.low, self.data.close)
+
+    def _kwargs(self):
+        return dict(period=self.p.period, period_dfast=self.p.period_dfast)
+
+
+class SharedRSI(_SharedIndicator):
+    """Shared bt.indicators.RelativeStrengthIndex with EMA smoothing"""
+
+    lines, params, plotinfo, plotlines = _like(bt.indicators.RelativeStrengthIndex)
+    kernel = staticmethod(indicators.rsi)
+    fixed = dict(movav=bt.indicators.EMA, safediv=False, lookback=1)
+
+    def _getminperiod(self):
+        return self.p.period + 1
+
+
+SHARED = {
+    bt.indicators.SimpleMovingAverage: SharedSMA,
+    bt.indicators.EMA: SharedEMA,
+    bt.indicators.Highest: SharedHighest,
+    bt.indicators.Lowest: SharedLowest,
+    bt.indicators.BBands: SharedBBands,
+    bt.indicators.MACD: SharedMACD,
+    bt.indicators.StochasticFast: SharedStochasticFast,
+    bt.indicators.RelativeStrengthIndex: SharedRSI,
+}
+
+
+def shared(cls, kwargs):
+    """The shared version of a backtrader indicator class, or `cls` itself"""
+    sharedcls = SHARED.get(cls)
+    if sharedcls is not None and sharedcls.accepts(kwargs):
+        return sharedcls
+    return cls
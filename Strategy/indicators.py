@@ -0,0 +1,245 @@
+"""
+NumPy implementations of the indicators used in zwpy_sta.
+
+Each function takes whole arrays and returns arrays with NaN before the
+indicator's minimum period. Values are the same as the backtrader
+indicators (moving sums use `math.fsum`, EMAs are seeded with the SMA
+and recursed like backtrader), so threshold comparisons agree bit for bit.
+
+Inputs may also be 2D (symbols x bars, see universe.py): each row is
+computed along the last axis, with the same values as the row alone,
+but in one pass over the matrix (EMAs loop over bars, not over symbols).
+"""
+import collections
+import math
+
+import numpy as np
+
+from Strategy.utils import rolling_fsum
+
+
+def _empty(shape):
+    return np.full(shape, np.nan)
+
+
+def _pow(x, exponent):
+    # Python's pow, as backtrader lines use: numpy's x ** 2 and x ** 0.5
+    # take the x * x and sqrt fast paths, which may differ in the last bit
+    values = x.ravel().tolist()
+    out = np.fromiter((v ** exponent for v in values), np.float64, len(values))
+    return out.reshape(x.shape)
+
+
+def lag(x, ago):
+    # like line[-ago] on a preloaded buffer (wraps around at the start)
+    return np.roll(x, ago, axis=-1)
+
+
+def _two_sum(a, b):
+    # a + b as the rounded sum and its exact rounding error
+    s = a + b
+    bv = s - a
+    return s, (a - (s - bv)) + (b - bv)
+
+
+def _rolling_fsum_rows(x, period):
+    # Window sums of every row at once, with error free (two-sum) additions
+    # whose rounding errors are summed apart and added last: math.fsum's
+    # result unless the errors themselves round off, which needs values
+    # about 2**50 times apart (prices never are). Small matrices add the
+    # window's columns (period passes over the matrix); large ones take
+    # differences of double-double prefix sums (one loop over the bars,
+    # whatever the number of rows).
+    rows, n = x.shape
+    if rows * (period - 1) <= 2048:
+        width = n - period + 1
+        total, errors = x[:, :width], 0.0
+        for k in range(1, period):
+            total, error = _two_sum(total, x[:, k : k + width])
+            errors = errors + error
+        return total + errors
+
+    missing = np.isnan(x)
+    xt = np.ascontiguousarray(np.where(missing, 0.0, x).T)
+    hi = np.zeros((n + 1, rows))
+    lo = np.zeros((n + 1, rows))
+    for i in range(n):
+        hi[i + 1], error = _two_sum(hi[i], xt[i])
+        np.add(lo[i], error, out=lo[i + 1])
+    total, error = _two_sum(hi[period:], -hi[:-period])
+    out = (total + ((lo[period:] - lo[:-period]) + error)).T
+    if missing.any():
+        counts = np.cumsum(missing, axis=1)
+        counts = counts[:, period - 1 :] - np.pad(counts, ((0, 0), (1, 0)))[:, :-period]
+        out[counts > 0] = np.nan
+    return out
+
+
+def sumn(x, period):
+    """Moving sum, same as bt.ind.SumN (math.fsum over the window)."""
+    out = _empty(x.shape)
+    if x.shape[-1] < period:
+        return out
+    if x.ndim == 2:
+        out[:, period - 1 :] = _rolling_fsum_rows(x, period)
+    else:
+        out[period - 1 :] = rolling_fsum(x.tolist(), period)
+    return out
+
+
+def sma(x, period):
+    """Simple moving average, same as bt.indicators.SimpleMovingAverage."""
+    return sumn(x, period) / period
+
+
+def ema(x, period):
+    """
+    Exponential moving average, same as bt.indicators.EMA.
+
+    The first value is the SMA of the first `period` valid values,
+    then `prev * (1 - alpha) + x * alpha`.
+    """
+    if x.ndim == 2:
+        return _ema_rows(x, period)
+    out = _empty(len(x))
+    valid = np.flatnonzero(~np.isnan(x))
+    if not len(valid):
+        return out
+    start = valid[0] + period - 1
+    if start >= len(x):
+        return out
+
+    alpha = 2.0 / (1.0 + period)
+    alpha1 = 1.0 - alpha
+    values = x.tolist()
+    prev = math.fsum(values[start - period + 1 : start + 1]) / period
+    res = [prev]
+    for v in values[start + 1 :]:
+        prev = prev * alpha1 + v * alpha
+        res.append(prev)
+    out[start:] = res
+    return out
+
+
+def _ema_rows(x, period):
+    # the recursion of `ema` for all rows at once, bar by bar: one set of
+    # array operations per bar whatever the number of rows
+    rows, n = x.shape
+    valid = ~np.isnan(x)
+    starts = np.where(valid.any(axis=1), valid.argmax(axis=1) + period - 1, n)
+    seeds = collections.defaultdict(list)
+    for row, start in enumerate(starts.tolist()):
+        if start < n:
+            seeds[start].append(row)
+    out = _empty((n, rows))
+    if not seeds:
+        return out.T
+
+    alpha = 2.0 / (1.0 + period)
+    alpha1 = 1.0 - alpha
+    xt = np.ascontiguousarray(x.T)
+    prev = _empty(rows)
+    tmp = np.empty(rows)
+    for i in range(min(seeds), n):
+        np.multiply(prev, alpha1, out=prev)
+        np.multiply(xt[i], alpha, out=tmp)
+        prev += tmp
+        for row in seeds.get(i, ()):
+            prev[row] = math.fsum(x[row, i - period + 1 : i + 1].tolist()) / period
+        out[i] = prev
+    return out.T
+
+
+def _rolling_extreme(func, x, period):
+    # func (np.maximum / np.minimum) over windows of powers of two, doubled
+    # log2(period) times, then two overlapping ones cover the period
+    out = _empty(x.shape)
+    n = x.shape[-1]
+    if n < period:
+        return out
+    acc, span = x, 1
+    while span * 2 <= period:
+        acc = func(acc[..., span:], acc[..., :-span])
+        span *= 2
+    # acc[..., j] covers x[..., j : j + span]
+    out[..., period - 1 :] = func(acc[..., period - span :], acc[..., : n - period + 1])
+    return out
+
+
+def highest(x, period):
+    """Highest value over the window, same as bt.indicators.Highest."""
+    return _rolling_extreme(np.maximum, x, period)
+
+
+def lowest(x, period):
+    """Lowest value over the window, same as bt.indicators.Lowest."""
+    return _rolling_extreme(np.minimum, x, period)
+
+
+def vwap(high, low, close, volume, period):
+    """Volume weighted average price, same as utils.VolumeWeightedAveragePrice."""
+    typprice = ((close + high + low) / 3) * volume
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return sumn(typprice, period) / sumn(volume, period)
+
+
+def bbands(x, period, devfactor=2.0):
+    """
+    Bollinger bands, same as bt.indicators.BBands.
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray): mid, top, bot.
+    """
+    mid = sma(x, period)
+    meansq = sma(_pow(x, 2), period)
+    stddev = devfactor * _pow(np.abs(meansq - _pow(mid, 2)), 0.5)
+    return mid, mid + stddev, mid - stddev
+
+
+def macd(x, period_me1=12, period_me2=26, period_signal=9):
+    """
+    MACD, same as bt.indicators.MACD.
+
+    Returns:
+        (np.ndarray, np.ndarray): macd, signal.
+    """
+    line = ema(x, period_me1) - ema(x, period_me2)
+    return line, ema(line, period_signal)
+
+
+def stochastic_fast(high, low, close, period=1, period_dfast=3):
+    """
+    StochasticFast with EMA smoothing and safediv, as used by the kdj strategies.
+
+    Returns:
+        (np.ndarray, np.ndarray): percK, percD.
+    """
+    knum = close - lowest(low, period)
+    kden = highest(high, period) - lowest(low, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = 100.0 * np.where(kden != 0, knum / kden, 0.0)
+    k[np.isnan(kden)] = np.nan
+    return k, ema(k, period_dfast)
+
+
+def rsi(x, period=14):
+    """RSI with EMA smoothing (safediv=False), as used by RsiStrategy."""
+    diff = x - lag(x, 1)
+    diff[..., 0] = np.nan
+    upday = np.maximum(diff, 0.0)
+    downday = np.maximum(-diff, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = ema(upday, period) / ema(downday, period)
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+def crossover(a, b):
+    """Crossover of two lines, same as bt.indicators.CrossOver (1, -1 or 0)."""
+    diff = a - b
+    # NonZeroDifference: carry the last non zero difference forward
+    idx = np.where((diff != 0) | np.isnan(diff), np.arange(diff.shape[-1]), 0)
+    nzd = np.take_along_axis(diff, np.maximum.accumulate(idx, axis=-1), axis=-1)
+    before = lag(nzd, 1)
+    up = (before < 0.0) & (a > b)
+    down = (before > 0.0) & (a < b)
+    return up.astype(np.float64) - down.astype(np.float64)
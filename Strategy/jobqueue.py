@@ -0,0 +1,441 @@
+"""
+Distributed sweeps through a job queue in a SQLite file.
+
+`submit` stores one job per (symbol file, parameter combination). Any
+number of `work` processes, on any hosts that share the queue file's
+filesystem, lease jobs one at a time, run them like `batch` does and
+write the results back to the queue. A worker extends its lease with a
+heartbeat while a job runs; the job of a worker that died (no heartbeat
+for `lease` seconds) is leased again by another worker, up to
+`max_attempts` times, like a job that raised.
+
+Leases use wall-clock time, so hosts need synchronized clocks. SQLite
+needs working file locks on the shared filesystem (NFS with lockd, ...).
+
+Example:
+    python -m Strategy.jobqueue submit sweep.db RsiStrategy ./sample_data \\
+        --grid period=10,14,20 kbuy=70,80 ksell=20,30
+    python -m Strategy.jobqueue work sweep.db --processes 4   # on every host
+    python -m Strategy.jobqueue status sweep.db
+    python -m Strategy.jobqueue results sweep.db --top 10
+"""
+import argparse
+import collections
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from Strategy import zwpy_sta
+from Strategy.batch import ENGINES, _run_symbol, symbols
+from Strategy.sweep import _parse_date, _parse_space, format_table, grid
+from Strategy.vectorized import strategy_params
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+"""
+
+NAN = float("nan")
+
+Job = collections.namedtuple("Job", ["id", "payload", "attempt"])
+Job.__doc__ = """
+    A leased job.
+
+    Args:
+        id (int): job id.
+        payload (dict): what to run (see `submit_sweep`).
+        attempt (int): 1 for the first lease, 2 for the first retry, ...
+    """
+
+
+def worker_name():
+    """`host:pid` of the current process."""
+    return "%s:%d" % (socket.gethostname(), os.getpid())
+
+
+class JobQueue(object):
+    """
+    Jobs table of a SQLite file, one connection per process (or thread).
+
+    A job goes pending -> leased -> done, or back to pending when its
+    lease expires or it fails, until `max_attempts`; then it is failed.
+
+    Args:
+        path (str): SQLite file, created if needed.
+        lease (float): seconds a lease lasts without a heartbeat.
+        max_attempts (int): leases of a job before it is failed.
+    """
+
+    def __init__(self, path, lease=60.0, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease
+        self.max_attempts = max_attempts
+        self._db = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def submit(self, payloads):
+        """Add jobs; returns how many."""
+        rows = [(json.dumps(p, sort_keys=True),) for p in payloads]
+        with self._transaction():
+            self._db.executemany("INSERT INTO jobs (payload) VALUES (?)", rows)
+        return len(rows)
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front: two workers
+        # never read the same free job and both lease it
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def lease(self, worker):
+        """
+        Lease the next free job: pending, or leased with an expired lease.
+
+        Returns:
+            Job, or None when no job is free.
+        """
+        now = time.time()
+        with self._transaction():
+            while True:
+                row = self._db.execute(
+                    "SELECT id, payload, attempts FROM jobs WHERE status = 'pending'"
+                    " OR (status = 'leased' AND lease_until < ?) ORDER BY id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, payload, attempts = row
+                if attempts >= self.max_attempts:
+                    # its last worker died: no retry left
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished = ?"
+                        " WHERE id = ?",
+                        ("lease expired %d times" % attempts, now, job_id),
+                    )
+                    continue
+                self._db.execute(
+                    "UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?,"
+                    " attempts = attempts + 1 WHERE id = ?",
+                    (worker, now + self.lease_seconds, job_id),
+                )
+                return Job(job_id, json.loads(payload), attempts + 1)
+
+    def heartbeat(self, job_id, worker):
+        """Extend a lease; False if the worker no longer holds it."""
+        cursor = self._db.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ?"
+            " AND status = 'leased'",
+            (time.time() + self.lease_seconds, job_id, worker),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        """Store a job's result; False (and nothing stored) if the lease was lost."""
+        cursor = self._db.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished = ?"
+            " WHERE id = ? AND worker = ? AND status = 'leased'",
+            (json.dumps(result), time.time(), job_id, worker),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """Give a job back for a retry, or fail it after `max_attempts`."""
+        cursor = self._db.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'pending'"
+            " ELSE 'failed' END, error = ?, finished = ?"
+            " WHERE id = ? AND worker = ? AND status = 'leased'",
+            (self.max_attempts, error, time.time(), job_id, worker),
+        )
+        return cursor.rowcount == 1
+
+    def counts(self):
+        """Jobs per status, e.g. {"pending": 10, "leased": 4, "done": 86}."""
+        rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(rows.fetchall())
+
+    def unfinished(self):
+        """Number of jobs pending or leased."""
+        counts = self.counts()
+        return counts.get("pending", 0) + counts.get("leased", 0)
+
+    def results(self):
+        """
+        Finished jobs as rows (dicts with the same keys): the payload's
+        symbol and params, then the result (bars, value, trades, drawdown)
+        or the error of a failed job.
+        """
+        rows = []
+        cursor = self._db.execute(
+            "SELECT id, payload, status, attempts, result, error FROM jobs"
+            " WHERE status IN ('done', 'failed') ORDER BY id"
+        )
+        for job_id, payload, status, attempts, result, error in cursor:
+            payload = json.loads(payload)
+            row = dict(job=job_id, symbol=payload["symbol"], status=status)
+            row.update(payload["params"])
+            row.update(bars=0, value=NAN, trades=0, drawdown=NAN)
+            if result:
+                row.update(json.loads(result))
+            row.update(attempts=attempts, error=error or "")
+            rows.append(row)
+        return rows
+
+
+def submit_sweep(
+    queue,
+    strategy,
+    paths,
+    space,
+    engine="vectorized",
+    fromdate=None,
+    todate=None,
+    cachedir=None,
+    cash=10000.0,
+    percents=90,
+    commission=0.0,
+    adjclose=True,
+):
+    """
+    Add one job per (symbol file, parameter combination) of a grid.
+
+    Args:
+        queue (JobQueue): the queue.
+        strategy (str): strategy class name in zwpy_sta.
+        paths (list of (str, str)): (symbol, csv path), see `batch.symbols`.
+            Paths must be valid on every worker host.
+        space (dict): param name -> list of values, see `sweep.grid`.
+        engine (str): a `batch.ENGINES` name.
+        fromdate, todate (datetime.date): date range of every feed.
+        cachedir (str): feed cache directory (default: next to the csv).
+        cash, percents, commission: broker settings.
+        adjclose (bool): back-adjusted (default) or raw prices.
+
+    Returns:
+        int: number of jobs added.
+    """
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine %r" % engine)
+    combos = grid(**space)
+    for params in combos:
+        strategy_params(getattr(zwpy_sta, strategy), **params)  # fail early
+    dates = [d.isoformat() if d else None for d in (fromdate, todate)]
+    broker = dict(cash=cash, percents=percents, commission=commission)
+    return queue.submit(
+        dict(
+            strategy=strategy,
+            symbol=symbol,
+            path=os.path.abspath(path),
+            params=params,
+            broker=broker,
+            engine=engine,
+            dates=dates,
+            cachedir=cachedir,
+            adjclose=adjclose,
+        )
+        for symbol, path in paths
+        for params in combos
+    )
+
+
+def run_job(payload):
+    """
+    Run a job payload with `batch`'s engines.
+
+    Returns:
+        dict: the `batch` result row without the symbol (status, bars,
+            value, trades, drawdown, error).
+    """
+    dates = [_parse_date(d[:10]) if d else None for d in payload["dates"]]
+    row = _run_symbol(
+        (
+            payload["symbol"],
+            payload["path"],
+            getattr(zwpy_sta, payload["strategy"]),
+            payload["params"],
+            payload["broker"],
+            payload["engine"],
+            dates,
+            payload["cachedir"],
+            payload["adjclose"],
+        )
+    )
+    del row["symbol"]
+    return row
+
+
+class _Heartbeat(threading.Thread):
+    """Extends a job's lease every `lease / 3` seconds, on its own connection."""
+
+    def __init__(self, path, lease, job_id, worker):
+        super(_Heartbeat, self).__init__(daemon=True)
+        self.args = (path, lease, job_id, worker)
+        self.stopped = threading.Event()
+
+    def run(self):
+        path, lease, job_id, worker = self.args
+        queue = JobQueue(path, lease)
+        try:
+            while not self.stopped.wait(lease / 3.0):
+                if not queue.heartbeat(job_id, worker):
+                    break
+        finally:
+            queue.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def work(path, worker=None, lease=60.0, max_attempts=3, poll=1.0, wait=False):
+    """
+    Lease and run jobs until none is left.
+
+    Args:
+        path (str): SQLite queue file.
+        worker (str): worker name (default: `host:pid`).
+        lease (float): lease seconds, extended by a heartbeat while a job runs.
+        max_attempts (int): leases of a job before it is failed.
+        poll (float): seconds between lease attempts when no job is free
+            but some are leased (their worker may die).
+        wait (bool): keep polling for new jobs when the queue is empty.
+
+    Returns:
+        int: number of jobs completed by this worker.
+    """
+    worker = worker or worker_name()
+    queue = JobQueue(path, lease, max_attempts)
+    done = 0
+    try:
+        while True:
+            job = queue.lease(worker)
+            if job is None:
+                if not wait and not queue.unfinished():
+                    return done
+                time.sleep(poll)
+                continue
+
+            heartbeat = _Heartbeat(path, lease, job.id, worker)
+            heartbeat.start()
+            try:
+                row = run_job(job.payload)
+            finally:
+                heartbeat.stop()
+            if row.pop("status") == "ok":
+                del row["error"]
+                done += queue.complete(job.id, worker, row)
+            else:
+                queue.fail(job.id, worker, row["error"])
+    finally:
+        queue.close()
+
+
+def _work_args(args):
+    path, lease, max_attempts, poll, wait = args
+    return work(path, None, lease, max_attempts, poll, wait)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="add the jobs of a sweep")
+    submit.add_argument("queue", help="SQLite queue file")
+    submit.add_argument("strategy", help="strategy class name in zwpy_sta")
+    submit.add_argument("datapath", help="a Yahoo format csv file or a directory")
+    submit.add_argument("--grid", nargs="+", metavar="NAME=V1,V2", default=[])
+    submit.add_argument("--engine", choices=sorted(ENGINES), default="vectorized")
+    submit.add_argument("--fromdate", type=_parse_date)
+    submit.add_argument("--todate", type=_parse_date)
+    submit.add_argument("--cachedir", default=None)
+    submit.add_argument("--cash", type=float, default=10000.0)
+    submit.add_argument("--percents", type=int, default=90)
+    submit.add_argument("--commission", type=float, default=0.0)
+    submit.add_argument("--raw", action="store_true", help="unadjusted prices")
+
+    run = commands.add_parser("work", help="run jobs until the queue is empty")
+    run.add_argument("queue", help="SQLite queue file")
+    run.add_argument("--processes", type=int, default=1)
+    run.add_argument("--lease", type=float, default=60.0)
+    run.add_argument("--max-attempts", type=int, default=3)
+    run.add_argument("--poll", type=float, default=1.0)
+    run.add_argument("--wait", action="store_true", help="wait for new jobs")
+
+    status = commands.add_parser("status", help="jobs per status")
+    status.add_argument("queue", help="SQLite queue file")
+
+    results = commands.add_parser("results", help="finished jobs, best first")
+    results.add_argument("queue", help="SQLite queue file")
+    results.add_argument("--top", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "submit":
+        path = args.datapath
+        if os.path.isdir(path):
+            paths = symbols(path)
+        else:
+            paths = [(os.path.splitext(os.path.basename(path))[0], path)]
+        queue = JobQueue(args.queue)
+        count = submit_sweep(
+            queue,
+            args.strategy,
+            paths,
+            _parse_space(args.grid),
+            engine=args.engine,
+            fromdate=args.fromdate,
+            todate=args.todate,
+            cachedir=args.cachedir,
+            cash=args.cash,
+            percents=args.percents,
+            commission=args.commission,
+            adjclose=not args.raw,
+        )
+        print("%d jobs submitted" % count)
+
+    elif args.command == "work":
+        jobs = [
+            (args.queue, args.lease, args.max_attempts, args.poll, args.wait)
+        ] * args.processes
+        with multiprocessing.Pool(args.processes) as pool:
+            done = sum(pool.map(_work_args, jobs, chunksize=1))
+        print("%d jobs done" % done)
+
+    elif args.command == "status":
+        counts = JobQueue(args.queue).counts()
+        print(", ".join("%s %d" % kv for kv in sorted(counts.items())) or "empty")
+
+    else:
+        rows = JobQueue(args.queue).results()
+        done = [r for r in rows if r["status"] == "done"]
+        done.sort(key=lambda r: -r["value"])
+        rows = done + [r for r in rows if r["status"] != "done"]
+        # sweeps of different params can share a queue
+        columns = {c: "" for r in rows for c in r}
+        rows = [dict(columns, **r) for r in rows]
+        print(format_table(rows, args.top))
+
+
+if __name__ == "__main__":
+    main()
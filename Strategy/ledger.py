@@ -0,0 +1,153 @@
+"""
+Compact trade ledger: one typed array per column instead of objects.
+
+`BaseStrategyFrame` fills a `TradeLedger` from its `notify_order` /
+`notify_trade` hooks, so a run's trades can be kept (e.g. for every
+combination of a sweep) without holding on to backtrader Order / Trade
+objects and, through them, the data feed. The columns are the fields of
+`vectorized.Trade`.
+"""
+import array
+
+import backtrader as bt
+import numpy as np
+
+# column -> array typecode
+COLUMNS = (
+    ("entry_bar", "q"),
+    ("entry_price", "d"),
+    ("exit_bar", "q"),
+    ("exit_price", "d"),
+    ("size", "d"),
+    ("commission", "d"),
+    ("pnl", "d"),
+    ("pnlcomm", "d"),
+)
+
+NAN = float("nan")
+
+
+class TradeLedger(object):
+    """
+    Closed trades as struct-of-arrays columns (about 64 bytes a trade).
+
+    Bars are 0-based indices of the fill bars. A trade still open is
+    only in the ledger if added with `append` / `extend`, with exit_bar
+    -1 and nan exit price and pnl.
+
+    Attributes:
+        entry_bar, exit_bar (array.array): int64 columns.
+        entry_price, exit_price, size, commission, pnl, pnlcomm
+            (array.array): float64 columns.
+    """
+
+    __slots__ = tuple(name for name, _ in COLUMNS) + ("_entry",)
+
+    def __init__(self):
+        for name, typecode in COLUMNS:
+            setattr(self, name, array.array(typecode))
+        self._entry = None
+
+    def __len__(self):
+        return len(self.entry_bar)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def append(
+        self, entry_bar, entry_price, exit_bar, exit_price, size, commission, pnl, pnlcomm
+    ):
+        """Add one trade; None exit fields (an open trade) are stored as -1 / nan."""
+        self.entry_bar.append(entry_bar)
+        self.entry_price.append(entry_price)
+        self.exit_bar.append(-1 if exit_bar is None else exit_bar)
+        self.exit_price.append(NAN if exit_price is None else exit_price)
+        self.size.append(size)
+        self.commission.append(commission)
+        self.pnl.append(NAN if pnl is None else pnl)
+        self.pnlcomm.append(NAN if pnlcomm is None else pnlcomm)
+
+    def extend(self, trades):
+        """Add `vectorized.Trade` tuples (or any same-order sequences)."""
+        for trade in trades:
+            self.append(*trade)
+
+    # ===== notify hooks =====
+
+    def order_completed(self, bar, order):
+        """Record a completed bt order: a buy opens a trade, a sell closes it."""
+        if order.isbuy():
+            self._entry = [bar, order.executed.price, order.executed.size, None, NAN]
+        elif self._entry is not None:
+            self._entry[3:] = [bar, order.executed.price]
+
+    def trade_closed(self, trade):
+        """
+        Add the trade opened and closed by the last orders (bt `notify_trade`).
+
+        A trade whose orders were not both recorded (e.g. opened before
+        the ledger was attached) is skipped.
+        """
+        if self._entry is None or self._entry[3] is None:
+            self._entry = None
+            return
+        entry_bar, entry_price, size, exit_bar, exit_price = self._entry
+        self.append(
+            entry_bar,
+            entry_price,
+            exit_bar,
+            exit_price,
+            size,
+            trade.commission,
+            trade.pnl,
+            trade.pnlcomm,
+        )
+        self._entry = None
+
+    # ===== export =====
+
+    def to_numpy(self):
+        """
+        The columns as NumPy arrays sharing the ledger's memory (no copy).
+
+        The ledger cannot grow while such arrays are alive (`append`
+        raises BufferError); copy them to keep them longer.
+
+        Returns:
+            dict: column name -> np.ndarray.
+        """
+        return {
+            name: np.frombuffer(getattr(self, name), dtype=np.dtype(typecode))
+            for name, typecode in COLUMNS
+        }
+
+    @classmethod
+    def from_numpy(cls, columns):
+        """A ledger holding a copy of `to_numpy` style column arrays."""
+        ledger = cls()
+        for name, typecode in COLUMNS:
+            getattr(ledger, name).frombytes(
+                np.ascontiguousarray(columns[name], dtype=np.dtype(typecode)).tobytes()
+            )
+        return ledger
+
+    def to_pandas(self):
+        """The columns as a pandas DataFrame, built on `to_numpy` arrays."""
+        import pandas as pd
+
+        return pd.DataFrame(self.to_numpy(), copy=False)
+
+
+class LedgerAnalyzer(bt.Analyzer):
+    """
+    Return the strategy's `TradeLedger` from `get_analysis`, so it also
+    comes back from optimization runs (`cerebro.optstrategy`), which only
+    return params and analyzers.
+    """
+
+    def get_analysis(self):
+        return self.strategy.ledger
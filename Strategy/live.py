@@ -0,0 +1,283 @@
+"""
+Live mode: run a zwpy_sta strategy on bars streamed in as they arrive.
+
+Bars are Yahoo format csv lines (`Date,Open,High,Low,Close,Adj Close,Volume`)
+read from a tcp socket, a named pipe or a tailed file. Each bar goes
+through an `IncrementalBacktest` (one step, no re-run) and the orders it
+creates are written to the output stream at once, as `date, message`
+lines like `BaseStrategyFrame.log`:
+
+    2013-11-13, BUY CREATE, 23.50, size 500
+
+The time from a line being read to its signal being flushed is recorded
+for every bar and reported (p50 / p99, histogram) at the end.
+
+`replay` serves a csv file over tcp, one bar every `--interval` seconds,
+to test the live mode against a known history.
+
+Example:
+    python -m Strategy.live replay ./sample_data/orcl-1995-2014.txt --port 9999 &
+    python -m Strategy.live run RsiStrategy --tcp 127.0.0.1:9999 \\
+        --param period=14 kbuy=70 ksell=30
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+
+from Strategy import zwpy_sta
+from Strategy.data import _adjust_row
+from Strategy.incremental import _parse_params, resume
+from Strategy.profiler import Profile
+
+
+def parse_bar(line):
+    """
+    Parse one Yahoo format csv line.
+
+    Returns:
+        tuple: (date ordinal, open, high, low, close, volume), with the
+            values `read_yahoo_csv` gives; None for a header, blank or
+            "null" line.
+    """
+    tokens = line.strip().split(",")
+    if len(tokens) < 6 or "null" in tokens[1:] or not tokens[0][:4].isdigit():
+        return None
+    d = tokens[0]
+    ordinal = datetime.date(int(d[0:4]), int(d[5:7]), int(d[8:10])).toordinal()
+    o, h, l, c, _, v = _adjust_row(tokens)
+    return ordinal, o, h, l, c, v
+
+
+# ===== sources =====
+# Async iterators of csv lines (str).
+
+
+async def tcp_lines(host, port):
+    """Lines read from a tcp server, until it closes the connection."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            yield line.decode()
+    finally:
+        writer.close()
+
+
+async def pipe_lines(path):
+    """Lines read from a named pipe, until its last writer closes it."""
+    loop = asyncio.get_running_loop()
+    # opening a fifo blocks until a writer opens it too
+    f = await loop.run_in_executor(None, open, path, "rb", 0)
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), f
+    )
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            yield line.decode()
+    finally:
+        transport.close()
+
+
+async def tail_lines(path, poll=0.001, from_start=True):
+    """
+    Lines appended to a file, forever (like `tail -f`).
+
+    A bar written to the file is seen within `poll` seconds; the latency
+    measured by `run_live` starts when the line is read.
+
+    Args:
+        path (str): file to follow.
+        poll (float): seconds between checks at the end of the file.
+        from_start (bool): yield the lines already in the file first.
+    """
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        pending = ""
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                await asyncio.sleep(poll)
+                continue
+            pending += chunk
+            if pending.endswith("\n"):  # a whole line, not one being written
+                yield pending
+                pending = ""
+
+
+# ===== live loop =====
+
+
+def signal_line(date, order, close):
+    """The output line of an order created at a bar's close."""
+    day = datetime.date.fromordinal(date).isoformat()
+    return "%s, %s CREATE, %.2f, size %d\n" % (
+        day,
+        order.side.upper(),
+        close,
+        order.size,
+    )
+
+
+async def run_live(run, lines, out=None, profile=None):
+    """
+    Feed streamed bars to an incremental backtest, emitting its orders.
+
+    Bars not newer than the last one `run` processed are skipped, so a
+    run resumed from a checkpoint can read a source from its start
+    (see `IncrementalBacktest.seen`: changed ones raise ValueError).
+
+    Args:
+        run (incremental.IncrementalBacktest): strategy state, updated in place.
+        lines: async iterator of csv lines, see `tcp_lines`,
+            `pipe_lines` and `tail_lines`.
+        out: text stream for the signal lines (default: stdout),
+            flushed after each one.
+        profile (Profile): gets the per bar latency as phase "bar".
+
+    Returns:
+        Profile: the per bar latency.
+    """
+    out = out or sys.stdout
+    profile = profile or Profile()
+
+    def on_line(line):
+        bar = parse_bar(line)
+        if bar is None or run.seen(bar):
+            return
+        order = run.step(*bar)
+        if order is not None:
+            out.write(signal_line(bar[0], order, bar[4]))
+            out.flush()
+
+    on_line = profile.timed("bar", on_line, samples=True)
+    async for line in lines:
+        on_line(line)
+    return profile
+
+
+# ===== replay server =====
+
+
+async def serve_replay(path, host="127.0.0.1", port=9999, interval=0.0, reverse=False):
+    """
+    Serve the bars of a csv file over tcp, to every client that connects.
+
+    Args:
+        path (str): Yahoo format csv file.
+        host, port: address to listen on.
+        interval (float): seconds between bars.
+        reverse (bool): the file is stored newest first; send oldest first.
+    """
+    with open(path) as f:
+        lines = [line if line.endswith("\n") else line + "\n" for line in f][1:]
+    if reverse:
+        lines.reverse()
+
+    async def client(reader, writer):
+        try:
+            for line in lines:
+                writer.write(line.encode())
+                await writer.drain()
+                if interval:
+                    await asyncio.sleep(interval)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(client, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run a strategy on a live source")
+    run_parser.add_argument("strategy", help="strategy class name in zwpy_sta")
+    source = run_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--tcp", type=_address, metavar="HOST:PORT")
+    source.add_argument("--pipe", metavar="PATH", help="named pipe")
+    source.add_argument("--tail", metavar="PATH", help="file to follow")
+    run_parser.add_argument("--poll", type=float, default=0.001, help="--tail poll")
+    run_parser.add_argument("--output", default=None, help="signal file or pipe")
+    run_parser.add_argument("--checkpoint", help="state file, see incremental.py")
+    run_parser.add_argument("--param", nargs="+", metavar="NAME=VALUE")
+    run_parser.add_argument("--cash", type=float, default=10000.0)
+    run_parser.add_argument("--percents", type=int, default=90)
+    run_parser.add_argument("--commission", type=float, default=0.0)
+
+    replay_parser = commands.add_parser("replay", help="serve a csv file over tcp")
+    replay_parser.add_argument("datapath", help="Yahoo format csv file")
+    replay_parser.add_argument("--host", default="127.0.0.1")
+    replay_parser.add_argument("--port", type=int, default=9999)
+    replay_parser.add_argument("--interval", type=float, default=0.0)
+    replay_parser.add_argument("--reverse", action="store_true")
+
+    args = parser.parse_args(argv)
+    if args.command == "replay":
+        coro = serve_replay(
+            args.datapath, args.host, args.port, args.interval, args.reverse
+        )
+        try:
+            asyncio.run(coro)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    try:
+        run = resume(
+            args.checkpoint,
+            getattr(zwpy_sta, args.strategy),
+            cash=args.cash,
+            percents=args.percents,
+            commission=args.commission,
+            **_parse_params(args.param)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    if args.tcp:
+        lines = tcp_lines(*args.tcp)
+    elif args.pipe:
+        lines = pipe_lines(args.pipe)
+    else:
+        lines = tail_lines(args.tail, args.poll)
+
+    out = open(args.output, "w", buffering=1) if args.output else sys.stdout
+    profile = Profile()
+    try:
+        asyncio.run(run_live(run, lines, out, profile))
+    except KeyboardInterrupt:
+        pass
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if args.output:
+            out.close()
+        if args.checkpoint:
+            run.save(args.checkpoint)
+        print("value %.2f after %d bars" % (run.value, run.bars), file=sys.stderr)
+        print(profile.report(), file=sys.stderr)
+        print(
+            "\n".join("<= %8d ns: %d" % b for b in profile.histogram("bar")),
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Defines sinks for the records of `BaseStrategyFrame.log`.
+
+A record is `(dt, txt, args)`; the message `txt % args` is only
+built by the sink, so nothing is formatted while logging is off.
+"""
+import json
+
+
+def _message(txt, args):
+    return txt % args if args else txt
+
+
+class PrintSink(object):
+    """Print records to stdout, as `date, message` (the default)."""
+
+    def write(self, dt, txt, args):
+        print("%s, %s" % (dt.isoformat(), _message(txt, args)))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ListSink(object):
+    """
+    Keep records in memory, unformatted.
+
+    Attributes:
+        records (list): `(dt, txt, args)` tuples.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, dt, txt, args):
+        self.records.append((dt, txt, args))
+
+    def messages(self):
+        """Formatted `date, message` lines."""
+        return [
+            "%s, %s" % (dt.isoformat(), _message(txt, args))
+            for dt, txt, args in self.records
+        ]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileSink(object):
+    """
+    Write `date, message` lines to a buffered text file.
+
+    Args:
+        path (str): output file.
+        buffering (int): write buffer size in bytes.
+    """
+
+    def __init__(self, path, buffering=1 << 16):
+        self.f = open(path, "w", buffering=buffering)
+
+    def _line(self, dt, txt, args):
+        return "%s, %s\n" % (dt.isoformat(), _message(txt, args))
+
+    def write(self, dt, txt, args):
+        self.f.write(self._line(dt, txt, args))
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlSink(FileSink):
+    """Write one json object per record: `dt`, `msg` and raw `args`."""
+
+    def _line(self, dt, txt, args):
+        record = dict(dt=dt.isoformat(), msg=_message(txt, args), args=list(args))
+        return json.dumps(record) + "\n"
@@ -0,0 +1,173 @@
+"""
+Run many strategies as independent sub-accounts in one pass over the data.
+
+`MultiCerebro` is a `bt.Cerebro` where every strategy added with
+`addaccount` trades through its own `BackBroker` (own cash, positions,
+commission and sizer), while all of them share the data feeds and, with
+the `sharedind` param of `BaseStrategyFrame`, their indicators. The feed
+is loaded and iterated once, whatever the number of strategies.
+
+Example:
+    python -m Strategy.multi ./sample_data/orcl-1995-2014.txt
+    python -m Strategy.multi ./sample_data/600401_yahoo.csv --reverse \\
+        --strategies RsiStrategy MacdV2Strategy --commission 0.001425
+"""
+import argparse
+import contextlib
+import os
+
+import backtrader as bt
+
+from Strategy import zwpy_sta
+from Strategy.analytics import EquityCurve, max_drawdown
+from Strategy.data import ArrayData, read_yahoo_csv
+from Strategy.sweep import _parse_date, format_table
+
+
+def _account_class(strategy, broker, sizer):
+    # The broker of a strategy is taken from cerebro when it is built;
+    # a subclass swaps in its own one before any indicator or order.
+    def __init__(self):
+        self.broker = broker
+        strategy.__init__(self)
+        self.setsizer(sizer)
+
+    return type(strategy.__name__, (strategy,), dict(__init__=__init__))
+
+
+class MultiCerebro(bt.Cerebro):
+    """
+    Cerebro with one broker per strategy.
+
+    Attributes:
+        accounts (list of (type, bt.BackBroker)): strategy class and broker
+            of each `addaccount`, in order; `run()` returns the strategies
+            in the same order.
+    """
+
+    def __init__(self):
+        super(MultiCerebro, self).__init__()
+        self.accounts = []
+
+    def addaccount(
+        self, strategy, cash=10000.0, percents=90, commission=0.0, sizer=None, **kwargs
+    ):
+        """
+        Add a strategy with its own broker.
+
+        Args:
+            strategy (type): a bt.Strategy subclass.
+            cash (float): starting cash of its broker.
+            percents (int): `PercentSizerInt` percents, as in main.py.
+            commission (float): commission ratio of its broker.
+            sizer (bt.Sizer): sizer instance, instead of `percents`.
+            kwargs: strategy params; `sharedind` defaults to True for
+                strategies that have it, to share indicators between
+                the accounts.
+
+        Returns:
+            bt.BackBroker: the account's broker.
+        """
+        broker = bt.brokers.BackBroker()
+        broker.cerebro = self
+        broker.setcash(cash)
+        broker.setcommission(commission=commission)
+        sizer = sizer or bt.sizers.PercentSizerInt(percents=percents)
+        if hasattr(strategy.params, "sharedind"):
+            kwargs.setdefault("sharedind", True)
+        self.accounts.append((strategy, broker))
+        self.addstrategy(_account_class(strategy, broker, sizer), **kwargs)
+        return broker
+
+    def runstrategies(self, iterstrat, predata=False):
+        for _, broker in self.accounts:
+            broker.start()
+        try:
+            return super(MultiCerebro, self).runstrategies(iterstrat, predata)
+        finally:
+            for _, broker in self.accounts:
+                broker.stop()
+
+    def _brokernotify(self):
+        super(MultiCerebro, self)._brokernotify()
+        for _, broker in self.accounts:
+            broker.next()
+            while True:
+                order = broker.get_notification()
+                if order is None:
+                    break
+                order.owner._addnotification(order, quicknotify=self.p.quicknotify)
+
+
+def run_accounts(
+    strategies, data, cash=10000.0, percents=90, commission=0.0, params=None
+):
+    """
+    Run strategies side by side on one data feed, one account each.
+
+    Args:
+        strategies (list of type): strategy classes.
+        data (OHLCV): price arrays.
+        cash, percents, commission: broker settings of every account.
+        params (dict): strategy class -> its params.
+
+    Returns:
+        list of dict: one row per strategy: final value, closed trades
+            (like `batch`) and max drawdown (%).
+    """
+    params = params or {}
+    cerebro = MultiCerebro()
+    cerebro.adddata(ArrayData(ohlcv=data))
+    cerebro.addanalyzer(EquityCurve, _name="curve")
+    for strategy in strategies:
+        cerebro.addaccount(
+            strategy, cash, percents, commission, **params.get(strategy, {})
+        )
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        strats = cerebro.run(stdstats=False)
+
+    rows = []
+    for (strategy, broker), strat in zip(cerebro.accounts, strats):
+        curve = strat.analyzers.curve.get_analysis()
+        rows.append(
+            dict(
+                strategy=strategy.__name__,
+                value=broker.getvalue(),
+                trades=len(strat.ledger),
+                drawdown=max_drawdown(curve.equity)[0],
+            )
+        )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("datapath", help="Yahoo format csv file")
+    parser.add_argument(
+        "--strategies", nargs="+", default=None, help="default: all of zwpy_sta"
+    )
+    parser.add_argument("--fromdate", type=_parse_date)
+    parser.add_argument("--todate", type=_parse_date)
+    parser.add_argument("--reverse", action="store_true")
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--percents", type=int, default=90)
+    parser.add_argument("--commission", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    names = args.strategies or [
+        name for name in dir(zwpy_sta) if name.endswith("Strategy")
+    ]
+    data = read_yahoo_csv(args.datapath, args.fromdate, args.todate, args.reverse)
+    rows = run_accounts(
+        [getattr(zwpy_sta, name) for name in names],
+        data,
+        cash=args.cash,
+        percents=args.percents,
+        commission=args.commission,
+    )
+    rows.sort(key=lambda row: -row["value"])
+    print(format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Random and Bayesian search over the `params` of a strategy, with early stopping.
+
+Parameters are searched inside bounds (by default around the defaults of
+the strategy's `params` tuple). `random` draws every candidate at random;
+`bayes` draws a few, then fits a Gaussian process to the scores so far
+and picks the candidates with the highest expected improvement.
+Candidates run in rounds on a process pool, with the vectorized engine.
+
+Early stopping (median stopping rule): each candidate first runs on the
+first `early_stop` part of the history; if its score there is below the
+median of the finished candidates at the same point, the rest is skipped.
+
+Everything is drawn from one seeded generator and rounds of `batch_size`
+candidates are synchronous, so a search is reproducible whatever the
+number of processes.
+
+Example:
+    python -m Strategy.optimize MacdV2Strategy ./sample_data/orcl-1995-2014.txt \\
+        --space fast_period=4:30 slow_period=10:60 signal_period=3:20 -n 60 --seed 1
+"""
+import argparse
+import concurrent.futures
+import math
+import os
+
+import numpy as np
+
+from Strategy import zwpy_sta
+from Strategy.BaseStrategyFrame import BaseStrategyFrame
+from Strategy.data import OHLCV, read_yahoo_csv
+from Strategy.sweep import _parse_date, _parse_space, format_table, max_drawdown
+from Strategy.vectorized import closed_trades, run_vectorized, strategy_params
+
+# per worker process: the data given to _init_worker
+_DATA = None
+
+# params whose values only make sense within a range: oscillator
+# thresholds (RSI kbuy / ksell) are on its 0..100 scale
+LIMITS = {"kbuy": (0, 100), "ksell": (0, 100)}
+
+
+def default_bounds(strategy):
+    """
+    Bounds around the numeric defaults of a strategy's own params:
+    half to twice the default (at least 1 for integers), within `LIMITS`.
+
+    Returns:
+        dict: name -> (low, high), ints for int params.
+    """
+    base = set(BaseStrategyFrame.params._getkeys())
+    space = {}
+    for name, default in strategy.params._getitems():
+        if name in base or isinstance(default, bool):
+            continue
+        if isinstance(default, int):
+            low, high = max(1, default // 2), max(2, default * 2)
+        elif isinstance(default, float):
+            low, high = default / 2, default * 2
+        else:
+            continue
+        if name in LIMITS:
+            low = max(low, LIMITS[name][0])
+            high = min(high, LIMITS[name][1])
+        space[name] = (low, high)
+    return space
+
+
+class _Space(object):
+    """Maps params to and from points of the unit cube."""
+
+    def __init__(self, bounds):
+        self.names = list(bounds)
+        self.low = np.array([bounds[n][0] for n in self.names], dtype=np.float64)
+        self.high = np.array([bounds[n][1] for n in self.names], dtype=np.float64)
+        self.integer = [
+            all(isinstance(v, int) for v in bounds[n]) for n in self.names
+        ]
+
+    def params(self, point):
+        values = self.low + np.asarray(point) * (self.high - self.low)
+        params = {}
+        for name, value, integer in zip(self.names, values.tolist(), self.integer):
+            params[name] = int(round(value)) if integer else value
+        return params
+
+    def point(self, params):
+        values = np.array([params[n] for n in self.names], dtype=np.float64)
+        span = np.where(self.high > self.low, self.high - self.low, 1.0)
+        return (values - self.low) / span
+
+    def key(self, params):
+        return tuple(params[n] for n in self.names)
+
+
+# ===== Gaussian process surrogate =====
+
+
+def _kernel(a, b, lengthscale):
+    d2 = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1)
+    return np.exp(-0.5 * d2 / lengthscale ** 2)
+
+
+def _fit(x, y, noise=1e-3):
+    """GP posterior on standardized scores, lengthscale by marginal likelihood."""
+    mean, std = y.mean(), y.std() or 1.0
+    z = (y - mean) / std
+    best = None
+    for lengthscale in (0.05, 0.1, 0.2, 0.4, 0.8):
+        k = _kernel(x, x, lengthscale) + noise * np.eye(len(x))
+        try:
+            chol = np.linalg.cholesky(k)
+        except np.linalg.LinAlgError:
+            continue
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, z))
+        loglik = -0.5 * z @ alpha - np.log(np.diag(chol)).sum()
+        if best is None or loglik > best[0]:
+            best = (loglik, lengthscale, chol, alpha)
+    _, lengthscale, chol, alpha = best
+
+    def predict(points):
+        ks = _kernel(points, x, lengthscale)
+        mu = ks @ alpha
+        v = np.linalg.solve(chol, ks.T)
+        var = np.maximum(1.0 + noise - (v ** 2).sum(axis=0), 1e-12)
+        return mu * std + mean, np.sqrt(var) * std
+
+    return predict
+
+
+def _expected_improvement(mu, sigma, best, xi=0.01):
+    improvement = mu - best - xi * abs(best)
+    z = improvement / sigma
+    cdf = 0.5 * (1.0 + np.vectorize(math.erf)(z / math.sqrt(2.0)))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2.0 * math.pi)
+    return improvement * cdf + sigma * pdf
+
+
+# ===== evaluation =====
+
+
+def _init_worker(data):
+    global _DATA
+    _DATA = data
+
+
+def _score(result, sort):
+    if sort == "drawdown":
+        return -max_drawdown(result.equity)
+    return result.value
+
+
+def _evaluate(job):
+    strategy, params, broker, sort, split, threshold = job
+    row = dict(params, pruned=False)
+    # without a threshold yet (first round) nothing can be pruned: the
+    # partial score comes from the full run below
+    if split and threshold is not None:
+        head = OHLCV(*(column[:split] for column in _DATA))
+        partial = _score(run_vectorized(strategy, head, **broker, **params), sort)
+        row["partial"] = partial
+        if partial < threshold:
+            row.update(pruned=True, score=partial, value=float("nan"), trades=0)
+            row["drawdown"] = float("nan")
+            return row
+    result = run_vectorized(strategy, _DATA, **broker, **params)
+    if split:
+        # the run is causal: its score at `split` is that of the head run
+        head = result._replace(value=float(result.equity[split - 1]))
+        head = head._replace(equity=result.equity[:split])
+        row["partial"] = _score(head, sort)
+    row.update(
+        score=_score(result, sort),
+        value=result.value,
+        trades=closed_trades(result.trades),
+        drawdown=max_drawdown(result.equity),
+    )
+    return row
+
+
+def optimize(
+    strategy,
+    data,
+    bounds=None,
+    n=100,
+    method="bayes",
+    seed=None,
+    processes=None,
+    early_stop=0.3,
+    n_init=None,
+    batch_size=8,
+    cash=10000.0,
+    percents=90,
+    commission=0.0,
+    sort="value",
+):
+    """
+    Search strategy params for the best score.
+
+    Args:
+        strategy (type): a strategy class from zwpy_sta.
+        data (OHLCV): price arrays.
+        bounds (dict): name -> (low, high), inclusive; ints for integer
+            params (default: `default_bounds`). Other params keep their
+            defaults.
+        n (int): number of candidates to run.
+        method (str): "random" or "bayes".
+        seed (int): random seed.
+        processes (int): worker processes (default: cpu count).
+        early_stop (float): part of the history a candidate must beat the
+            median on to run to the end; 0 runs every candidate fully.
+        n_init (int): random candidates before the surrogate is used
+            (default: max(5, n // 5)).
+        batch_size (int): candidates proposed and run per round; results
+            depend on it, not on `processes`.
+        cash (float): starting cash.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio.
+        sort (str): score: "value" (final value) or "drawdown" (lowest
+            max drawdown).
+
+    Returns:
+        list of dict: one row per candidate with its params, `score`,
+            final `value`, `trades`, max `drawdown` (%) and whether it was
+            `pruned`; best first (pruned ones last).
+    """
+    bounds = bounds or default_bounds(strategy)
+    strategy_params(strategy, **{name: low for name, (low, _) in bounds.items()})
+    space = _Space(bounds)
+    rng = np.random.default_rng(seed)
+    processes = processes or os.cpu_count() or 1
+    n_init = n_init or max(5, n // 5)
+    broker = dict(cash=cash, percents=percents, commission=commission)
+    split = int(len(data.close) * early_stop) if early_stop else 0
+
+    rows, seen = [], set()
+
+    def propose(count):
+        if method == "random" or len(rows) < n_init:
+            pool = (rng.random(len(space.names)) for _ in range(count * 100))
+        else:
+            done = [r for r in rows if not r["pruned"]]
+            x = np.array([space.point(r) for r in rows])
+            # a stopped candidate counts as the worst finished one
+            worst = min(r["score"] for r in done)
+            y = np.array([worst if r["pruned"] else r["score"] for r in rows])
+            predict = _fit(x, y)
+            best = space.point(max(done, key=lambda r: r["score"]))
+            pool = np.vstack(
+                [
+                    rng.random((2000, len(space.names))),
+                    np.clip(best + rng.normal(0, 0.05, (500, len(best))), 0, 1),
+                ]
+            )
+            mu, sigma = predict(pool)
+            pool = pool[np.argsort(-_expected_improvement(mu, sigma, y.max()))]
+        found = []
+        for point in pool:
+            params = space.params(point)
+            key = space.key(params)
+            if key not in seen:
+                seen.add(key)
+                found.append(params)
+                if len(found) == count:
+                    break
+        return found
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(data,)
+    ) as executor:
+        while len(rows) < n:
+            batch = propose(min(batch_size, n - len(rows)))
+            if not batch:
+                break  # every point of the space has been run
+            finished = [r["partial"] for r in rows if split and not r["pruned"]]
+            threshold = float(np.median(finished)) if len(finished) >= 5 else None
+            jobs = [(strategy, p, broker, sort, split, threshold) for p in batch]
+            rows.extend(executor.map(_evaluate, jobs))
+
+    rows.sort(key=lambda r: (r["pruned"], -r["score"]))
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+        row.pop("partial", None)
+    return rows
+
+
+def grid_size(bounds):
+    """Number of runs of a full grid over integer bounds (floats count 10 steps)."""
+    size = 1
+    for low, high in bounds.values():
+        integer = isinstance(low, int) and isinstance(high, int)
+        size *= high - low + 1 if integer else 10
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("strategy", help="strategy class name in zwpy_sta")
+    parser.add_argument("datapath", help="Yahoo format csv file")
+    parser.add_argument("--space", nargs="+", metavar="NAME=LOW:HIGH")
+    parser.add_argument("-n", type=int, default=100, help="candidates to run")
+    parser.add_argument("--method", choices=["bayes", "random"], default="bayes")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--early-stop", type=float, default=0.3)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--fromdate", type=_parse_date)
+    parser.add_argument("--todate", type=_parse_date)
+    parser.add_argument("--reverse", action="store_true")
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--percents", type=int, default=90)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument("--sort", choices=["value", "drawdown"], default="value")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    strategy = getattr(zwpy_sta, args.strategy)
+    bounds = _parse_space(args.space) if args.space else default_bounds(strategy)
+    data = read_yahoo_csv(args.datapath, args.fromdate, args.todate, args.reverse)
+    rows = optimize(
+        strategy,
+        data,
+        bounds,
+        n=args.n,
+        method=args.method,
+        seed=args.seed,
+        processes=args.processes,
+        early_stop=args.early_stop,
+        batch_size=args.batch_size,
+        cash=args.cash,
+        percents=args.percents,
+        commission=args.commission,
+        sort=args.sort,
+    )
+    print(format_table(rows, args.top))
+    print(
+        "%d runs (%d stopped early), a full grid is %d"
+        % (len(rows), sum(r["pruned"] for r in rows), grid_size(bounds))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Headless, decimated plotting of backtest results.
+
+Figures are drawn with matplotlib's Agg canvas (no pyplot, no display),
+so it also works inside worker processes. Every line is decimated
+(min/max or LTTB) down to about one point per pixel before drawing,
+and buy/sell markers come from the trade log instead of a per-bar plotter.
+"""
+import numpy as np
+
+# ordinal of 1970-01-01, the datetime64 epoch
+_EPOCH = 719163
+
+
+def minmax(x, y, n):
+    """
+    Keep the min and max point of each of `n // 2` buckets.
+
+    Args:
+        x, y (np.ndarray): points, x ascending.
+        n (int): about how many points to keep.
+
+    Returns:
+        (np.ndarray, np.ndarray): decimated x, y.
+    """
+    size = len(x)
+    buckets = max(n // 2, 1)
+    if size <= n:
+        return x, y
+    edges = np.linspace(0, size, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    lo = np.minimum.reduceat(y, starts)
+    hi = np.maximum.reduceat(y, starts)
+    # index of the min/max inside each bucket, kept in time order
+    bucket = np.repeat(np.arange(buckets), np.diff(edges))
+    is_lo = y == lo[bucket]
+    is_hi = y == hi[bucket]
+    first_lo = np.full(buckets, size)
+    first_hi = np.full(buckets, size)
+    np.minimum.at(first_lo, bucket[is_lo], np.flatnonzero(is_lo))
+    np.minimum.at(first_hi, bucket[is_hi], np.flatnonzero(is_hi))
+    idx = np.unique(np.concatenate([first_lo, first_hi]))
+    return x[idx], y[idx]
+
+
+def lttb(x, y, n):
+    """
+    Largest-Triangle-Three-Buckets decimation.
+
+    Args:
+        x, y (np.ndarray): points, x ascending.
+        n (int): how many points to keep (at least 3).
+
+    Returns:
+        (np.ndarray, np.ndarray): decimated x, y.
+    """
+    size = len(x)
+    if size <= n or n < 3:
+        return x, y
+    xs = np.asarray(x, dtype=np.float64)
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    idx = np.empty(n, dtype=np.int64)
+    idx[0], idx[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < n - 1 else size
+        cx, cy = xs[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs(
+            (xs[a] - cx) * (y[lo:hi] - y[a]) - (xs[a] - xs[lo:hi]) * (cy - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+
+DECIMATE = dict(minmax=minmax, lttb=lttb)
+
+
+def _dates(ordinals):
+    return (np.asarray(ordinals, dtype=np.int64) - _EPOCH).astype("datetime64[D]")
+
+
+def _draw(ax, x, y, npoints, method, **kwargs):
+    y = np.asarray(y, dtype=np.float64)
+    bars = np.flatnonzero(~np.isnan(y))
+    bars, y = DECIMATE[method](bars, y[bars], npoints)
+    ax.plot(x[bars], y, **kwargs)
+
+
+def plot_arrays(
+    path,
+    date,
+    close,
+    lines=None,
+    subplots=None,
+    buys=None,
+    sells=None,
+    equity=None,
+    title=None,
+    width=1600,
+    height=900,
+    dpi=100,
+    method="minmax",
+):
+    """
+    Draw prices, indicators, trade markers and equity to an image file.
+
+    Args:
+        path (str): output file, format from the extension (png, svg, ...).
+        date (np.ndarray): int64 date ordinals.
+        close (np.ndarray): close prices.
+        lines (dict): name -> array drawn over the prices (e.g. SMA).
+        subplots (dict): name -> array or dict of arrays, one panel each
+            (e.g. MACD, RSI).
+        buys, sells (list): (bar index, price) of executions.
+        equity (np.ndarray): portfolio value at each bar.
+        title (str): figure title.
+        width, height (int): image size in pixels.
+        dpi (int): image resolution.
+        method (str): "minmax" or "lttb" decimation.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    subplots = subplots or {}
+    panels = 1 + len(subplots) + (equity is not None)
+    ratios = [3] + [1] * (panels - 1)
+
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(panels, 1, sharex=True, gridspec_kw=dict(height_ratios=ratios))
+    axes = np.atleast_1d(axes)
+    x = _dates(date)
+    npoints = width
+
+    ax = axes[0]
+    _draw(ax, x, close, npoints, method, label="close", linewidth=0.8)
+    for name, values in (lines or {}).items():
+        _draw(ax, x, values, npoints, method, label=name, linewidth=0.8)
+    for marks, marker, color in ((buys, "^", "green"), (sells, "v", "red")):
+        if marks:
+            bars, prices = zip(*marks)
+            ax.scatter(x[list(bars)], prices, marker=marker, color=color, zorder=3)
+    ax.legend(loc="upper left")
+    if title:
+        ax.set_title(title)
+
+    for ax, (name, values) in zip(axes[1:], subplots.items()):
+        if not isinstance(values, dict):
+            values = {name: values}
+        for label, v in values.items():
+            _draw(ax, x, v, npoints, method, label=label, linewidth=0.8)
+        ax.legend(loc="upper left")
+
+    if equity is not None:
+        _draw(axes[-1], x, equity, npoints, method, label="value", linewidth=0.8)
+        axes[-1].legend(loc="upper left")
+
+    fig.savefig(path, bbox_inches="tight")
+
+
+def plot_vectorized(path, data, result, lines=None, subplots=None, **kwargs):
+    """
+    Plot a `vectorized.run_vectorized` result.
+
+    Args:
+        path (str): output file.
+        data (OHLCV): the price arrays of the run.
+        result (VectorResult): the run result.
+        lines, subplots: extra arrays, see `plot_arrays`.
+        kwargs: passed to `plot_arrays`.
+    """
+    buys = [(t.entry_bar, t.entry_price) for t in result.trades]
+    sells = [(t.exit_bar, t.exit_price) for t in result.trades if t.exit_bar is not None]
+    plot_arrays(
+        path,
+        data.date,
+        data.close,
+        lines=lines,
+        subplots=subplots,
+        buys=buys,
+        sells=sells,
+        equity=result.equity,
+        **kwargs
+    )
+
+
+def _line(line):
+    return np.frombuffer(line.array, dtype=np.float64)[: line.buflen()]
+
+
+def plot_strategy(path, strategy, **kwargs):
+    """
+    Plot a strategy returned by `cerebro.run()` without backtrader's plotter.
+
+    Indicators come from the strategy, markers from the BuySell observer
+    and equity from the Broker observer (both added by cerebro's stdstats).
+
+    Args:
+        path (str): output file.
+        strategy (bt.Strategy): a finished strategy.
+        kwargs: passed to `plot_arrays`.
+    """
+    data = strategy.datas[0]
+    date = np.floor(_line(data.lines.datetime)).astype(np.int64)
+    lines, subplots = {}, {}
+    for ind in strategy.getindicators():
+        name = ind.__class__.__name__
+        values = {
+            "%s.%s" % (name, alias): _line(getattr(ind.lines, alias))
+            for alias in ind.lines.getlinealiases()
+        }
+        if ind.plotinfo.subplot:
+            subplots[name] = values
+        else:
+            lines.update(values)
+
+    buys, sells, equity = [], [], None
+    for obs in strategy.getobservers():
+        aliases = obs.lines.getlinealiases()
+        if "buy" in aliases and "sell" in aliases:
+            for marks, alias in ((buys, "buy"), (sells, "sell")):
+                values = _line(getattr(obs.lines, alias))
+                bars = np.flatnonzero(~np.isnan(values))
+                marks.extend(zip(bars.tolist(), values[bars].tolist()))
+        elif "value" in aliases:
+            equity = _line(obs.lines.value)
+
+    kwargs.setdefault("title", strategy.__class__.__name__)
+    plot_arrays(
+        path,
+        date,
+        _line(data.lines.close),
+        lines=lines,
+        subplots=subplots,
+        buys=buys,
+        sells=sells,
+        equity=equity,
+        **kwargs
+    )
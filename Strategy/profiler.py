@@ -0,0 +1,95 @@
+"""
+Per-phase wall time of a strategy run.
+
+`BaseStrategyFrame` wraps its own methods with `Profile.timed` when the
+`profile` param is on; when it is off nothing is wrapped, so a normal
+run pays nothing.
+"""
+import array
+import functools
+import time
+
+import numpy as np
+
+
+class Profile(object):
+    """
+    Cumulative wall time and call count per phase.
+
+    Phases are inclusive: a `log` call made from `next()` counts in both.
+    Calls of a phase nested in the same phase (e.g. `log_bar` calling
+    `log`) count once.
+
+    Attributes:
+        calls (dict): phase -> number of calls.
+        total (dict): phase -> total nanoseconds.
+        samples (dict): phase -> array of per call nanoseconds,
+            for the phases timed with `samples=True`.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.total = {}
+        self.samples = {}
+        self._depth = {}
+
+    def timed(self, phase, func, samples=False):
+        """Wrap `func` to add its calls to `phase`."""
+        self.calls.setdefault(phase, 0)
+        self.total.setdefault(phase, 0)
+        self._depth.setdefault(phase, 0)
+        if samples:
+            self.samples.setdefault(phase, array.array("q"))
+        record = self.samples[phase].append if samples else None
+        perf_counter_ns = time.perf_counter_ns
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if self._depth[phase]:
+                return func(*args, **kwargs)
+            self._depth[phase] += 1
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                self._depth[phase] -= 1
+                self.calls[phase] += 1
+                self.total[phase] += elapsed
+                if record is not None:
+                    record(elapsed)
+
+        return wrapper
+
+    def percentiles(self, phase, q=(50, 99)):
+        """Percentiles of the per call time of a sampled phase, in nanoseconds."""
+        values = np.frombuffer(self.samples[phase], dtype=np.int64)
+        if not len(values):
+            return [0.0 for _ in q]
+        return np.percentile(values, q).tolist()
+
+    def histogram(self, phase):
+        """
+        Per call times of a sampled phase in power of two buckets.
+
+        Returns:
+            list of (int, int): (bucket upper bound in ns, calls), skipping
+                empty buckets.
+        """
+        values = np.frombuffer(self.samples[phase], dtype=np.int64)
+        if not len(values):
+            return []
+        buckets = np.bincount(np.ceil(np.log2(np.maximum(values, 1))).astype(np.int64))
+        return [(1 << int(b), int(n)) for b, n in enumerate(buckets) if n]
+
+    def report(self):
+        """Plain text report: time and calls per phase, next() percentiles."""
+        lines = ["%-12s %10s %12s %12s" % ("phase", "calls", "total ms", "mean us")]
+        for phase, calls in self.calls.items():
+            total = self.total[phase]
+            mean = total / calls / 1e3 if calls else 0.0
+            lines.append("%-12s %10d %12.2f %12.2f" % (phase, calls, total / 1e6, mean))
+        for phase in self.samples:
+            p50, p99 = self.percentiles(phase)
+            lines.append("%s: p50 %.2f us, p99 %.2f us" % (phase, p50 / 1e3, p99 / 1e3))
+        return "\n".join(lines)
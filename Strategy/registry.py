@@ -0,0 +1,130 @@
+"""
+Strategy registry read from the source of zwpy_sta.py, without importing it.
+
+Strategy names, docstrings and `params` tuples (inherited ones included)
+are taken from the syntax tree of the module, so listing strategies or
+checking parameters does not import backtrader. `load` imports the
+strategy module only when a class is really needed.
+"""
+import ast
+import collections
+import difflib
+import functools
+import importlib
+import os
+
+# modules searched for strategies, in order; later ones see earlier ones' classes
+MODULES = ("Strategy.BaseStrategyFrame", "Strategy.zwpy_sta")
+
+StrategySpec = collections.namedtuple(
+    "StrategySpec", ["name", "module", "params", "doc"]
+)
+StrategySpec.__doc__ = """
+    A strategy class as found in the source.
+
+    Args:
+        name (str): class name.
+        module (str): module defining the class.
+        params (tuple): ((name, default), ...), inherited params first.
+        doc (str): class docstring.
+    """
+
+
+def _source(module):
+    path = os.path.join(os.path.dirname(__file__), module.split(".")[-1] + ".py")
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _params(node):
+    for stmt in node.body:
+        if isinstance(stmt, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "params" for t in stmt.targets
+        ):
+            return tuple(tuple(p) for p in ast.literal_eval(stmt.value))
+    return ()
+
+
+@functools.lru_cache(maxsize=None)
+def strategies():
+    """
+    Strategies of zwpy_sta, by name.
+
+    Returns:
+        dict: class name -> StrategySpec, for the classes ending in "Strategy".
+    """
+    classes = {}
+    for module in MODULES:
+        for node in ast.parse(_source(module)).body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            params = collections.OrderedDict()
+            for base in node.bases:
+                if isinstance(base, ast.Name) and base.id in classes:
+                    params.update(classes[base.id].params)
+            params.update(_params(node))
+            doc = ast.get_docstring(node) or ""
+            classes[node.name] = StrategySpec(
+                node.name, module, tuple(params.items()), doc
+            )
+    return {
+        name: spec
+        for name, spec in classes.items()
+        if spec.module == MODULES[-1] and name.endswith("Strategy")
+    }
+
+
+def get(name):
+    """
+    Spec of a strategy.
+
+    Raises:
+        KeyError: if there is no such strategy (with the closest names).
+    """
+    specs = strategies()
+    if name not in specs:
+        close = difflib.get_close_matches(name, specs, n=3)
+        hint = ", did you mean %s?" % " or ".join(close) if close else ""
+        raise KeyError("No strategy %r%s" % (name, hint))
+    return specs[name]
+
+
+def parse_params(name, items):
+    """
+    Parse `name=value` command line items into a strategy's params.
+
+    Values are Python literals (`period=14`, `kvwap=0.01`), except for
+    bool params (`printlog=true`) and str params (the bare text).
+
+    Raises:
+        KeyError: for an unknown strategy.
+        TypeError: for a param the strategy does not have.
+        ValueError: for a value that does not convert.
+    """
+    defaults = dict(get(name).params)
+    params = {}
+    for item in items or []:
+        key, _, text = item.partition("=")
+        if key not in defaults:
+            raise TypeError(
+                "%s has no param %r (params: %s)" % (name, key, ", ".join(defaults))
+            )
+        default = defaults[key]
+        if isinstance(default, bool):
+            if text.lower() not in ("true", "false", "1", "0"):
+                raise ValueError("%s=%s is not a boolean" % (key, text))
+            params[key] = text.lower() in ("true", "1")
+        elif isinstance(default, str):
+            params[key] = text
+        else:
+            try:
+                params[key] = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                raise ValueError("%s=%s is not a Python literal" % (key, text))
+    return params
+
+
+def load(name):
+    """Import the strategy class (and so backtrader)."""
+    spec = get(name)
+    return getattr(importlib.import_module(spec.module), spec.name)
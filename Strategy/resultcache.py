@@ -0,0 +1,370 @@
+"""
+Content-addressed cache of backtest results on disk.
+
+A run is keyed by a hash of what decides its result: the price arrays
+(their bytes), the source of the strategy class and of its bases in this
+package, the source of the modules the engine runs it with (see
+`ENGINE_MODULES`) and the backtrader version, the params (defaults
+filled in), the broker settings and the engine. Editing a strategy in
+zwpy_sta.py invalidates the entries of that strategy, editing
+`BaseStrategyFrame`, indicators.py or the engine those of every strategy;
+the entries are simply never looked up again and age out.
+
+Each entry is an uncompressed `.npz` file with the final value, the
+trade ledger columns and the equity curve, loaded in about a millisecond.
+`evict` removes entries by age and, least recently used first, by total
+size.
+
+Example:
+    python -m Strategy.resultcache run RsiStrategy ./sample_data/600401_yahoo.csv \\
+        --param period=14 kbuy=70 ksell=30
+    python -m Strategy.resultcache evict --max-size 500M --max-age 30d
+"""
+import argparse
+import collections
+import contextlib
+import functools
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import time
+
+import numpy as np
+
+from Strategy import zwpy_sta
+from Strategy.analytics import Curve
+from Strategy.feedcache import load_cached
+from Strategy.incremental import _parse_params
+from Strategy.ledger import COLUMNS, TradeLedger
+from Strategy.sweep import _parse_date
+
+VERSION = 1
+
+ENGINES = ("cerebro", "slim", "vectorized")
+
+# modules of this package whose code an engine's results depend on,
+# besides the strategy classes
+_CEREBRO_MODULES = ("analytics", "data", "indcache", "indicators", "ledger", "utils")
+ENGINE_MODULES = {
+    "cerebro": _CEREBRO_MODULES,
+    "slim": _CEREBRO_MODULES + ("broker",),
+    "vectorized": ("indcache", "indicators", "ledger", "utils", "vectorized"),
+}
+
+# params that do not change a result
+_IGNORED = ("printlog", "logsink", "sharedind", "profile")
+
+CachedResult = collections.namedtuple(
+    "CachedResult", ["value", "ledger", "curve", "hit"]
+)
+CachedResult.__doc__ = """
+    Result of `run_cached`.
+
+    Args:
+        value (float): final portfolio value.
+        ledger (TradeLedger): closed trades.
+        curve (Curve): equity, position and close of every bar.
+        hit (bool): whether it came from the cache.
+    """
+
+
+def default_cachedir():
+    """`.resultcache` in the current directory."""
+    return os.path.join(os.getcwd(), ".resultcache")
+
+
+@functools.lru_cache(maxsize=None)
+def _source_digest(strategy, engine):
+    import backtrader as bt
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(bt.__version__.encode())
+    for cls in strategy.__mro__:
+        if cls.__module__.split(".")[0] == "Strategy":
+            digest.update(inspect.getsource(cls).encode())
+    for name in ENGINE_MODULES[engine]:
+        module = importlib.import_module("Strategy." + name)
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
+def _data_digest(data):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(data.date, dtype=np.int64).tobytes())
+    for column in data[1:]:
+        digest.update(np.ascontiguousarray(column, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def result_key(
+    strategy, data, engine="cerebro", cash=10000.0, percents=90, commission=0.0, **params
+):
+    """
+    Cache key of a run.
+
+    Args:
+        strategy (type): a strategy class (e.g. from zwpy_sta).
+        data (OHLCV): price arrays.
+        engine (str): one of `ENGINES`.
+        cash, percents, commission: broker settings.
+        params: strategy parameters; defaults are filled in, so leaving
+            one out or passing its default gives the same key.
+
+    Returns:
+        str: hex digest.
+    """
+    merged = dict(strategy.params._getitems())
+    merged.update(params)
+    for name in _IGNORED:
+        merged.pop(name, None)
+    text = json.dumps(
+        dict(
+            version=VERSION,
+            engine=engine,
+            strategy="%s.%s" % (strategy.__module__, strategy.__qualname__),
+            source=_source_digest(strategy, engine),
+            data=_data_digest(data),
+            params=merged,
+            broker=[float(cash), percents, float(commission)],
+        ),
+        sort_keys=True,
+        default=repr,
+    )
+    return hashlib.blake2b(text.encode(), digest_size=20).hexdigest()
+
+
+def _path(cachedir, key):
+    return os.path.join(cachedir, key[:2], key + ".npz")
+
+
+def load_result(cachedir, key, max_age=None):
+    """
+    The cached result of a key, None on a miss (or an entry older than
+    `max_age` seconds). A hit counts as a use for `evict`.
+    """
+    path = _path(cachedir, key)
+    try:
+        if max_age is not None and time.time() - os.stat(path).st_mtime > max_age:
+            return None
+        with np.load(path, allow_pickle=False) as f:
+            ledger = TradeLedger.from_numpy(
+                {name: f["ledger_" + name] for name, _ in COLUMNS}
+            )
+            curve = Curve(f["equity"], f["position"], f["close"])
+            value = float(f["value"])
+        os.utime(path)
+    except (OSError, KeyError, ValueError):
+        return None  # missing, or a broken file
+    return CachedResult(value, ledger, curve, True)
+
+
+def store_result(cachedir, key, value, ledger, curve):
+    """Write an entry, to a temp file then moved in place."""
+    path = _path(cachedir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {"ledger_" + name: a for name, a in ledger.to_numpy().items()}
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            value=np.float64(value),
+            equity=curve.equity,
+            position=curve.position,
+            close=curve.close,
+            **arrays
+        )
+    os.replace(tmp, path)
+
+
+def _run(strategy, data, engine, cash, percents, commission, params):
+    if engine == "vectorized":
+        from Strategy.vectorized import run_vectorized
+
+        result = run_vectorized(
+            strategy, data, cash=cash, percents=percents, commission=commission, **params
+        )
+        ledger = TradeLedger()
+        ledger.extend(t for t in result.trades if t.exit_bar is not None)
+        return result.value, ledger, Curve(result.equity, result.position, data.close)
+
+    import backtrader as bt
+
+    from Strategy.analytics import EquityCurve
+    from Strategy.broker import SlimBroker
+    from Strategy.data import ArrayData
+
+    cerebro = bt.Cerebro(stdstats=False)
+    if engine == "slim":
+        cerebro.broker = SlimBroker()
+    cerebro.addstrategy(strategy, **params)
+    cerebro.adddata(ArrayData(ohlcv=data))
+    cerebro.broker.setcash(cash)
+    cerebro.addsizer(bt.sizers.PercentSizerInt, percents=percents)
+    cerebro.broker.setcommission(commission=commission)
+    cerebro.addanalyzer(EquityCurve, _name="curve")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        strat = cerebro.run()[0]
+    return (
+        cerebro.broker.getvalue(),
+        strat.ledger,
+        strat.analyzers.curve.get_analysis(),
+    )
+
+
+def run_cached(
+    strategy,
+    data,
+    cachedir=None,
+    engine="cerebro",
+    cash=10000.0,
+    percents=90,
+    commission=0.0,
+    max_age=None,
+    max_bytes=None,
+    **params
+):
+    """
+    Backtest through the result cache: load the result of an identical
+    earlier run, or run and store it.
+
+    Args:
+        strategy (type): a strategy class (e.g. from zwpy_sta).
+        data (OHLCV): price arrays.
+        cachedir (str): cache directory (default: `default_cachedir()`).
+        engine (str): "cerebro", "slim" (cerebro with `SlimBroker`) or
+            "vectorized" (`run_vectorized`).
+        cash (float): starting cash.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio.
+        max_age (float): ignore entries older than this, in seconds.
+        max_bytes (int): after storing a result, `evict` down to this size
+            (and `max_age`).
+        params: strategy parameters.
+
+    Returns:
+        CachedResult
+    """
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine %r, expected one of %s" % (engine, ENGINES))
+    cachedir = cachedir or default_cachedir()
+    broker = dict(cash=cash, percents=percents, commission=commission)
+    key = result_key(strategy, data, engine, **broker, **params)
+    result = load_result(cachedir, key, max_age)
+    if result is not None:
+        return result
+
+    value, ledger, curve = _run(
+        strategy, data, engine, cash, percents, commission, params
+    )
+    store_result(cachedir, key, value, ledger, curve)
+    if max_bytes is not None:
+        evict(cachedir, max_bytes, max_age)
+    return CachedResult(value, ledger, curve, False)
+
+
+def evict(cachedir=None, max_bytes=None, max_age=None):
+    """
+    Remove entries older than `max_age` seconds, then the least recently
+    used ones until the cache holds at most `max_bytes`. Entries another
+    process removes meanwhile are skipped.
+
+    Returns:
+        (int, int): entries removed, bytes left.
+    """
+    cachedir = cachedir or default_cachedir()
+    entries = []
+    for root, _, names in os.walk(cachedir):
+        for name in names:
+            if name.endswith(".npz"):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue  # removed by a concurrent evict
+                entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        expired = max_age is not None and now - mtime > max_age
+        if not expired and (max_bytes is None or total <= max_bytes):
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass  # removed by a concurrent evict meanwhile
+        total -= size
+    return removed, total
+
+
+def _parse_size(text):
+    units = dict(K=1 << 10, M=1 << 20, G=1 << 30)
+    text = text.upper().rstrip("B")
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _parse_age(text):
+    units = dict(s=1, m=60, h=3600, d=86400)
+    if text[-1:] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cachedir", default=None)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="backtest through the cache")
+    run.add_argument("strategy", help="strategy class name in zwpy_sta")
+    run.add_argument("datapath", help="Yahoo format csv file")
+    run.add_argument("--param", nargs="+", metavar="NAME=VALUE")
+    run.add_argument("--engine", choices=ENGINES, default="cerebro")
+    run.add_argument("--fromdate", type=_parse_date)
+    run.add_argument("--todate", type=_parse_date)
+    run.add_argument("--cash", type=float, default=10000.0)
+    run.add_argument("--percents", type=int, default=90)
+    run.add_argument("--commission", type=float, default=0.0)
+
+    prune = commands.add_parser("evict", help="remove old or least used entries")
+    prune.add_argument("--max-size", type=_parse_size, help="e.g. 500M, 2G")
+    prune.add_argument("--max-age", type=_parse_age, help="e.g. 3600, 12h, 30d")
+    args = parser.parse_args(argv)
+
+    if args.command == "evict":
+        removed, total = evict(args.cachedir, args.max_size, args.max_age)
+        print("%d entries removed, %.1f MB left" % (removed, total / 1e6))
+        return
+
+    data = load_cached(args.datapath, fromdate=args.fromdate, todate=args.todate)
+    start = time.perf_counter()
+    result = run_cached(
+        getattr(zwpy_sta, args.strategy),
+        data,
+        args.cachedir,
+        engine=args.engine,
+        cash=args.cash,
+        percents=args.percents,
+        commission=args.commission,
+        **_parse_params(args.param)
+    )
+    print(
+        "Final value %.2f, %d closed trades (%s, %.1f ms)"
+        % (
+            result.value,
+            len(result.ledger),
+            "cached" if result.hit else "run",
+            (time.perf_counter() - start) * 1000,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Parallel parameter sweep over the `params` tuple of a strategy.
+
+Combinations come from a grid or a seeded random sample and are spread
+over a process pool. Each worker reads the csv once into NumPy arrays
+and reuses it for every combination it runs.
+
+Example:
+    python -m Strategy.sweep RsiStrategy ./sample_data/600401_yahoo.csv \\
+        --reverse --grid period=10,14,20 kbuy=60,70,80 ksell=20,30
+"""
+import argparse
+import ast
+import concurrent.futures
+import datetime
+import itertools
+import os
+import random
+
+import numpy as np
+
+from Strategy import zwpy_sta
+from Strategy.data import read_yahoo_csv
+from Strategy.vectorized import closed_trades, run_vectorized, strategy_params
+
+# per worker process: the data loaded by _init_worker
+_DATA = None
+
+
+def grid(**space):
+    """
+    Every combination of the given parameter values.
+
+    Args:
+        space: parameter name -> list of values.
+
+    Returns:
+        list of dict: one dict per combination.
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_sample(n, seed=None, **space):
+    """
+    Random combinations of parameter values.
+
+    Args:
+        n (int): number of combinations.
+        seed (int): random seed, for reproducible sweeps.
+        space: parameter name -> list of values to choose from,
+            or (low, high) tuple to draw from (int or float, inclusive).
+
+    Returns:
+        list of dict: one dict per combination.
+    """
+    rng = random.Random(seed)
+    combos = []
+    for _ in range(n):
+        combo = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    combo[name] = rng.randint(low, high)
+                else:
+                    combo[name] = rng.uniform(low, high)
+            else:
+                combo[name] = rng.choice(values)
+        combos.append(combo)
+    return combos
+
+
+def max_drawdown(equity):
+    """Largest drop from a running peak of the equity curve, in percent."""
+    if not len(equity):
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    return float(np.max((peak - equity) / peak) * 100.0)
+
+
+def _init_worker(datapath, fromdate, todate, reverse):
+    global _DATA
+    _DATA = read_yahoo_csv(datapath, fromdate, todate, reverse)
+
+
+def _run_one(job):
+    strategy, params, broker = job
+    result = run_vectorized(strategy, _DATA, **broker, **params)
+    return dict(
+        params,
+        value=result.value,
+        trades=closed_trades(result.trades),
+        drawdown=max_drawdown(result.equity),
+    )
+
+
+def sweep(
+    strategy,
+    datapath,
+    combos,
+    processes=None,
+    fromdate=None,
+    todate=None,
+    reverse=False,
+    cash=10000.0,
+    percents=90,
+    commission=0.0,
+    sort="value",
+):
+    """
+    Run a strategy over many parameter combinations in parallel.
+
+    Args:
+        strategy (type): a strategy class from zwpy_sta.
+        datapath (str): Yahoo format csv file.
+        combos (list of dict): parameter sets, see `grid` and `random_sample`.
+        processes (int): worker processes (default: cpu count).
+        fromdate, todate (datetime.date): date range of the data feed.
+        reverse (bool): the csv file is stored newest first.
+        cash (float): starting cash.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio.
+        sort (str): result column to rank by; "drawdown" ranks ascending,
+            the others descending.
+
+    Returns:
+        list of dict: one row per combination with its params,
+            final `value`, `trades` count and max `drawdown` (%), best first.
+    """
+    for params in combos:
+        strategy_params(strategy, **params)  # fail early on a bad name
+
+    broker = dict(cash=cash, percents=percents, commission=commission)
+    jobs = [(strategy, params, broker) for params in combos]
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (processes * 4))
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(datapath, fromdate, todate, reverse),
+    ) as executor:
+        rows = list(executor.map(_run_one, jobs, chunksize=chunksize))
+
+    rows.sort(key=lambda row: row[sort], reverse=sort != "drawdown")
+    for rank, row in enumerate(rows, 1):
+        row["rank"] = rank
+    return rows
+
+
+def format_table(rows, limit=None):
+    """Format result rows (dicts with the same keys) as a plain text table."""
+    rows = rows[:limit] if limit else rows
+    if not rows:
+        return ""
+    columns = sorted(rows[0], key=lambda c: c != "rank")  # rank first
+    cells = [
+        ["%.2f" % v if isinstance(v, float) else str(v) for v in (r[c] for c in columns)]
+        for r in rows
+    ]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(r, widths)) for r in cells]
+    return "\n".join(lines)
+
+
+def _parse_space(items):
+    """Parse `name=v1,v2,...` or `name=low:high` command line items."""
+    space = {}
+    for item in items:
+        name, _, text = item.partition("=")
+        if ":" in text:
+            low, high = text.split(":")
+            space[name] = (ast.literal_eval(low), ast.literal_eval(high))
+        else:
+            space[name] = [ast.literal_eval(v) for v in text.split(",")]
+    return space
+
+
+def _parse_date(text):
+    return datetime.datetime.strptime(text, "%Y-%m-%d")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("strategy", help="strategy class name in zwpy_sta")
+    parser.add_argument("datapath", help="Yahoo format csv file")
+    parser.add_argument("--grid", nargs="+", metavar="NAME=V1,V2")
+    parser.add_argument("--random", nargs="+", metavar="NAME=LOW:HIGH")
+    parser.add_argument("-n", type=int, default=100, help="random sample size")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--fromdate", type=_parse_date)
+    parser.add_argument("--todate", type=_parse_date)
+    parser.add_argument("--reverse", action="store_true")
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--percents", type=int, default=90)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument(
+        "--sort", choices=["value", "trades", "drawdown"], default="value"
+    )
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    strategy = getattr(zwpy_sta, args.strategy)
+    if args.random:
+        combos = random_sample(args.n, args.seed, **_parse_space(args.random))
+    else:
+        combos = grid(**_parse_space(args.grid or []))
+
+    rows = sweep(
+        strategy,
+        args.datapath,
+        combos,
+        processes=args.processes,
+        fromdate=args.fromdate,
+        todate=args.todate,
+        reverse=args.reverse,
+        cash=args.cash,
+        percents=args.percents,
+        commission=args.commission,
+        sort=args.sort,
+    )
+    print(format_table(rows, args.top))
+
+
+if __name__ == "__main__":
+    main()
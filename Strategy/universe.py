@@ -0,0 +1,426 @@
+"""
+Universe-wide backtests: every symbol of a directory in one vectorized pass.
+
+The feeds are aligned on the union of their dates into (symbols x bars)
+matrices, with NaN where a symbol has no bar (not listed yet, suspended,
+delisted). The indicators of indicators.py and the buy/sell rules of
+vectorized.py run on the whole matrices at once, and the long-only
+state machine of `BaseStrategyFrame` steps all symbols together, bar by
+bar, so the Python-level work grows with the number of bars, not with
+symbols x bars.
+
+Missing bars are skipped, as in a feed of the symbol alone: each row is
+packed (its bars moved to the front) before the indicators and the state
+machine, and unpacked after. Results are the same as `run_vectorized`
+on each symbol.
+
+Example:
+    python -m Strategy.universe RsiStrategy ./sample_data \\
+        --param period=14 kbuy=70 ksell=30 --top 20
+"""
+import argparse
+import collections
+import time
+
+import numpy as np
+
+from Strategy import zwpy_sta
+from Strategy.batch import _parse_params, symbols
+from Strategy.data import OHLCV
+from Strategy.feedcache import load_cached
+from Strategy.ledger import TradeLedger
+from Strategy.sweep import _parse_date, format_table, max_drawdown
+from Strategy.vectorized import signals as vector_signals
+
+Universe = collections.namedtuple("Universe", ["symbols", "dates", "data", "mask"])
+Universe.__doc__ = """
+    Feeds aligned on their dates.
+
+    Args:
+        symbols (list of str): one per row.
+        dates (np.ndarray): int64 ordinals of the columns, ascending.
+        data (OHLCV): (symbols x bars) float64 matrices, NaN where a symbol
+            has no bar; `date` is `dates` broadcast to the same shape.
+        mask (np.ndarray): bool matrix, True where a symbol has a bar.
+    """
+
+UniverseResult = collections.namedtuple(
+    "UniverseResult",
+    ["symbols", "value", "cash", "trades", "position", "equity", "orders"],
+)
+UniverseResult.__doc__ = """
+    Result of `run_universe`, one row (or item) per symbol.
+
+    Args:
+        symbols (list of str): symbols.
+        value, cash (np.ndarray): final portfolio value and cash.
+        trades (list of TradeLedger): trades, bars being column indices of
+            the universe; a trade still open has exit_bar -1.
+        position, equity (np.ndarray): position size and portfolio value
+            at each bar close, NaN where the symbol has no bar.
+        orders (np.ndarray): 1 (buy) or -1 (sell) for the orders created
+            on a symbol's last bar, to fill at the next open; else 0.
+    """
+
+
+def align(feeds):
+    """
+    Align feeds on the union of their dates.
+
+    Args:
+        feeds (list of (str, OHLCV)): symbol and price arrays.
+
+    Returns:
+        Universe
+    """
+    names = [symbol for symbol, _ in feeds]
+    if feeds:
+        dates = np.unique(np.concatenate([d.date for _, d in feeds]))
+    else:
+        dates = np.empty(0, dtype=np.int64)
+    shape = (len(feeds), len(dates))
+    mask = np.zeros(shape, dtype=bool)
+    columns = {name: np.full(shape, np.nan) for name in OHLCV._fields[1:]}
+    for row, (_, d) in enumerate(feeds):
+        pos = np.searchsorted(dates, d.date)
+        mask[row, pos] = True
+        for name, matrix in columns.items():
+            matrix[row, pos] = getattr(d, name)
+    data = OHLCV(date=np.broadcast_to(dates, shape), **columns)
+    return Universe(names, dates, data, mask)
+
+
+def load_universe(paths, fromdate=None, todate=None, cachedir=None, adjclose=True):
+    """
+    Load and align csv files through the feed cache.
+
+    Args:
+        paths (list of (str, str)): (symbol, csv path), see `batch.symbols`.
+        fromdate, todate (datetime.date): date range of every feed.
+        cachedir (str): feed cache directory (default: next to the csv).
+        adjclose (bool): back-adjusted (default) or raw prices.
+
+    Returns:
+        Universe
+    """
+    return align(
+        [
+            (symbol, load_cached(path, cachedir, fromdate, todate, adjclose=adjclose))
+            for symbol, path in paths
+        ]
+    )
+
+
+def _packing(mask):
+    # flat indices moving each row's bars to the front, in date order;
+    # None when no bar is missing
+    if mask.all():
+        return None
+    rows, n = mask.shape
+    order = np.argsort(~mask, axis=1, kind="stable")
+    order += np.arange(0, rows * n, n)[:, None]
+    return order
+
+
+def _pack(data, packing):
+    # prices only: the signals do not use dates or adjclose
+    if packing is None:
+        return data._replace(date=None, adjclose=None)
+    columns = dict(date=None, adjclose=None)
+    for name in ("open", "high", "low", "close", "volume"):
+        columns[name] = np.take(getattr(data, name), packing)
+    return OHLCV(**columns)
+
+
+def _unpack(packed, packing, mask, fill):
+    if packing is None:
+        return packed
+    out = np.empty_like(packed)
+    np.put(out, packing, packed)
+    out[~mask] = fill
+    return out
+
+
+def _columns(packing, row, bars):
+    # universe columns of packed bars of a row
+    if packing is None:
+        return bars
+    n = packing.shape[1]
+    return packing[row, bars] - row * n
+
+
+def _packed_signals(strategy, data, counts, startbar, params):
+    minperiod, buy, sell = vector_signals(strategy, data, **params)
+    start = max(minperiod - 1, startbar, 0)
+    ok = np.arange(buy.shape[1]) < counts[:, None]
+    ok[:, :start] = False
+    return start, buy & ok, sell & ok
+
+
+def signals(strategy, universe, startbar=0, **params):
+    """
+    Buy/sell conditions of a strategy for every symbol of a universe.
+
+    Args:
+        strategy (type): a strategy class from zwpy_sta.
+        universe (Universe): aligned feeds.
+        startbar (int): first bar of each symbol (counted in its own bars)
+            where orders may be created.
+        params: overrides of the strategy params.
+
+    Returns:
+        (np.ndarray, np.ndarray): bool buy and sell matrices, False where a
+            symbol has no bar and during its indicators' warm-up.
+    """
+    packing = _packing(universe.mask)
+    counts = universe.mask.sum(axis=1)
+    _, buy, sell = _packed_signals(
+        strategy, _pack(universe.data, packing), counts, startbar, params
+    )
+    mask = universe.mask
+    return _unpack(buy, packing, mask, False), _unpack(sell, packing, mask, False)
+
+
+def run_universe(
+    strategy, universe, cash=10000.0, percents=90, commission=0.0, startbar=0, **params
+):
+    """
+    Backtest a strategy on every symbol of a universe at once.
+
+    Each symbol trades its own account, exactly like `run_vectorized` on
+    the symbol alone: orders fill at the next bar's open, buys are sized
+    like `bt.sizers.PercentSizerInt` and rejected when cash is short.
+
+    Args:
+        strategy (type): a strategy class from zwpy_sta.
+        universe (Universe): aligned feeds.
+        cash (float): starting cash of every symbol.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio (e.g. 0.001425).
+        startbar (int): first bar of each symbol where orders may be created.
+        params: overrides of the strategy params.
+
+    Returns:
+        UniverseResult
+    """
+    mask = universe.mask
+    rows, n = mask.shape
+    counts = mask.sum(axis=1)
+    packing = _packing(mask)
+    data = _pack(universe.data, packing)
+    start, buy, sell = _packed_signals(strategy, data, counts, startbar, params)
+    # orders need a next bar to fill
+    tradable = np.arange(n) < (counts - 1)[:, None]
+    closes = data.close
+    pct = percents / 100
+    # bars-major copies: the values of a bar for every symbol are contiguous
+    buys = np.ascontiguousarray((buy & tradable).T)
+    sells = np.ascontiguousarray((sell & tradable).T)
+    opens_t = np.ascontiguousarray(data.open.T)
+    closes_t = np.ascontiguousarray(closes.T)
+    # next bar of each row where it would buy (when flat) or sell (when long)
+    nextbuy, nextsell = _next_true(buys), _next_true(sells)
+
+    # account of each symbol
+    money = np.full(rows, float(cash))
+    size = np.zeros(rows)
+    entry_bar = np.zeros(rows, dtype=np.int64)
+    entry_price = np.zeros(rows)
+    entry_comm = np.zeros(rows)
+    # (bar, rows, position, cash) after each fill; closed trade columns
+    fills, closed = [], []
+
+    # rows with an order created on the previous bar, and their buy stakes
+    b = s = np.empty(0, dtype=np.intp)
+    stake = np.empty(0)
+    i = start
+    while i < n:
+        if len(b) or len(s):
+            if len(b):
+                k, price, m = stake, opens_t[i, b], money[b]
+                # submission check at the creation price, then the fill at open
+                created = closes_t[i - 1, b]
+                ok = m - k * created - k * commission * created >= 0.0
+                left = m - k * price
+                comm = k * commission * price
+                left -= comm
+                ok &= left >= 0.0
+                if not ok.all():
+                    b, k, price = b[ok], k[ok], price[ok]
+                    left, comm = left[ok], comm[ok]
+                money[b], size[b] = left, k
+                entry_bar[b], entry_price[b], entry_comm[b] = i, price, comm
+                fills.append((i, b, k, left))
+            if len(s):
+                k, price, paid = size[s], opens_t[i, s], entry_comm[s]
+                pnl = k * (price - entry_price[s])
+                comm = k * commission * price
+                m = money[s] + (k * entry_price[s] + pnl)
+                m -= comm
+                money[s] = m
+                exits = np.full(len(s), i)
+                trade = (entry_bar[s], entry_price[s], exits, price, k, paid + comm)
+                closed.append((s,) + trade + (pnl, pnl - paid - comm))
+                size[s] = 0.0
+                fills.append((i, s, np.zeros(len(s)), m))
+        else:
+            i = int(np.where(size == 0.0, nextbuy[i], nextsell[i]).min())
+            if i >= n:
+                break
+
+        flat = size == 0.0
+        b = np.flatnonzero(flat & buys[i])
+        if len(b):
+            stake = np.trunc(money[b] / closes_t[i, b] * pct)
+            if not (stake > 0.0).all():
+                b, stake = b[stake > 0.0], stake[stake > 0.0]
+        s = np.flatnonzero(sells[i] & ~flat)
+        i += 1
+
+    position, money_at = _steps((rows, n), fills, float(cash))
+    equity = money_at + position * closes
+    last = closes[np.arange(rows), np.maximum(counts - 1, 0)]
+    value = np.where(counts > 0, money + size * last, money)
+
+    # orders the strategies create on their last bar (a screen of today)
+    lastbuy = buy[np.arange(rows), np.maximum(counts - 1, 0)] & (counts > 0)
+    lastsell = sell[np.arange(rows), np.maximum(counts - 1, 0)] & (counts > 0)
+    orders = np.where(size == 0.0, lastbuy, 0) - np.where(size != 0.0, lastsell, 0)
+
+    open_trades = (size, entry_bar, entry_price, entry_comm)
+    return UniverseResult(
+        list(universe.symbols),
+        value,
+        money,
+        _ledgers(rows, packing, closed, open_trades),
+        _unpack(position, packing, mask, np.nan),
+        _unpack(equity, packing, mask, np.nan),
+        orders.astype(np.int8),
+    )
+
+
+def _next_true(cond):
+    # (bars x rows): index of the first True at or after each bar, or the
+    # bar count
+    n = cond.shape[0]
+    idx = np.where(cond, np.arange(n, dtype=np.int32)[:, None], np.int32(n))
+    return np.minimum.accumulate(idx[::-1], axis=0)[::-1]
+
+
+def _steps(shape, fills, cash):
+    # position and cash after each fill, carried forward over the packed bars
+    position = np.zeros(shape)
+    money = np.full(shape, cash)
+    changed = np.zeros(shape, dtype=bool)
+    for i, r, size, left in fills:
+        position[r, i] = size
+        money[r, i] = left
+        changed[r, i] = True
+    rows, n = shape
+    idx = np.where(changed, np.arange(n), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    idx += np.arange(0, rows * n, n)[:, None]
+    return np.take(position, idx), np.take(money, idx)
+
+
+def _ledgers(rows, packing, closed, open_trades):
+    # one TradeLedger per row, bars mapped back to universe columns
+    if closed:
+        columns = [np.concatenate(c) for c in zip(*closed)]
+    else:
+        columns = [np.empty(0, dtype=np.int64)] * 2 + [np.empty(0)] * 7
+        columns[3] = columns[0]
+    r, entry_bar, entry_price, exit_bar, exit_price, size, comm, pnl, pnlcomm = (
+        columns
+    )
+    sort = np.argsort(r, kind="stable")
+    bounds = np.searchsorted(r[sort], np.arange(rows + 1))
+    size_open, bar_open, price_open, comm_open = open_trades
+
+    ledgers = []
+    for row in range(rows):
+        take = sort[bounds[row] : bounds[row + 1]]
+        ledger = TradeLedger.from_numpy(
+            dict(
+                entry_bar=_columns(packing, row, entry_bar[take]),
+                entry_price=entry_price[take],
+                exit_bar=_columns(packing, row, exit_bar[take]),
+                exit_price=exit_price[take],
+                size=size[take],
+                commission=comm[take],
+                pnl=pnl[take],
+                pnlcomm=pnlcomm[take],
+            )
+        )
+        if size_open[row]:
+            ledger.append(
+                int(_columns(packing, row, bar_open[row])),
+                float(price_open[row]),
+                None,
+                None,
+                float(size_open[row]),
+                float(comm_open[row]),
+                None,
+                None,
+            )
+        ledgers.append(ledger)
+    return ledgers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("strategy", help="strategy class name in zwpy_sta")
+    parser.add_argument("directory", help="directory of Yahoo format csv files")
+    parser.add_argument("--param", nargs="+", metavar="NAME=VALUE")
+    parser.add_argument("--fromdate", type=_parse_date)
+    parser.add_argument("--todate", type=_parse_date)
+    parser.add_argument("--cachedir", default=None)
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--percents", type=int, default=90)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument("--raw", action="store_true", help="unadjusted prices")
+    parser.add_argument("--top", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    universe = load_universe(
+        symbols(args.directory),
+        args.fromdate,
+        args.todate,
+        args.cachedir,
+        adjclose=not args.raw,
+    )
+    start = time.perf_counter()
+    result = run_universe(
+        getattr(zwpy_sta, args.strategy),
+        universe,
+        cash=args.cash,
+        percents=args.percents,
+        commission=args.commission,
+        **_parse_params(args.param)
+    )
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    for row, symbol in enumerate(result.symbols):
+        equity = result.equity[row][universe.mask[row]]
+        exits = np.frombuffer(result.trades[row].exit_bar, dtype=np.int64)
+        rows.append(
+            dict(
+                symbol=symbol,
+                bars=len(equity),
+                value=float(result.value[row]),
+                trades=int(np.count_nonzero(exits >= 0)),  # closed ones
+                drawdown=max_drawdown(equity) if len(equity) else 0.0,
+                order={1: "buy", -1: "sell"}.get(int(result.orders[row]), ""),
+            )
+        )
+    rows.sort(key=lambda r: -r["value"])
+    print(format_table(rows, args.top))
+    print(
+        "%d symbols x %d bars in %.1f ms"
+        % (len(universe.symbols), len(universe.dates), elapsed * 1000)
+    )
+
+
+if __name__ == "__main__":
+    main()
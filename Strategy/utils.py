@@ -1,11 +1,135 @@
 """
 Defines class / functions tools for strategies.
 """
+import array
+import math
+
 import backtrader as bt
+import numpy as np
+
+
+# windows up to this long are summed whole by math.fsum (C), which beats
+# the running partials below until the window gets longer
+_SHORT_WINDOW = 64
+
+
+def rolling_fsum(values, period):
+    """
+    Moving sums of a list, as `math.fsum` of each full window.
+
+    Long windows keep a running sum as Shewchuk partials (see `msum_add`),
+    adding the new value and removing the oldest one, so each bar costs
+    O(1) instead of O(period) and still gives `math.fsum`'s result. A
+    window holding inf or nan falls back to `math.fsum` of the window.
+
+    Returns:
+        list: `len(values) - period + 1` sums, the first one ends at `period - 1`.
+    """
+    fsum = math.fsum
+    if period <= _SHORT_WINDOW:
+        return [
+            fsum(values[i - period + 1 : i + 1]) for i in range(period - 1, len(values))
+        ]
+
+    isfinite = math.isfinite
+    partials = []
+    nonfinite = 0  # inf / nan values in the window, kept out of the partials
+    sums = []
+    for i, x in enumerate(values):
+        if isfinite(x):
+            msum_add(partials, x)
+        else:
+            nonfinite += 1
+        if i >= period:
+            old = values[i - period]
+            if isfinite(old):
+                msum_add(partials, -old)
+            else:
+                nonfinite -= 1
+        if i >= period - 1:
+            total = fsum(partials)
+            # an overflowing partial poisons the running sum too
+            if nonfinite or not isfinite(total):
+                total = fsum(values[i - period + 1 : i + 1])
+            sums.append(total)
+    return sums
+
+
+def msum_add(partials, x):
+    """
+    Add `x` to a running sum kept as Shewchuk partials (in place).
+
+    `math.fsum(partials)` is then the correctly rounded sum, so values
+    can be added and removed in O(1) and the result still equals
+    `math.fsum` of the values currently in the sum.
+    """
+    i = 0
+    for y in partials:
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            partials[i] = lo
+            i += 1
+        x = hi
+    partials[i:] = [x]
+
+
+class WindowFsum(object):
+    """
+    `math.fsum` of the last `period` values pushed, in O(1) per value.
+
+    The running sum is kept as Shewchuk partials (see `msum_add`); inf and
+    nan values are left out of them and counted, and while the window
+    holds any the sum is `math.fsum` of the window, as `rolling_fsum`
+    gives. Once they leave it, the partials are still exact.
+    """
+
+    def __init__(self, period):
+        self.window = [0.0] * period
+        self.slot = 0
+        self.partials = []
+        self.nonfinite = 0
+
+    def push(self, x):
+        """Add `x` to the window, dropping its oldest value."""
+        old = self.window[self.slot]
+        if not math.isfinite(old):
+            self.nonfinite -= 1
+        elif old != 0.0:
+            msum_add(self.partials, -old)
+        if not math.isfinite(x):
+            self.nonfinite += 1
+        elif x != 0.0:
+            msum_add(self.partials, x)
+        self.window[self.slot] = x
+        self.slot = (self.slot + 1) % len(self.window)
+
+    def sum(self):
+        if self.nonfinite:
+            return math.fsum(self.window)
+        try:
+            total = math.fsum(self.partials)
+        except (ValueError, OverflowError):
+            total = math.inf
+        if not math.isfinite(total):
+            # finite values whose sum overflowed poison the partials: start
+            # over from the window, so they recover once those values leave
+            self.partials = []
+            for x in self.window:
+                if x != 0.0:
+                    msum_add(self.partials, x)
+            total = math.fsum(self.window)
+        return total
 
 
 class VolumeWeightedAveragePrice(bt.Indicator):
     """
+    Keeps running sums over a ring buffer (O(1) per bar) and has a
+    vectorized `once()`; values equal `SumN(typprice * volume) / SumN(volume)`.
+    A window without volume gives NaN.
+
     Author: B. Bradford
 
     MIT License
@@ -48,13 +172,47 @@ class VolumeWeightedAveragePrice(bt.Indicator):
     plotlines = dict(VWAP=dict(alpha=1, linestyle="-", linewidth=2.0))
 
     def __init__(self):
-        # Before super to ensure mixins (right-hand side in subclassing)
-        # can see the assignment operation and operate on the line
-        cumvol = bt.ind.SumN(self.data.volume, period=self.p.period)
-        typprice = (
-            (self.data.close + self.data.high + self.data.low) / 3
-        ) * self.data.volume
-        cumtypprice = bt.ind.SumN(typprice, period=self.p.period)
-        self.lines[0] = cumtypprice / cumvol
+        self.addminperiod(self.p.period)
+
+        # window sums of typical price * volume and of volume
+        self._cumtypprice = WindowFsum(self.p.period)
+        self._cumvol = WindowFsum(self.p.period)
 
         super(VolumeWeightedAveragePrice, self).__init__()
+
+    def _push(self):
+        d = self.data
+        vol = d.volume[0]
+        self._cumtypprice.push(((d.close[0] + d.high[0] + d.low[0]) / 3) * vol)
+        self._cumvol.push(vol)
+
+    def prenext(self):
+        self._push()
+
+    def next(self):
+        self._push()
+        cumvol = self._cumvol.sum()
+        # no volume in the window: no price to average
+        if cumvol != 0.0:
+            self.lines[0][0] = self._cumtypprice.sum() / cumvol
+        else:
+            self.lines[0][0] = float("nan")
+
+    def once(self, start, end):
+        period = self.p.period
+        lo = max(start - period + 1, 0)
+        d = self.data
+        close, high, low, vol = (
+            np.frombuffer(line.array[lo:end], dtype=np.float64)
+            for line in (d.close, d.high, d.low, d.volume)
+        )
+        typprice = ((close + high + low) / 3) * vol
+
+        cumtypprice = np.array(rolling_fsum(typprice.tolist(), period))
+        cumvol = np.array(rolling_fsum(vol.tolist(), period))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.where(cumvol != 0, cumtypprice / cumvol, np.nan)
+
+        # vwap[0] ends at bar lo + period - 1
+        skip = start - (lo + period - 1)
+        self.lines[0].array[start:end] = array.array("d", vwap[skip:].tobytes())
@@ -0,0 +1,312 @@
+"""
+Vectorized fast path for the strategies in zwpy_sta.
+
+Indicators and buy/sell conditions are computed over the whole
+`OHLCV` arrays at once, then the long-only, one-order-at-a-time
+state machine of `BaseStrategyFrame` jumps from signal to signal.
+
+Results (trades and final value) are the same as `cerebro.run()` with
+`PercentSizerInt` and a percentage commission, as set in `main.py`;
+the indicators (see indicators.py) agree with backtrader's bit for bit.
+"""
+import collections
+
+import numpy as np
+
+from Strategy import zwpy_sta
+from Strategy.indcache import cached
+from Strategy.indicators import (
+    bbands,
+    crossover,
+    highest,
+    lag,
+    lowest,
+    macd,
+    rsi,
+    sma,
+    stochastic_fast,
+    vwap,
+)
+
+Trade = collections.namedtuple(
+    "Trade",
+    [
+        "entry_bar",
+        "entry_price",
+        "exit_bar",
+        "exit_price",
+        "size",
+        "commission",
+        "pnl",
+        "pnlcomm",
+    ],
+)
+
+VectorResult = collections.namedtuple(
+    "VectorResult", ["value", "cash", "trades", "position", "equity"]
+)
+
+
+def closed_trades(trades):
+    """Number of closed trades in a list of `Trade` (an open one has no exit)."""
+    return sum(trade.exit_bar is not None for trade in trades)
+
+
+# ===== strategy signals =====
+# Each function returns (minperiod, buy, sell): `buy` is the condition checked
+# in next() when out of the market, `sell` the one checked when in it.
+# Prices may also be (symbols x bars) matrices, see universe.py.
+
+
+def _tim0_signals(d, p):
+    shape = d.close.shape
+    return 1, np.ones(shape, dtype=bool), np.zeros(shape, dtype=bool)
+
+
+def _sma_signals(d, p):
+    ma = cached(sma, d.close, period=p["maperiod"])
+    return p["maperiod"], d.close > ma, d.close < ma
+
+
+def _cma_signals(d, p):
+    ma = cached(sma, d.close, period=p["maperiod"])
+    close, ma_lag2, close_lag2 = d.close, lag(ma, 2), lag(d.close, 2)
+    up = (close > ma) & (close_lag2 < ma_lag2) & (close > close_lag2)
+    down = (close < ma) & (close_lag2 > ma_lag2) & (close < close_lag2)
+    return p["maperiod"], up, down
+
+
+def _vwap_signals(d, p):
+    vw = cached(vwap, d.high, d.low, d.close, d.volume, period=p["maperiod"])
+    kvwap = p["kvwap"]
+    with np.errstate(invalid="ignore"):
+        ok = vw > 0
+        buy = ok & (d.close > vw * (1 + kvwap))
+        sell = ok & (d.close < vw * (1 - kvwap)) & (d.close > 0)
+    return p["maperiod"], buy, sell
+
+
+def _bbands_signals(d, p):
+    _, top, bot = cached(bbands, d.close, period=p["BBandsperiod"])
+    return p["BBandsperiod"], d.close < bot, d.close > top
+
+
+def _tur_signals(d, p):
+    hh = lag(cached(highest, d.high, period=p["n_high"]), 1)
+    ll = lag(cached(lowest, d.low, period=p["n_low"]), 1)
+    return max(p["n_high"], p["n_low"]), d.close > hh, d.close < ll
+
+
+def _macd_minperiod(p):
+    return max(p["fast_period"], p["slow_period"]) + p["signal_period"] - 1
+
+
+def _macd(d, p):
+    return cached(
+        macd,
+        d.close,
+        period_me1=p["fast_period"],
+        period_me2=p["slow_period"],
+        period_signal=p["signal_period"],
+    )
+
+
+def _macdv1_signals(d, p):
+    line, _ = _macd(d, p)
+    return _macd_minperiod(p), line > 0, line < 0
+
+
+def _macdv2_signals(d, p):
+    line, signal = _macd(d, p)
+    return _macd_minperiod(p), line > signal, line < signal
+
+
+def _kd(d, p):
+    return cached(
+        stochastic_fast,
+        d.high,
+        d.low,
+        d.close,
+        period=1,
+        period_dfast=p["period_dfast"],
+    )
+
+
+def _kdjv1_signals(d, p):
+    k, _ = _kd(d, p)
+    return p["period_dfast"], k > 90, k < 10
+
+
+def _kdjv2_signals(d, p):
+    k, dline = _kd(d, p)
+    cross = crossover(k, dline)
+    return p["period_dfast"] + 1, cross == 1, cross == -1
+
+
+def _rsi_signals(d, p):
+    r = cached(rsi, d.close, period=p["period"])
+    return p["period"] + 1, r > p["kbuy"], r < p["ksell"]
+
+
+SIGNALS = {
+    zwpy_sta.Tim0Strategy: _tim0_signals,
+    zwpy_sta.SmaStrategy: _sma_signals,
+    zwpy_sta.CmaStrategy: _cma_signals,
+    zwpy_sta.VwapStrategy: _vwap_signals,
+    zwpy_sta.BBandsStrategy: _bbands_signals,
+    zwpy_sta.TurStrategy: _tur_signals,
+    zwpy_sta.MacdV1Strategy: _macdv1_signals,
+    zwpy_sta.MacdV2Strategy: _macdv2_signals,
+    zwpy_sta.KdjV1Strategy: _kdjv1_signals,
+    zwpy_sta.KdjV2Strategy: _kdjv2_signals,
+    zwpy_sta.RsiStrategy: _rsi_signals,
+}
+
+
+def strategy_params(strategy, **params):
+    """
+    Merge keyword arguments with the defaults of a strategy `params` tuple.
+
+    Raises:
+        TypeError: if a keyword is not a parameter of the strategy.
+    """
+    merged = dict(strategy.params._getitems())
+    unknown = set(params) - set(merged)
+    if unknown:
+        raise TypeError(
+            "%s got unexpected params: %s"
+            % (strategy.__name__, ", ".join(sorted(unknown)))
+        )
+    merged.update(params)
+    return merged
+
+
+def signals(strategy, data, **params):
+    """
+    Compute the buy/sell condition arrays of a strategy.
+
+    Args:
+        strategy (type): a strategy class from zwpy_sta.
+        data (OHLCV): price arrays.
+        params: overrides of the strategy params.
+
+    Returns:
+        (int, np.ndarray, np.ndarray): minperiod, buy and sell conditions.
+    """
+    for cls in strategy.__mro__:
+        if cls in SIGNALS:
+            return SIGNALS[cls](data, strategy_params(strategy, **params))
+    raise ValueError("No vectorized signals for %s" % strategy.__name__)
+
+
+# ===== state machine =====
+
+
+def run_vectorized(
+    strategy, data, cash=10000.0, percents=90, commission=0.0, startbar=0, **params
+):
+    """
+    Backtest a strategy on price arrays without cerebro.
+
+    Orders created at a bar's close fill at the next bar's open;
+    buys are sized like `bt.sizers.PercentSizerInt` and rejected
+    (then retried on a later signal) when cash is not enough.
+
+    Args:
+        strategy (type): a strategy class from zwpy_sta.
+        data (OHLCV): price arrays.
+        cash (float): starting cash.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio (e.g. 0.001425).
+        startbar (int): first bar where orders may be created; bars before
+            only warm the indicators up.
+        params: overrides of the strategy params.
+
+    Returns:
+        VectorResult: final value and cash, list of `Trade`,
+            position size and portfolio value at each bar close.
+    """
+    minperiod, buy, sell = signals(strategy, data, **params)
+    n = len(data.close)
+    opens, closes = data.open.tolist(), data.close.tolist()
+    start = max(minperiod - 1, startbar, 0)
+    buy_idx = np.flatnonzero(buy[start:]) + start
+    sell_idx = np.flatnonzero(sell[start:]) + start
+    pct = percents / 100
+    start_cash = cash
+
+    trades, events = [], []
+    size = 0
+    entry_bar = entry_price = entry_comm = None
+    i = start
+    while i < n:
+        if not size:
+            k = np.searchsorted(buy_idx, i)
+            if k == len(buy_idx):
+                break
+            i = int(buy_idx[k])
+            stake = int(cash / closes[i] * pct)
+            if not stake:
+                i += 1
+                continue
+            j = i + 1
+            if j >= n:
+                break
+            # submission check at the creation price, then the fill at open
+            price = closes[i]
+            if cash - stake * price - stake * commission * price < 0.0:
+                i = j
+                continue
+            price = opens[j]
+            left = cash - stake * price
+            comm = stake * commission * price
+            left -= comm
+            if left < 0.0:
+                i = j
+                continue
+            cash, size = left, stake
+            entry_bar, entry_price, entry_comm = j, price, comm
+            events.append((j, size, cash))
+            i = j
+        else:
+            k = np.searchsorted(sell_idx, i)
+            if k == len(sell_idx):
+                break
+            i = int(sell_idx[k])
+            j = i + 1
+            if j >= n:
+                break
+            price = opens[j]
+            pnl = size * (price - entry_price)
+            comm = size * commission * price
+            cash += size * entry_price + pnl
+            cash -= comm
+            trades.append(
+                Trade(
+                    entry_bar,
+                    entry_price,
+                    j,
+                    price,
+                    size,
+                    entry_comm + comm,
+                    pnl,
+                    pnl - entry_comm - comm,
+                )
+            )
+            size = 0
+            events.append((j, 0, cash))
+            i = j
+
+    if size:
+        trades.append(
+            Trade(entry_bar, entry_price, None, None, size, entry_comm, None, None)
+        )
+
+    # step series of position size and cash between fills
+    bars = np.array([0] + [e[0] for e in events], dtype=np.int64)
+    counts = np.diff(np.append(bars, n))
+    position = np.repeat([0] + [e[1] for e in events], counts).astype(np.float64)
+    cashes = np.repeat([start_cash] + [e[2] for e in events], counts)
+    equity = cashes + position * data.close
+    value = cash + size * closes[-1] if n else cash
+    return VectorResult(value, cash, trades, position, equity)
@@ -0,0 +1,293 @@
+"""
+Walk-forward optimization of the zwpy_sta strategies.
+
+The data is split into rolling in-sample / out-of-sample windows.
+On each in-sample window the strategy params are optimized (all windows
+and combinations in parallel, with the vectorized engine); the best
+combination then trades the following out-of-sample window. Windows are
+slices (views) of one loaded array.
+
+Out-of-sample runs keep the in-sample bars as indicator history but
+only trade inside their window, and start flat with the value the
+previous window ended with, so their equity curves stitch into one. A
+position still open at the end of a window is sold at its last close,
+paying the commission (taken from that close's value), as the next
+window may trade other params.
+
+Example:
+    python -m Strategy.walkforward MacdV2Strategy ./sample_data/orcl-1995-2014.txt \\
+        --grid fast_period=8,12,16 slow_period=20,26,32 --insample 750 --outsample 250
+"""
+import argparse
+import collections
+import concurrent.futures
+import datetime
+import os
+
+import numpy as np
+
+from Strategy import zwpy_sta
+from Strategy.data import OHLCV, read_yahoo_csv
+from Strategy.sweep import (
+    _parse_date,
+    _parse_space,
+    format_table,
+    grid,
+    max_drawdown,
+    random_sample,
+)
+from Strategy.vectorized import closed_trades, run_vectorized, strategy_params
+
+Window = collections.namedtuple("Window", ["start", "split", "end"])
+Window.__doc__ = """
+    Bar indices of a walk-forward window.
+
+    Args:
+        start (int): first in-sample bar.
+        split (int): first out-of-sample bar (end of the in-sample part).
+        end (int): end of the out-of-sample part (exclusive).
+    """
+
+WalkForwardResult = collections.namedtuple(
+    "WalkForwardResult", ["date", "equity", "windows"]
+)
+WalkForwardResult.__doc__ = """
+    Result of `walk_forward`.
+
+    Args:
+        date (np.ndarray): date ordinals of the out-of-sample bars.
+        equity (np.ndarray): stitched out-of-sample portfolio value.
+        windows (list of dict): one row per window: dates, chosen params,
+            in-sample score, out-of-sample return, trades and drawdown.
+    """
+
+# per worker process: the data given to _init_worker
+_DATA = None
+
+
+def windows(n, insample, outsample, step=None, anchored=False):
+    """
+    Split `n` bars into walk-forward windows.
+
+    Args:
+        n (int): number of bars.
+        insample (int): in-sample bars of each window.
+        outsample (int): out-of-sample bars of each window.
+        step (int): bars between windows (default: `outsample`,
+            so out-of-sample parts follow each other); a longer step
+            leaves bars out.
+        anchored (bool): in-sample parts all start at bar 0.
+
+    Returns:
+        list of Window: the last out-of-sample part may be shorter.
+
+    Raises:
+        ValueError: if `step` is shorter than `outsample` (out-of-sample
+            parts would overlap).
+    """
+    step = step or outsample
+    if step < outsample:
+        raise ValueError(
+            "step %d is shorter than outsample %d: out-of-sample parts would"
+            " overlap" % (step, outsample)
+        )
+    found = []
+    split = insample
+    while split < n:
+        start = 0 if anchored else split - insample
+        found.append(Window(start, split, min(split + outsample, n)))
+        split += step
+    return found
+
+
+def _view(data, start, end):
+    return OHLCV(*(column[start:end] for column in data))
+
+
+def _init_worker(data):
+    global _DATA
+    _DATA = data
+
+
+def _score(result, sort):
+    if sort == "drawdown":
+        return -max_drawdown(result.equity)
+    if sort == "trades":
+        return closed_trades(result.trades)
+    return result.value
+
+
+def _optimize_one(job):
+    strategy, window, params, broker, sort = job
+    result = run_vectorized(
+        strategy, _view(_DATA, window.start, window.split), **broker, **params
+    )
+    return _score(result, sort)
+
+
+def walk_forward(
+    strategy,
+    data,
+    combos,
+    insample,
+    outsample,
+    step=None,
+    anchored=False,
+    processes=None,
+    cash=10000.0,
+    percents=90,
+    commission=0.0,
+    sort="value",
+):
+    """
+    Walk-forward optimization of a strategy.
+
+    Args:
+        strategy (type): a strategy class from zwpy_sta.
+        data (OHLCV): price arrays.
+        combos (list of dict): parameter sets to choose from,
+            see `sweep.grid` and `sweep.random_sample`.
+        insample, outsample, step, anchored: window layout, see `windows`.
+        processes (int): worker processes (default: cpu count).
+        cash (float): starting cash.
+        percents (int): percents of cash used to buy.
+        commission (float): commission ratio.
+        sort (str): in-sample score: "value" (final value), "trades"
+            or "drawdown" (lowest max drawdown).
+
+    Returns:
+        WalkForwardResult
+
+    Raises:
+        ValueError: if out-of-sample parts would overlap, see `windows`.
+    """
+    for params in combos:
+        strategy_params(strategy, **params)  # fail early on a bad name
+
+    layout = windows(len(data.close), insample, outsample, step, anchored)
+    broker = dict(cash=cash, percents=percents, commission=commission)
+    jobs = [(strategy, w, params, broker, sort) for w in layout for params in combos]
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (processes * 4))
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(data,)
+    ) as executor:
+        scores = list(executor.map(_optimize_one, jobs, chunksize=chunksize))
+    scores = np.array(scores, dtype=np.float64).reshape(len(layout), len(combos))
+
+    value = cash
+    dates, equities, rows = [], [], []
+    for k, w in enumerate(layout):
+        best = int(np.argmax(scores[k]))
+        params = combos[best]
+        # in-sample bars warm the indicators up, orders start at the split
+        result = run_vectorized(
+            strategy,
+            _view(data, w.start, w.end),
+            cash=value,
+            percents=percents,
+            commission=commission,
+            startbar=w.split - w.start,
+            **params
+        )
+        equity = result.equity[w.split - w.start :]
+        size = result.position[-1]
+        if size and k < len(layout) - 1:
+            # forced exit before the next window: pay its commission
+            equity = equity.copy()
+            equity[-1] -= size * data.close[w.end - 1] * commission
+        dates.append(data.date[w.split : w.end])
+        equities.append(equity)
+        rows.append(
+            dict(
+                window=k,
+                insample_from=_isodate(data.date[w.start]),
+                oos_from=_isodate(data.date[w.split]),
+                oos_to=_isodate(data.date[w.end - 1]),
+                **params,
+                insample_score=float(scores[k, best]),
+                oos_return=(equity[-1] / value - 1.0) * 100.0,
+                oos_trades=closed_trades(result.trades),
+                oos_drawdown=max_drawdown(equity),
+            )
+        )
+        value = float(equity[-1])
+
+    if not layout:
+        return WalkForwardResult(np.empty(0, np.int64), np.empty(0), rows)
+    return WalkForwardResult(np.concatenate(dates), np.concatenate(equities), rows)
+
+
+def _isodate(ordinal):
+    return datetime.date.fromordinal(int(ordinal)).isoformat()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("strategy", help="strategy class name in zwpy_sta")
+    parser.add_argument("datapath", help="Yahoo format csv file")
+    parser.add_argument("--grid", nargs="+", metavar="NAME=V1,V2")
+    parser.add_argument("--random", nargs="+", metavar="NAME=LOW:HIGH")
+    parser.add_argument("-n", type=int, default=100, help="random sample size")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--insample", type=int, default=750, help="in-sample bars")
+    parser.add_argument("--outsample", type=int, default=250, help="out-of-sample bars")
+    parser.add_argument("--step", type=int, default=None)
+    parser.add_argument("--anchored", action="store_true")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--fromdate", type=_parse_date)
+    parser.add_argument("--todate", type=_parse_date)
+    parser.add_argument("--reverse", action="store_true")
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--percents", type=int, default=90)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument(
+        "--sort", choices=["value", "trades", "drawdown"], default="value"
+    )
+    parser.add_argument("--equity", metavar="CSV", help="write the stitched equity")
+    args = parser.parse_args(argv)
+
+    strategy = getattr(zwpy_sta, args.strategy)
+    if args.random:
+        combos = random_sample(args.n, args.seed, **_parse_space(args.random))
+    else:
+        combos = grid(**_parse_space(args.grid or []))
+    data = read_yahoo_csv(args.datapath, args.fromdate, args.todate, args.reverse)
+
+    try:
+        result = walk_forward(
+            strategy,
+            data,
+            combos,
+            args.insample,
+            args.outsample,
+            step=args.step,
+            anchored=args.anchored,
+            processes=args.processes,
+            cash=args.cash,
+            percents=args.percents,
+            commission=args.commission,
+            sort=args.sort,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(format_table(result.windows))
+    if len(result.equity):
+        print(
+            "Final value %.2f (%.2f%%), max drawdown %.2f%%"
+            % (
+                result.equity[-1],
+                (result.equity[-1] / args.cash - 1.0) * 100.0,
+                max_drawdown(result.equity),
+            )
+        )
+    if args.equity:
+        with open(args.equity, "w") as f:
+            f.write("date,value\n")
+            for d, v in zip(result.date.tolist(), result.equity.tolist()):
+                f.write("%s,%.2f\n" % (_isodate(d), v))
+
+
+if __name__ == "__main__":
+    main()
@@ -25,16 +25,10 @@ class Tim0Strategy(BaseStrategyFrame):
         # multiple inheritance
         super(Tim0Strategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -44,7 +38,7 @@ class Tim0Strategy(BaseStrategyFrame):
         if not self.position:
 
             # BUY, BUY, BUY!!! (with all possible default parameters)
-            self.log("BUY CREATE, %.2f" % self.dataclose[0])
+            self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
             # Keep track of the created order to avoid a 2nd order
             self.order = self.buy()
@@ -69,22 +63,17 @@ class SmaStrategy(BaseStrategyFrame):
         # multiple inheritance
         super(SmaStrategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("maperiod:", self.params.maperiod)
-
         # Add indicators
-        self.sma = bt.indicators.SimpleMovingAverage(
-            self.dataclose, period=self.params.maperiod
+        self.sma = self.indicator(
+            bt.indicators.SimpleMovingAverage,
+            self.dataclose,
+            period=self.params.maperiod,
         )
 
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -97,7 +86,7 @@ class SmaStrategy(BaseStrategyFrame):
             if self.dataclose[0] > self.sma[0]:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -106,7 +95,7 @@ class SmaStrategy(BaseStrategyFrame):
 
             if self.dataclose[0] < self.sma[0]:
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -127,27 +116,24 @@ class CmaStrategy(BaseStrategyFrame):
 
     params = (("maperiod", 15),)
 
+    lookback = 2  # next() compares with the values of two bars ago
+
     def __init__(self):
 
         # multiple inheritance
         super(CmaStrategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("maperiod:", self.params.maperiod)
-
         # Add indicators
-        self.sma = bt.indicators.SimpleMovingAverage(
-            self.dataclose, period=self.params.maperiod
+        self.sma = self.indicator(
+            bt.indicators.SimpleMovingAverage,
+            self.dataclose,
+            period=self.params.maperiod,
         )
 
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -169,7 +155,7 @@ class CmaStrategy(BaseStrategyFrame):
             if trend == 1:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -178,7 +164,7 @@ class CmaStrategy(BaseStrategyFrame):
 
             if trend == -1:
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -203,10 +189,6 @@ class VwapStrategy(BaseStrategyFrame):
         # multiple inheritance
         super(VwapStrategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("maperiod:", self.params.maperiod)
-        print("kvwap:", self.params.kvwap)
-
         # Add indicators
         self.vwap = VolumeWeightedAveragePrice(
             self.datas[0], period=self.params.maperiod
@@ -215,11 +197,7 @@ class VwapStrategy(BaseStrategyFrame):
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -239,7 +217,7 @@ class VwapStrategy(BaseStrategyFrame):
                 if (close > vwap * (1 + kvwap)) and (stock_value < (cash * 0.9)):
 
                     # BUY, BUY, BUY!!! (with all possible default parameters)
-                    self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                    self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                     # Keep track of the created order to avoid a 2nd order
                     self.order = self.buy()
@@ -249,7 +227,7 @@ class VwapStrategy(BaseStrategyFrame):
                 if (close < vwap * (1 - kvwap)) and (stock_value > 0):
 
                     # SELL, SELL, SELL!!! (with all possible default parameters)
-                    self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                    self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                     # Keep track of the created order to avoid a 2nd order
                     self.order = self.sell()
@@ -275,22 +253,15 @@ class BBandsStrategy(BaseStrategyFrame):
         # multiple inheritance
         super(BBandsStrategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("BBandsperiod:", self.params.BBandsperiod)
-
         # Add indicators
-        self.bband = bt.indicators.BBands(
-            self.dataclose, period=self.params.BBandsperiod
+        self.bband = self.indicator(
+            bt.indicators.BBands, self.dataclose, period=self.params.BBandsperiod
         )
 
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -301,7 +272,7 @@ class BBandsStrategy(BaseStrategyFrame):
             if self.dataclose[0] < self.bband.lines.bot[0]:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -310,7 +281,7 @@ class BBandsStrategy(BaseStrategyFrame):
             if self.dataclose[0] > self.bband.lines.top[0]:
 
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -332,30 +303,26 @@ class TurStrategy(BaseStrategyFrame):
 
     params = (("n_high", 30), ("n_low", 15))
 
+    lookback = 1  # next() compares with the previous highest / lowest
+
     def __init__(self):
 
         # multiple inheritance
         super(TurStrategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("n_high:", self.params.n_high)
-        print("n_low:", self.params.n_low)
-
         # Add indicators
-        self.pass_highest = bt.indicators.Highest(
-            self.datahigh, period=self.params.n_high
+        self.pass_highest = self.indicator(
+            bt.indicators.Highest, self.datahigh, period=self.params.n_high
         )
 
-        self.pass_lowest = bt.indicators.Lowest(self.datalow, period=self.params.n_low)
+        self.pass_lowest = self.indicator(
+            bt.indicators.Lowest, self.datalow, period=self.params.n_low
+        )
 
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -368,7 +335,7 @@ class TurStrategy(BaseStrategyFrame):
             if self.dataclose[0] > self.pass_highest[-1]:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -377,7 +344,7 @@ class TurStrategy(BaseStrategyFrame):
 
             if self.dataclose[0] < self.pass_lowest[-1]:
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -405,13 +372,9 @@ class MacdV1Strategy(BaseStrategyFrame):
         # multiple inheritance
         super(MacdV1Strategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("period_me1:", self.params.fast_period)
-        print("period_me2:", self.params.slow_period)
-        print("period_signal:", self.params.signal_period)
-
         # Add indicators
-        self.macd = bt.indicators.MACD(
+        self.macd = self.indicator(
+            bt.indicators.MACD,
             self.dataclose,
             period_me1=self.params.fast_period,
             period_me2=self.params.slow_period,
@@ -421,11 +384,7 @@ class MacdV1Strategy(BaseStrategyFrame):
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -438,7 +397,7 @@ class MacdV1Strategy(BaseStrategyFrame):
             if self.macd.macd[0] > 0:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -449,7 +408,7 @@ class MacdV1Strategy(BaseStrategyFrame):
             if self.macd.macd[0] < 0:
 
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -476,13 +435,9 @@ class MacdV2Strategy(BaseStrategyFrame):
         # multiple inheritance
         super(MacdV2Strategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("period_me1:", self.params.fast_period)
-        print("period_me2:", self.params.slow_period)
-        print("period_signal:", self.params.signal_period)
-
         # Add indicators
-        self.macd = bt.indicators.MACD(
+        self.macd = self.indicator(
+            bt.indicators.MACD,
             self.dataclose,
             period_me1=self.params.fast_period,
             period_me2=self.params.slow_period,
@@ -492,11 +447,7 @@ class MacdV2Strategy(BaseStrategyFrame):
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -509,7 +460,7 @@ class MacdV2Strategy(BaseStrategyFrame):
             if self.macd.macd[0] > self.macd.signal[0]:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -519,7 +470,7 @@ class MacdV2Strategy(BaseStrategyFrame):
             if self.macd.macd[0] < self.macd.signal[0]:
 
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -545,11 +496,9 @@ class KdjV1Strategy(BaseStrategyFrame):
         # multiple inheritance
         super(KdjV1Strategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("period_dfast:", self.params.period_dfast)
-
         # Add indicators
-        self.kd = bt.indicators.StochasticFast(
+        self.kd = self.indicator(
+            bt.indicators.StochasticFast,
             self.datas[0],
             period=1,
             period_dfast=self.params.period_dfast,
@@ -560,11 +509,7 @@ class KdjV1Strategy(BaseStrategyFrame):
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -577,20 +522,19 @@ class KdjV1Strategy(BaseStrategyFrame):
             if self.kd.percK[0] > 90:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
-
-                print(self.kd.percK[0])
-                print("=" * 25)
+                if self.params.printlog:
+                    self.log("K: %.2f", args=(self.kd.percK[0],))
 
         else:
 
             if self.kd.percK[0] < 10:
 
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -616,11 +560,9 @@ class KdjV2Strategy(BaseStrategyFrame):
         # multiple inheritance
         super(KdjV2Strategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("period_dfast:", self.params.period_dfast)
-
         # Add indicators
-        self.kd = bt.indicators.StochasticFast(
+        self.kd = self.indicator(
+            bt.indicators.StochasticFast,
             self.datas[0],
             period=1,
             period_dfast=self.params.period_dfast,
@@ -633,11 +575,7 @@ class KdjV2Strategy(BaseStrategyFrame):
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -650,7 +588,7 @@ class KdjV2Strategy(BaseStrategyFrame):
             if self.crossover[0] == 1:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -660,7 +598,7 @@ class KdjV2Strategy(BaseStrategyFrame):
             if self.crossover[0] == -1:
 
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -688,13 +626,9 @@ class RsiStrategy(BaseStrategyFrame):
         # multiple inheritance
         super(RsiStrategy, self).__init__()
 
-        print("printlog:", self.params.printlog)
-        print("period:", self.params.period)
-        print("kbuy:", self.params.kbuy)
-        print("ksell:", self.params.ksell)
-
         # Add indicators
-        self.rsi = bt.indicators.RelativeStrengthIndex(
+        self.rsi = self.indicator(
+            bt.indicators.RelativeStrengthIndex,
             self.dataclose,
             period=self.params.period,
             movav=bt.indicators.EMA,
@@ -704,11 +638,7 @@ class RsiStrategy(BaseStrategyFrame):
     def next(self):
         # Simply log the closing price of the series from the reference
         # self.log("Close, %.2f" % self.dataclose[0])
-        self.log(
-            "O:{:.2f}, H:{:.2f}, L:{:.2f}, C:{:.2f}".format(
-                self.dataopen[0], self.datahigh[0], self.datalow[0], self.dataclose[0]
-            )
-        )
+        self.log_bar()
 
         # Check if an order is pending ... if yes, we cannot send a 2nd one
         if self.order:
@@ -721,7 +651,7 @@ class RsiStrategy(BaseStrategyFrame):
             if self.rsi[0] > self.params.kbuy:
 
                 # BUY, BUY, BUY!!! (with all possible default parameters)
-                self.log("BUY CREATE, %.2f" % self.dataclose[0])
+                self.log("BUY CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.buy()
@@ -731,7 +661,7 @@ class RsiStrategy(BaseStrategyFrame):
             if self.rsi[0] < self.params.ksell:
 
                 # SELL, SELL, SELL!!! (with all possible default parameters)
-                self.log("SELL CREATE, %.2f" % self.dataclose[0])
+                self.log("SELL CREATE, %.2f", args=(self.dataclose[0],))
 
                 # Keep track of the created order to avoid a 2nd order
                 self.order = self.sell()
@@ -5,9 +5,11 @@ import sys  # To find out the script name (in argv[0])
 # Import the backtrader platform
 import backtrader as bt
 from Strategy.zwpy_sta import *
-import matplotlib.pyplot as plt
-
-plt.rcParams["figure.figsize"] = (30, 18)
+from Strategy.analytics import EquityCurve, summary
+from Strategy.broker import SlimBroker
+from Strategy.data import FastYahooCSVData
+from Strategy.feedcache import CachedCSVData
+from Strategy.plot import plot_strategy
 
 
 if __name__ == "__main__":
@@ -34,8 +36,8 @@ if __name__ == "__main__":
     datapath = "./sample_data/600401_yahoo.csv"
 
     # =====for 600401_yahoo.csv=====
-    # Create a Data Feed
-    data = bt.feeds.YahooFinanceCSVData(
+    # Create a Data Feed (bulk loaded, newest first order is detected)
+    data = FastYahooCSVData(
         dataname=datapath,
         # Do not pass values before this date
         # fromdate=datetime.datetime(2000, 1, 1),
@@ -43,9 +45,21 @@ if __name__ == "__main__":
         # Do not pass values before this date
         # todate=datetime.datetime(2000, 12, 31),
         # Do not pass values after this date
-        reverse=True,
     )
 
+    # =====same data through backtrader's csv feed=====
+    # data = bt.feeds.YahooFinanceCSVData(
+    #     dataname=datapath,
+    #     fromdate=datetime.datetime(2015, 1, 1),
+    #     reverse=True,
+    # )
+
+    # =====same data through the binary cache (no reverse needed)=====
+    # data = CachedCSVData(
+    #     dataname=datapath,
+    #     fromdate=datetime.datetime(2015, 1, 1),
+    # )
+
     # =====for orcl-1995-2014.txt=====
     # data2 = bt.feeds.YahooFinanceCSVData(
     #     dataname=datapath,
@@ -61,6 +75,9 @@ if __name__ == "__main__":
     cerebro.adddata(data)
     # cerebro.adddata(data2)
 
+    # Long-only market orders only: the slim broker gives the same results
+    # cerebro.broker = SlimBroker()
+
     # Set our desired cash start
     cerebro.broker.setcash(10000)
 
@@ -72,17 +89,31 @@ if __name__ == "__main__":
     # Set the commission
     cerebro.broker.setcommission(commission=0)  # .1425 / 100)
 
+    # Record the equity curve for the statistics (arrays filled per bar)
+    cerebro.addanalyzer(EquityCurve, _name="curve")
+
     # Print out the starting conditions
     print("Starting Portfolio Value: %.2f" % cerebro.broker.getvalue())
 
     # Run over everything
-    cerebro.run()
+    strats = cerebro.run()
 
     # Print out the final result
     print("Final Portfolio Value: %.2f" % cerebro.broker.getvalue())
 
-    # Plot the result
-    cerebro.plot()
+    # Print out the statistics of the equity curve and the closed trades
+    curve = strats[0].analyzers.curve.get_analysis()
+    stats = summary(
+        curve.equity, curve.position, curve.close, strats[0].ledger.pnlcomm
+    )
+    for name, value in stats.items():
+        print("%-14s %.2f" % (name, value))
+
+    # Plot the result (headless: no display needed, lines decimated to the width)
+    plot_strategy("./result.png", strats[0], width=3000, height=1800)
 
-    # save the plot
-    plt.savefig("./result.png", bbox_inches="tight")
+    # Plot the result with backtrader's interactive plotter
+    # import matplotlib.pyplot as plt
+    # plt.rcParams["figure.figsize"] = (30, 18)
+    # cerebro.plot()
+    # plt.savefig("./result.png", bbox_inches="tight")
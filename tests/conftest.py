@@ -0,0 +1,68 @@
+"""Shared fixtures: the sample data files and a cerebro runner."""
+import collections
+import contextlib
+import os
+
+import backtrader as bt
+import pytest
+
+from Strategy.data import ArrayData, read_yahoo_csv
+
+SAMPLE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample_data"
+)
+
+Sample = collections.namedtuple("Sample", ["name", "path", "reverse", "data"])
+
+# name -> (file, stored newest first)
+SAMPLES = {
+    "orcl": ("orcl-1995-2014.txt", False),
+    "600401": ("600401_yahoo.csv", True),
+}
+
+
+@pytest.fixture(scope="session")
+def sample_dir():
+    """The sample_data directory."""
+    return SAMPLE_DIR
+
+
+@pytest.fixture(scope="session", params=sorted(SAMPLES))
+def sample(request):
+    """Each sample file, with its price arrays."""
+    name = request.param
+    filename, reverse = SAMPLES[name]
+    path = os.path.join(SAMPLE_DIR, filename)
+    return Sample(name, path, reverse, read_yahoo_csv(path, reverse=reverse))
+
+
+@pytest.fixture(scope="session")
+def samples():
+    """Every sample's price arrays, by name."""
+    return {
+        name: read_yahoo_csv(os.path.join(SAMPLE_DIR, filename), reverse=reverse)
+        for name, (filename, reverse) in SAMPLES.items()
+    }
+
+
+@pytest.fixture
+def run_cerebro():
+    """
+    Run a strategy in cerebro over price arrays, with the broker settings
+    of the other engines; returns (final value, strategy instance).
+    """
+
+    def run(strategy, data, commission=0.0, broker=None, **params):
+        cerebro = bt.Cerebro(stdstats=False)
+        if broker is not None:
+            cerebro.broker = broker
+        cerebro.addstrategy(strategy, **params)
+        cerebro.adddata(ArrayData(ohlcv=data))
+        cerebro.broker.setcash(10000.0)
+        cerebro.addsizer(bt.sizers.PercentSizerInt, percents=90)
+        cerebro.broker.setcommission(commission=commission)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            strat = cerebro.run()[0]
+        return cerebro.broker.getvalue(), strat
+
+    return run
@@ -0,0 +1,70 @@
+"""analytics.py: statistics of one curve and of a batch, `EquityCurve`."""
+import math
+
+import backtrader as bt
+import numpy as np
+import pytest
+
+from Strategy import analytics, sweep, zwpy_sta
+from Strategy.data import ArrayData
+from Strategy.vectorized import run_vectorized
+
+
+def test_hand_computed():
+    equity = np.array([100.0, 110.0, 99.0, 121.0, 110.0])
+    assert np.allclose(analytics.returns(equity), [0.1, -0.1, 2.0 / 9, -1.0 / 11])
+
+    drawdown, bars = analytics.max_drawdown(equity)
+    assert drawdown == pytest.approx(10.0)
+    assert bars == 1  # 110 -> 99 -> new peak; 121 -> 110 to the end
+    assert drawdown == pytest.approx(sweep.max_drawdown(equity))
+
+    assert analytics.cagr(equity, periods=4) == pytest.approx(10.0)
+    assert analytics.exposure([0, 5, 5, 0]) == 50.0
+    assert analytics.win_rate([1.0, -2.0, 3.0, np.nan]) == pytest.approx(200.0 / 3)
+    assert math.isnan(analytics.win_rate([]))
+
+    # 10 shares in at the close of 11, out at 12: 230 traded in 1 year
+    turnover = analytics.turnover([0, 10, 0], [10.0, 11.0, 12.0], [100.0] * 3, 2)
+    assert turnover == pytest.approx(2.3)
+
+
+def test_flat_curve():
+    flat = np.full(10, 100.0)
+    assert math.isnan(analytics.sharpe(flat))
+    assert math.isnan(analytics.sortino(flat))
+    assert analytics.max_drawdown(flat) == (0.0, 0)
+
+
+def test_batch_same_as_rows(samples):
+    data = samples["orcl"]
+    runs = [
+        run_vectorized(zwpy_sta.SmaStrategy, data, maperiod=period)
+        for period in (10, 15, 30)
+    ]
+    equity = np.stack([r.equity for r in runs])
+    position = np.stack([r.position for r in runs])
+    batch = analytics.summary(equity, position, data.close)
+    for k, run in enumerate(runs):
+        one = analytics.summary(run.equity, run.position, data.close)
+        for name, value in one.items():
+            assert batch[name][k] == pytest.approx(value, rel=1e-12), name
+
+
+@pytest.mark.parametrize("exactbars", [False, 1])
+def test_equity_curve(samples, exactbars):
+    data = samples["orcl"]
+    cerebro = bt.Cerebro(stdstats=False, exactbars=exactbars)
+    cerebro.addstrategy(zwpy_sta.SmaStrategy)
+    cerebro.adddata(ArrayData(ohlcv=data))
+    cerebro.broker.setcash(10000.0)
+    cerebro.addsizer(bt.sizers.PercentSizerInt, percents=90)
+    cerebro.addanalyzer(analytics.EquityCurve, _name="curve")
+    curve = cerebro.run()[0].analyzers.curve.get_analysis()
+
+    result = run_vectorized(zwpy_sta.SmaStrategy, data)
+    # the analyzer starts at the strategy's first next()
+    skip = len(data.close) - len(curve.equity)
+    assert np.allclose(curve.equity, result.equity[skip:], rtol=1e-12)
+    assert np.array_equal(curve.position, result.position[skip:])
+    assert np.array_equal(curve.close, data.close[skip:])
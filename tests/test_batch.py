@@ -0,0 +1,39 @@
+"""`batch`: resumes only a results file made with the same settings."""
+import os
+import shutil
+
+import pytest
+
+from Strategy import zwpy_sta
+from Strategy.batch import batch, read_results
+
+
+@pytest.fixture
+def symbol_dir(sample_dir, tmp_path):
+    directory = tmp_path / "symbols"
+    directory.mkdir()
+    shutil.copy(os.path.join(sample_dir, "orcl-1995-2014.txt"), directory / "orcl.txt")
+    return str(directory)
+
+
+def test_resume_refuses_other_settings(symbol_dir, tmp_path):
+    output = str(tmp_path / "results.csv")
+    cachedir = str(tmp_path / "cache")
+    run = dict(params=dict(period=10), processes=1, cachedir=cachedir)
+
+    counts = batch(zwpy_sta.RsiStrategy, symbol_dir, output, **run)
+    assert counts == dict(done=1, skipped=0, errors=0)
+    assert read_results(output)["orcl"]["status"] == "ok"
+    counts = batch(zwpy_sta.RsiStrategy, symbol_dir, output, **run)
+    assert counts == dict(done=0, skipped=1, errors=0)
+
+    with pytest.raises(ValueError, match="period"):
+        batch(zwpy_sta.RsiStrategy, symbol_dir, output, processes=1)
+    with pytest.raises(ValueError, match="engine='vectorized' \\(asked 'slim'\\)"):
+        batch(zwpy_sta.RsiStrategy, symbol_dir, output, engine="slim", **run)
+    with pytest.raises(ValueError, match="adjclose"):
+        batch(zwpy_sta.RsiStrategy, symbol_dir, output, adjclose=False, **run)
+    with pytest.raises(ValueError, match="commission"):
+        batch(zwpy_sta.RsiStrategy, symbol_dir, output, commission=0.001, **run)
+    with pytest.raises(ValueError, match="strategy"):
+        batch(zwpy_sta.SmaStrategy, symbol_dir, output, processes=1)
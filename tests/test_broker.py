@@ -0,0 +1,25 @@
+"""`SlimBroker` gives the same runs as backtrader's `BackBroker`."""
+import numpy as np
+import pytest
+
+from Strategy import zwpy_sta
+from Strategy.broker import SlimBroker
+
+STRATEGIES = ["Tim0Strategy", "SmaStrategy", "MacdV2Strategy", "KdjV2Strategy"]
+
+
+@pytest.mark.parametrize("commission", [0.0, 0.001425])
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_same_as_backbroker(sample, run_cerebro, name, commission):
+    strategy = getattr(zwpy_sta, name)
+    value, strat = run_cerebro(strategy, sample.data, commission=commission)
+    slim_value, slim = run_cerebro(
+        strategy, sample.data, commission=commission, broker=SlimBroker()
+    )
+
+    assert slim_value == value
+    assert slim.broker.getcash() == strat.broker.getcash()
+    assert slim.position.size == strat.position.size
+    ledger, slim_ledger = strat.ledger.to_numpy(), slim.ledger.to_numpy()
+    for name in ledger:
+        assert np.array_equal(slim_ledger[name], ledger[name]), name
@@ -0,0 +1,70 @@
+"""`load_yahoo_csv`: the bulk loader gives `read_yahoo_csv`'s arrays."""
+import datetime
+
+import numpy as np
+import pytest
+
+from Strategy.data import _round, load_yahoo_csv, read_yahoo_csv
+
+HEADER = "Date,Open,High,Low,Close,Adj Close,Volume\n"
+
+
+def assert_same(a, b):
+    for name in a._fields:
+        column, expected = getattr(a, name), getattr(b, name)
+        assert column.dtype == expected.dtype, name
+        assert np.array_equal(column, expected), name
+
+
+@pytest.mark.parametrize("adjclose", [True, False])
+def test_same_as_read(sample, adjclose):
+    expected = read_yahoo_csv(sample.path, reverse=sample.reverse, adjclose=adjclose)
+    # the order is detected, no `reverse`
+    assert_same(load_yahoo_csv(sample.path, adjclose=adjclose), expected)
+
+
+def test_date_range(sample):
+    fromdate, todate = datetime.date(2000, 1, 1), datetime.date(2005, 12, 31)
+    expected = read_yahoo_csv(sample.path, fromdate, todate, reverse=sample.reverse)
+    assert len(expected.date)
+    assert_same(load_yahoo_csv(sample.path, fromdate, todate), expected)
+
+
+def test_null_rows_and_empty_file(tmp_path):
+    path = tmp_path / "null.csv"
+    path.write_text(
+        HEADER
+        + "2001-01-03,10.0,11.0,9.5,10.5,5.25,1000\n"
+        + "2001-01-02,null,null,null,null,null,null\n"
+        + "2001-01-01,10.1,10.2,9.9,10.0,5.0,2000\n"
+    )
+    data = load_yahoo_csv(str(path))
+    assert_same(data, read_yahoo_csv(str(path), reverse=True))
+    assert len(data.date) == 2
+
+    empty = tmp_path / "empty.csv"
+    empty.write_text("")
+    assert len(load_yahoo_csv(str(empty)).date) == 0
+
+
+def test_round_ties():
+    # np.round rounds these ties the other way from Python's round
+    values = np.array([63.6965, 1.6535, 72.9505, 81.5855, 0.2745, 1.25, 2.5])
+    assert np.round(values, 3).tolist() != [round(x, 3) for x in values.tolist()]
+    assert _round(values, 3).tolist() == [round(x, 3) for x in values.tolist()]
+
+    rng = np.random.default_rng(0)
+    values = np.round(rng.uniform(0, 100, 10000), 5) + 0.000005
+    assert _round(values, 5).tolist() == [round(x, 5) for x in values.tolist()]
+
+
+def test_round_ties_in_rows(tmp_path):
+    # adjusted prices landing on ties, in the csv parser's rounding
+    path = tmp_path / "ties.csv"
+    path.write_text(
+        HEADER
+        + "2001-01-01,2.0,2.5,1.5,2.0,1.0,1000\n"
+        + "2001-01-02,1.6535,1.6535,1.6535,1.6535,1.6535,1001\n"
+        + "2001-01-03,0.549,0.549,0.549,0.549,0.2745,1002\n"
+    )
+    assert_same(load_yahoo_csv(str(path)), read_yahoo_csv(str(path)))
@@ -0,0 +1,45 @@
+"""The binary feed cache returns the csv parser's arrays bit for bit."""
+import datetime
+import os
+
+import numpy as np
+import pytest
+
+from Strategy.data import read_yahoo_csv
+from Strategy.feedcache import cache_path, load_cached
+
+
+def assert_same(a, b):
+    for name in a._fields:
+        column, expected = getattr(a, name), getattr(b, name)
+        assert column.dtype == expected.dtype, name
+        assert np.array_equal(column, expected), name
+
+
+@pytest.mark.parametrize("adjclose", [True, False])
+def test_same_as_csv(sample, tmp_path, adjclose):
+    expected = read_yahoo_csv(sample.path, reverse=sample.reverse, adjclose=adjclose)
+    built = load_cached(sample.path, str(tmp_path), adjclose=adjclose)
+    assert os.path.exists(cache_path(sample.path, str(tmp_path), adjclose))
+    assert_same(built, expected)
+    # the second load maps the cache file written by the first one
+    assert_same(load_cached(sample.path, str(tmp_path), adjclose=adjclose), expected)
+
+
+def test_date_range(sample, tmp_path):
+    fromdate, todate = datetime.date(2000, 1, 1), datetime.date(2005, 12, 31)
+    expected = read_yahoo_csv(sample.path, fromdate, todate, sample.reverse)
+    assert_same(load_cached(sample.path, str(tmp_path), fromdate, todate), expected)
+
+
+def test_rebuilt_when_source_changes(tmp_path, sample_dir, samples):
+    path = tmp_path / "orcl.csv"
+    with open(os.path.join(sample_dir, "orcl-1995-2014.txt")) as f:
+        lines = f.readlines()
+    path.write_text("".join(lines[:-100]))
+    cachedir = str(tmp_path / "cache")
+    assert len(load_cached(str(path), cachedir).date) == len(lines) - 101
+
+    path.write_text("".join(lines))
+    os.utime(str(path), (1, 1))  # a new mtime, whatever the clock resolution
+    assert_same(load_cached(str(path), cachedir), samples["orcl"])
@@ -0,0 +1,83 @@
+"""`IncrementalBacktest`: same as a full run, across checkpoints."""
+import os
+
+import pytest
+
+from Strategy import zwpy_sta
+from Strategy.data import OHLCV
+from Strategy.incremental import IncrementalBacktest, resume
+from Strategy.vectorized import run_vectorized
+
+STRATEGIES = ["SmaStrategy", "TurStrategy", "MacdV1Strategy", "RsiStrategy"]
+
+
+def head(data, bars):
+    return OHLCV(*(column[:bars] for column in data))
+
+
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_same_as_vectorized(sample, name):
+    strategy = getattr(zwpy_sta, name)
+    run = IncrementalBacktest(strategy, commission=0.001)
+    run.update(sample.data)
+    result = run_vectorized(strategy, sample.data, commission=0.001)
+    assert run.trades == result.trades
+    assert run.value == pytest.approx(result.value, rel=1e-12)
+
+
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_checkpoint_round_trip(sample, tmp_path, name):
+    strategy = getattr(zwpy_sta, name)
+    full = IncrementalBacktest(strategy, commission=0.001)
+    full.update(sample.data)
+
+    path = str(tmp_path / "run.ckpt")
+    bars = len(sample.data.date)
+    run = IncrementalBacktest(strategy, commission=0.001)
+    for cut in (30, bars // 3, bars - 1, bars):
+        run.update(head(sample.data, cut))
+        run.save(path)
+        run = IncrementalBacktest.load(path)
+    assert run.bars == full.bars
+    assert run.trades == full.trades
+    assert run.value == full.value
+    assert run.order == full.order
+
+
+def test_resume_refuses_other_settings(samples, tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    source = str(tmp_path / "orcl.csv")
+    run = resume(path, zwpy_sta.RsiStrategy, source=source, period=10)
+    run.update(head(samples["orcl"], 100))
+    run.save(path)
+
+    resumed = resume(path, zwpy_sta.RsiStrategy, source=source, period=10)
+    assert resumed.bars == 100
+    with pytest.raises(ValueError, match="period=10 \\(asked 14\\)"):
+        resume(path, zwpy_sta.RsiStrategy, source=source)
+    with pytest.raises(ValueError, match="RsiStrategy \\(asked SmaStrategy\\)"):
+        resume(path, zwpy_sta.SmaStrategy, source=source)
+    with pytest.raises(ValueError, match="commission"):
+        resume(path, zwpy_sta.RsiStrategy, commission=0.01, source=source, period=10)
+    with pytest.raises(ValueError, match="data"):
+        resume(path, zwpy_sta.RsiStrategy, source=source + ".2", period=10)
+    # no source to check: a live stream
+    assert resume(path, zwpy_sta.RsiStrategy, period=10).source == os.path.abspath(
+        source
+    )
+
+
+def test_update_refuses_rewritten_history(samples):
+    data = samples["orcl"]
+    run = IncrementalBacktest(zwpy_sta.SmaStrategy)
+    run.update(head(data, 200))
+
+    # the same bars again, then new ones: resumes
+    run.update(head(data, 210))
+    assert run.bars == 210
+
+    # back-adjusted again after a dividend: the seen closes all move
+    adjusted = data._replace(close=data.close * 0.99)
+    with pytest.raises(ValueError, match="changed since the checkpoint"):
+        run.update(adjusted)
+    assert run.bars == 210
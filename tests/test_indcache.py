@@ -0,0 +1,61 @@
+"""`IndicatorCache`: keys by input values and params, LRU eviction."""
+import numpy as np
+import pytest
+
+from Strategy import indicators, zwpy_sta
+from Strategy.indcache import IndicatorCache, _SharedIndicator
+
+
+def constant(value, n=100):
+    # 100 float64: 800 bytes
+    return lambda: np.full(n, value, dtype=np.float64)
+
+
+def test_lru_eviction():
+    cache = IndicatorCache(budget=2000)
+    cache.get("a", constant(1.0))
+    cache.get("b", constant(2.0))
+    cache.get("a", constant(-1.0))  # hit: "a" is now the most recent
+    cache.get("c", constant(3.0))  # over budget: evicts "b"
+    assert len(cache) == 2 and cache.nbytes == 1600
+    assert cache.get("a", constant(-1.0))[0] == 1.0
+    assert cache.get("b", constant(-2.0))[0] == -2.0  # recomputed
+    assert (cache.hits, cache.misses) == (2, 4)
+
+    # larger than the whole budget: returned, not cached
+    big = cache.get("big", constant(4.0, n=1000))
+    assert len(big) == 1000 and len(cache) == 2
+
+
+def test_arrays_are_read_only():
+    cache = IndicatorCache()
+    values = cache.get("a", constant(1.0))
+    with pytest.raises(ValueError):
+        values[0] = 2.0
+
+
+def test_keys(samples):
+    cache = IndicatorCache()
+    close = samples["orcl"].close
+    first = cache.cached(indicators.sma, close, period=10)
+    # same values in another array: hit
+    assert cache.cached(indicators.sma, close.copy(), period=10) is first
+    assert cache.hits == 1
+
+    cache.cached(indicators.sma, close, period=11)
+    cache.cached(indicators.ema, close, period=10)
+    cache.cached(indicators.sma, close[1:], period=10)
+    changed = close.copy()
+    changed[-1] += 0.01
+    cache.cached(indicators.sma, changed, period=10)
+    assert (cache.hits, cache.misses) == (1, 5)
+
+
+@pytest.mark.parametrize("name", ["SmaStrategy", "MacdV1Strategy", "RsiStrategy"])
+def test_shared_indicators_same_run(samples, run_cerebro, name):
+    strategy = getattr(zwpy_sta, name)
+    data = samples["orcl"]
+    value, _ = run_cerebro(strategy, data, sharedind=False)
+    shared, strat = run_cerebro(strategy, data, sharedind=True)
+    assert any(isinstance(i, _SharedIndicator) for i in strat.getindicators())
+    assert shared == pytest.approx(value, rel=1e-12)
@@ -0,0 +1,95 @@
+"""jobqueue.py: leases expire, jobs are retried up to `max_attempts`."""
+import os
+import types
+
+import pytest
+
+from Strategy import jobqueue, zwpy_sta
+from Strategy.feedcache import load_cached
+from Strategy.jobqueue import JobQueue, submit_sweep, work
+from Strategy.vectorized import closed_trades, run_vectorized
+
+PAYLOAD = dict(symbol="orcl", params=dict(period=10))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A settable `time.time()` for the queue."""
+    now = [1000.0]
+    fake = types.SimpleNamespace(time=lambda: now[0], sleep=lambda s: None)
+    monkeypatch.setattr(jobqueue, "time", fake)
+    return now
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "queue.db")
+
+
+def test_expired_lease_goes_to_another_worker(path, clock):
+    queue = JobQueue(path, lease=60.0)
+    queue.submit([PAYLOAD])
+    job = queue.lease("a")
+    assert (job.attempt, job.payload) == (1, PAYLOAD)
+    assert queue.lease("b") is None
+
+    clock[0] += 30
+    assert queue.heartbeat(job.id, "a")  # lease until 1090
+    clock[0] += 50
+    assert queue.lease("b") is None
+    clock[0] += 20
+    retry = queue.lease("b")
+    assert (retry.id, retry.attempt) == (job.id, 2)
+
+    # "a" lost its lease: its result is dropped
+    assert not queue.heartbeat(job.id, "a")
+    assert not queue.complete(job.id, "a", dict(value=1.0))
+    assert queue.complete(job.id, "b", dict(value=2.0))
+    [row] = queue.results()
+    assert (row["status"], row["value"], row["attempts"]) == ("done", 2.0, 2)
+    assert queue.unfinished() == 0
+
+
+def test_expired_lease_fails_after_max_attempts(path, clock):
+    queue = JobQueue(path, lease=60.0, max_attempts=2)
+    queue.submit([PAYLOAD])
+    for attempt in (1, 2):
+        assert queue.lease("w").attempt == attempt
+        clock[0] += 61
+    assert queue.lease("w") is None
+    [row] = queue.results()
+    assert row["status"] == "failed"
+    assert row["error"] == "lease expired 2 times"
+
+
+def test_failed_job_retried(path, clock):
+    queue = JobQueue(path, max_attempts=3)
+    queue.submit([PAYLOAD])
+    for attempt in (1, 2, 3):
+        job = queue.lease("w")
+        assert job.attempt == attempt
+        assert queue.fail(job.id, "w", "boom %d" % attempt)
+    assert queue.lease("w") is None
+    assert queue.counts() == dict(failed=1)
+    [row] = queue.results()
+    assert (row["error"], row["attempts"]) == ("boom 3", 3)
+
+
+def test_work(path, sample_dir, tmp_path):
+    datapath = os.path.join(sample_dir, "orcl-1995-2014.txt")
+    queue = JobQueue(path)
+    space = dict(period=[10, 14])
+    count = submit_sweep(
+        queue, "RsiStrategy", [("orcl", datapath)], space, cachedir=str(tmp_path)
+    )
+    assert count == 2
+    assert work(path, "w", poll=0.0) == 2
+
+    rows = queue.results()
+    assert [r["status"] for r in rows] == ["done", "done"]
+    data = load_cached(datapath, str(tmp_path))
+    for row, period in zip(rows, space["period"]):
+        result = run_vectorized(zwpy_sta.RsiStrategy, data, period=period)
+        assert row["bars"] == len(data.date)
+        assert row["value"] == result.value
+        assert row["trades"] == closed_trades(result.trades)
@@ -0,0 +1,61 @@
+"""`TradeLedger`: filled from the notify hooks, exported without copies."""
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from Strategy import zwpy_sta
+from Strategy.ledger import TradeLedger
+from Strategy.vectorized import run_vectorized
+
+
+def order(buy, price, size):
+    return SimpleNamespace(
+        isbuy=lambda: buy, executed=SimpleNamespace(price=price, size=size)
+    )
+
+
+def trade(pnl, commission):
+    return SimpleNamespace(pnl=pnl, pnlcomm=pnl - commission, commission=commission)
+
+
+def test_hooks():
+    ledger = TradeLedger()
+    ledger.order_completed(3, order(True, 10.0, 5))
+    ledger.order_completed(7, order(False, 12.0, -5))
+    ledger.trade_closed(trade(10.0, 0.5))
+    assert len(ledger) == 1
+    assert ledger.entry_bar[0] == 3 and ledger.exit_bar[0] == 7
+    assert ledger.pnlcomm[0] == 9.5
+
+
+def test_trade_closed_without_entry_is_skipped():
+    ledger = TradeLedger()
+    ledger.trade_closed(trade(1.0, 0.0))
+    # entry seen, but not its exit
+    ledger.order_completed(3, order(True, 10.0, 5))
+    ledger.trade_closed(trade(1.0, 0.0))
+    assert len(ledger) == 0
+
+    # the next trade is recorded as usual
+    ledger.order_completed(8, order(True, 11.0, 4))
+    ledger.order_completed(9, order(False, 12.0, -4))
+    ledger.trade_closed(trade(4.0, 0.0))
+    assert list(ledger.entry_bar) == [8]
+
+
+def test_numpy_round_trip(samples):
+    trades = run_vectorized(zwpy_sta.SmaStrategy, samples["orcl"]).trades
+    ledger = TradeLedger()
+    ledger.extend(trades)
+    assert len(ledger) == len(trades)
+    if trades[-1].exit_bar is None:
+        assert ledger.exit_bar[-1] == -1 and math.isnan(ledger.pnl[-1])
+
+    columns = ledger.to_numpy()
+    copy = TradeLedger.from_numpy(columns)
+    for name, column in copy.to_numpy().items():
+        assert np.array_equal(column, columns[name], equal_nan=True)
+    with pytest.raises(BufferError):
+        ledger.append(0, 1.0, 1, 1.0, 1, 0.0, 0.0, 0.0)
@@ -0,0 +1,66 @@
+"""Checkpoint hand-off from `Strategy.incremental` to `Strategy.live`."""
+import asyncio
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from Strategy import live, zwpy_sta
+from Strategy.feedcache import load_cached
+from Strategy.incremental import IncrementalBacktest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _lines(lines):
+    for line in lines:
+        yield line
+
+
+@pytest.fixture
+def orcl_path(sample_dir):
+    return os.path.join(sample_dir, "orcl-1995-2014.txt")
+
+
+@pytest.fixture
+def half_checkpoint(tmp_path, orcl_path):
+    """A checkpoint of the incremental CLI over the first half of the sample."""
+    with open(orcl_path) as f:
+        lines = f.readlines()
+    half = tmp_path / "half.csv"
+    half.write_text("".join(lines[: len(lines) // 2]))
+    checkpoint = str(tmp_path / "rsi.ckpt")
+    # as a script, so the signal classes are pickled from its __main__
+    subprocess.check_call(
+        [sys.executable, "-m", "Strategy.incremental", "RsiStrategy", str(half)]
+        + ["--checkpoint", checkpoint],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    return checkpoint, lines[1:]
+
+
+def test_incremental_checkpoint_resumes_live(half_checkpoint, orcl_path):
+    checkpoint, lines = half_checkpoint
+    run = IncrementalBacktest.load(checkpoint)
+    out = io.StringIO()
+    asyncio.run(live.run_live(run, _lines(lines), out))
+
+    full = IncrementalBacktest(zwpy_sta.RsiStrategy)
+    full.update(load_cached(orcl_path))
+    assert run.bars == full.bars
+    assert run.value == full.value
+    assert run.trades == full.trades
+
+
+def test_live_refuses_other_params(half_checkpoint, capsys):
+    checkpoint, _ = half_checkpoint
+    argv = ["run", "RsiStrategy", "--pipe", "unused", "--checkpoint", checkpoint]
+    with pytest.raises(SystemExit):
+        live.main(argv + ["--param", "period=10"])
+    assert "period=14 (asked 10)" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        live.main(argv + ["--cash", "500"])
+    assert "cash=10000.0 (asked 500.0)" in capsys.readouterr().err
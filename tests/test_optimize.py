@@ -0,0 +1,30 @@
+"""optimize.py: default bounds within `LIMITS`, reproducible searches."""
+from Strategy import zwpy_sta
+from Strategy.optimize import LIMITS, default_bounds, optimize
+
+
+def test_default_bounds_clamped():
+    defaults = dict(zwpy_sta.RsiStrategy.params._getitems())
+    bounds = default_bounds(zwpy_sta.RsiStrategy)
+    # RSI thresholds stay on its 0..100 scale
+    assert defaults["kbuy"] * 2 > 100
+    assert bounds["kbuy"] == (defaults["kbuy"] // 2, 100)
+    for name, (low, high) in LIMITS.items():
+        assert low <= bounds[name][0] < bounds[name][1] <= high
+    period = defaults["period"]
+    assert bounds["period"] == (period // 2, period * 2)
+    # BaseStrategyFrame params are not searched
+    assert "printlog" not in bounds and "sharedind" not in bounds
+
+
+def test_search_within_bounds(samples):
+    bounds = default_bounds(zwpy_sta.RsiStrategy)
+    run = dict(n=12, seed=3, processes=1, batch_size=4, n_init=6)
+    rows = optimize(zwpy_sta.RsiStrategy, samples["orcl"], **run)
+    assert len(rows) == 12
+    for row in rows:
+        for name, (low, high) in bounds.items():
+            assert low <= row[name] <= high
+    # same seed, same candidates
+    again = optimize(zwpy_sta.RsiStrategy, samples["orcl"], **run)
+    assert [r["score"] for r in again] == [r["score"] for r in rows]
@@ -0,0 +1,56 @@
+"""plot.py: decimation keeps the extremes, figures render headless."""
+import numpy as np
+import pytest
+
+from Strategy import zwpy_sta
+from Strategy import indicators
+from Strategy.plot import lttb, minmax, plot_vectorized
+from Strategy.vectorized import run_vectorized
+
+PNG = b"\x89PNG"
+
+
+@pytest.fixture
+def walk():
+    rng = np.random.default_rng(1)
+    y = np.cumsum(rng.standard_normal(10000))
+    return np.arange(len(y)), y
+
+
+def test_minmax_keeps_extremes(walk):
+    x, y = walk
+    dx, dy = minmax(x, y, 200)
+    assert len(dx) <= 200
+    assert np.all(np.diff(dx) > 0)
+    assert np.array_equal(dy, y[dx])
+    assert dy.min() == y.min() and dy.max() == y.max()
+    # short enough already: kept whole
+    assert len(minmax(x[:100], y[:100], 200)[0]) == 100
+
+
+def test_lttb_keeps_ends(walk):
+    x, y = walk
+    dx, dy = lttb(x, y, 300)
+    assert len(dx) == 300
+    assert dx[0] == 0 and dx[-1] == len(x) - 1
+    assert np.all(np.diff(dx) > 0)
+    assert np.array_equal(dy, y[dx])
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+def test_plot_vectorized(samples, tmp_path, method):
+    pytest.importorskip("matplotlib")
+    data = samples["orcl"]
+    result = run_vectorized(zwpy_sta.SmaStrategy, data)
+    path = tmp_path / "run.png"
+    plot_vectorized(
+        str(path),
+        data,
+        result,
+        lines=dict(sma=indicators.sma(data.close, 15)),
+        subplots=dict(volume=data.volume),
+        width=400,
+        height=300,
+        method=method,
+    )
+    assert path.read_bytes()[:4] == PNG
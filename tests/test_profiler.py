@@ -0,0 +1,54 @@
+"""`Profile`: per phase calls and time, nested calls counted once."""
+import pytest
+
+from Strategy import zwpy_sta
+from Strategy.profiler import Profile
+
+
+def test_timed_counts_calls():
+    profile = Profile()
+    inner = profile.timed("log", lambda x: x * 2)
+    # same phase nested in itself: one call
+    outer = profile.timed("log", lambda x: inner(x) + 1)
+    step = profile.timed("next", lambda x: outer(x), samples=True)
+
+    assert [step(i) for i in range(5)] == [1, 3, 5, 7, 9]
+    assert profile.calls == dict(log=5, next=5)
+    assert profile.total["next"] >= profile.total["log"] > 0
+    assert len(profile.samples["next"]) == 5
+    assert "log" not in profile.samples
+
+    p50, p99 = profile.percentiles("next")
+    assert 0 < p50 <= p99
+    assert sum(n for _, n in profile.histogram("next")) == 5
+    report = profile.report()
+    assert "next" in report and "p99" in report
+
+
+def test_exception_still_counted():
+    profile = Profile()
+    fail = profile.timed("next", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        fail()
+    assert profile.calls["next"] == 1
+    # the depth is back to 0: the next call is timed again
+    with pytest.raises(ZeroDivisionError):
+        fail()
+    assert profile.calls["next"] == 2
+
+
+def test_empty_phase():
+    profile = Profile()
+    profile.timed("next", lambda: None, samples=True)
+    assert profile.percentiles("next") == [0.0, 0.0]
+    assert profile.histogram("next") == []
+
+
+def test_strategy_profile(samples, run_cerebro):
+    data = samples["orcl"]
+    value, strat = run_cerebro(zwpy_sta.SmaStrategy, data)
+    profiled, strat = run_cerebro(zwpy_sta.SmaStrategy, data, profile=True)
+    assert profiled == value
+    calls = strat.profile.calls
+    assert calls["next"] == len(data.close) - strat._minperiod + 1
+    assert calls["indicators"] > 0
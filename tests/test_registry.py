@@ -0,0 +1,57 @@
+"""registry.py / cli.py: strategies read from the source, the command line."""
+import subprocess
+import sys
+
+import pytest
+
+from Strategy import cli, registry, zwpy_sta
+
+
+def test_same_as_imported():
+    specs = registry.strategies()
+    assert "RsiStrategy" in specs and "BaseStrategyFrame" not in specs
+    for name, spec in specs.items():
+        strategy = getattr(zwpy_sta, name)
+        assert spec.params == tuple(strategy.params._getitems()), name
+        assert registry.load(name) is strategy
+
+
+def test_get_suggests_names():
+    with pytest.raises(KeyError, match="did you mean RsiStrategy"):
+        registry.get("RsiStrategi")
+
+
+def test_parse_params():
+    params = registry.parse_params(
+        "RsiStrategy", ["period=10", "printlog=true", "kbuy=75"]
+    )
+    assert params == dict(period=10, printlog=True, kbuy=75)
+    with pytest.raises(TypeError, match="has no param 'span'"):
+        registry.parse_params("RsiStrategy", ["span=3"])
+    with pytest.raises(ValueError, match="not a boolean"):
+        registry.parse_params("RsiStrategy", ["printlog=maybe"])
+    with pytest.raises(ValueError, match="not a Python literal"):
+        registry.parse_params("RsiStrategy", ["period=ten"])
+
+
+def test_list_does_not_import_backtrader():
+    code = (
+        "import sys; from Strategy import cli; cli.main(['list']);"
+        "assert 'backtrader' not in sys.modules"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert "RsiStrategy" in out and "printlog" not in out
+
+
+def test_run(sample, capsys):
+    cli.main(["run", "RsiStrategy", sample.path, "--engine", "vectorized", "--stats"])
+    out = capsys.readouterr().out
+    assert out.startswith("Final Portfolio Value: ")
+    assert "sharpe" in out
+
+
+def test_bad_param_is_a_usage_error(sample):
+    with pytest.raises(SystemExit):
+        cli.main(["run", "RsiStrategy", sample.path, "--param", "span=3"])
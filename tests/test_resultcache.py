@@ -0,0 +1,111 @@
+"""resultcache.py: hits for the same run, misses when anything it hashes changes."""
+import inspect
+import os
+
+import numpy as np
+import pytest
+
+from Strategy import resultcache, zwpy_sta
+
+
+@pytest.fixture
+def cachedir(tmp_path):
+    yield str(tmp_path / "cache")
+    resultcache._source_digest.cache_clear()
+
+
+@pytest.mark.parametrize("engine", ["vectorized", "cerebro"])
+def test_hit_same_as_run(samples, cachedir, engine):
+    data = samples["orcl"]
+    run = resultcache.run_cached(zwpy_sta.RsiStrategy, data, cachedir, engine)
+    assert not run.hit
+    hit = resultcache.run_cached(zwpy_sta.RsiStrategy, data, cachedir, engine)
+    assert hit.hit
+    assert hit.value == run.value
+    for name, column in hit.ledger.to_numpy().items():
+        assert np.array_equal(column, run.ledger.to_numpy()[name]), name
+    assert np.array_equal(hit.curve.equity, run.curve.equity)
+    # defaults filled in, params that do not change a result ignored
+    assert resultcache.run_cached(
+        zwpy_sta.RsiStrategy, data, cachedir, engine, period=14, printlog=False
+    ).hit
+
+
+def test_misses(samples, cachedir):
+    data = samples["orcl"]
+    run = dict(cachedir=cachedir, engine="vectorized")
+    resultcache.run_cached(zwpy_sta.RsiStrategy, data, **run)
+
+    changed = data.close.copy()
+    changed[-1] += 0.01
+    for strategy, prices, params in [
+        (zwpy_sta.RsiStrategy, data, dict(period=10)),
+        (zwpy_sta.RsiStrategy, data, dict(commission=0.001)),
+        (zwpy_sta.RsiStrategy, data._replace(close=changed), {}),
+        (zwpy_sta.SmaStrategy, data, {}),
+    ]:
+        assert not resultcache.run_cached(strategy, prices, **run, **params).hit
+    assert not resultcache.run_cached(
+        zwpy_sta.RsiStrategy, data, cachedir, "slim"
+    ).hit
+
+
+def test_miss_when_source_changes(samples, cachedir, monkeypatch):
+    data = samples["orcl"]
+    for strategy in (zwpy_sta.RsiStrategy, zwpy_sta.SmaStrategy):
+        resultcache.run_cached(strategy, data, cachedir, "vectorized")
+
+    getsource = inspect.getsource
+
+    def edited(obj):
+        source = getsource(obj)
+        return source + "# edited\n" if obj is zwpy_sta.RsiStrategy else source
+
+    monkeypatch.setattr(inspect, "getsource", edited)
+    resultcache._source_digest.cache_clear()
+    run = dict(cachedir=cachedir, engine="vectorized")
+    assert not resultcache.run_cached(zwpy_sta.RsiStrategy, data, **run).hit
+    # other strategies keep their entries
+    assert resultcache.run_cached(zwpy_sta.SmaStrategy, data, **run).hit
+
+
+def test_evict(samples, cachedir):
+    data = samples["orcl"]
+    run = dict(cachedir=cachedir, engine="vectorized")
+    sizes = {}
+    for used, period in enumerate((10, 12, 14)):
+        resultcache.run_cached(zwpy_sta.RsiStrategy, data, period=period, **run)
+        key = resultcache.result_key(
+            zwpy_sta.RsiStrategy, data, "vectorized", period=period
+        )
+        path = resultcache._path(cachedir, key)
+        os.utime(path, (1000 + used, 1000 + used))  # period=10 used first
+        sizes[period] = os.path.getsize(path)
+    # a hit counts as a use: period=10 becomes the most recent
+    assert resultcache.run_cached(zwpy_sta.RsiStrategy, data, period=10, **run).hit
+
+    removed, total = resultcache.evict(cachedir, max_bytes=sizes[10] + sizes[14])
+    assert (removed, total) == (1, sizes[10] + sizes[14])
+    assert not resultcache.run_cached(zwpy_sta.RsiStrategy, data, period=12, **run).hit
+    assert resultcache.run_cached(zwpy_sta.RsiStrategy, data, period=10, **run).hit
+
+    # every entry expired
+    assert resultcache.evict(cachedir, max_age=-1)[1] == 0
+
+
+def test_concurrent_evict(samples, cachedir, monkeypatch):
+    data = samples["orcl"]
+    for period in (10, 12):
+        resultcache.run_cached(
+            zwpy_sta.RsiStrategy, data, cachedir, "vectorized", period=period
+        )
+    remove = os.remove
+
+    def raced(path):
+        # another evict got there first
+        remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "remove", raced)
+    assert resultcache.evict(cachedir, max_bytes=0) == (0, 0)
+    assert resultcache.evict(cachedir) == (0, 0)
@@ -0,0 +1,46 @@
+"""`run_universe` over several symbols equals `run_vectorized` per symbol."""
+import numpy as np
+import pytest
+
+from Strategy.data import OHLCV
+from Strategy.universe import align, run_universe
+from Strategy.vectorized import SIGNALS, run_vectorized
+
+STRATEGIES = sorted(SIGNALS, key=lambda cls: cls.__name__)
+
+
+@pytest.fixture(scope="module")
+def feeds(samples):
+    """The samples, plus copies with missing bars (on other dates)."""
+    rng = np.random.default_rng(0)
+    feeds = sorted(samples.items())
+    for k, (name, data) in enumerate(list(feeds)):
+        keep = rng.random(len(data.date)) > 0.1
+        keep[: 50 * (k + 1)] = False
+        feeds.append((name + "-gaps", OHLCV(*(column[keep] for column in data))))
+    return feeds
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES, ids=lambda cls: cls.__name__)
+def test_same_as_per_symbol(feeds, strategy):
+    universe = align(feeds)
+    result = run_universe(strategy, universe, commission=0.001425)
+
+    for row, (name, data) in enumerate(feeds):
+        expected = run_vectorized(strategy, data, commission=0.001425)
+        bars = universe.mask[row]
+        assert result.value[row] == expected.value, name
+        assert result.cash[row] == expected.cash, name
+        assert np.array_equal(result.equity[row][bars], expected.equity), name
+        assert np.array_equal(result.position[row][bars], expected.position), name
+
+        # ledger bars index the universe dates, -1 for a trade still open
+        pos = np.searchsorted(universe.dates, data.date)
+        ledger = result.trades[row]
+        assert len(ledger) == len(expected.trades), name
+        assert list(ledger.entry_bar) == [pos[t.entry_bar] for t in expected.trades]
+        assert list(ledger.exit_bar) == [
+            -1 if t.exit_bar is None else pos[t.exit_bar] for t in expected.trades
+        ]
+        pnlcomm = [np.nan if t.exit_bar is None else t.pnlcomm for t in expected.trades]
+        assert np.array_equal(ledger.pnlcomm, pnlcomm, equal_nan=True), name
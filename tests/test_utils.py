@@ -0,0 +1,62 @@
+"""`VolumeWeightedAveragePrice` and the exact window sums behind it."""
+import math
+import random
+
+import backtrader as bt
+import numpy as np
+import pytest
+
+from Strategy.data import OHLCV, ArrayData
+from Strategy.utils import VolumeWeightedAveragePrice, WindowFsum
+
+
+class _Vwap(bt.Strategy):
+    def __init__(self):
+        self.vwap = VolumeWeightedAveragePrice(self.data, period=15)
+
+
+def _vwap(data, **kwargs):
+    cerebro = bt.Cerebro(stdstats=False, **kwargs)
+    cerebro.addstrategy(_Vwap)
+    cerebro.adddata(ArrayData(ohlcv=data))
+    strat = cerebro.run()[0]
+    return np.array(strat.vwap.lines[0].array)
+
+
+@pytest.fixture
+def gapped(samples):
+    """The orcl sample with a nan price, an inf volume and no volume for a while."""
+    data = OHLCV(*(np.array(column) for column in samples["orcl"]))
+    data.close[100] = np.nan
+    data.volume[300] = np.inf
+    data.volume[500:540] = 0.0
+    return data
+
+
+def test_next_same_as_once(gapped):
+    once = _vwap(gapped)
+    assert np.isnan(once[100:115]).all() and np.isnan(once[520:540]).all()
+    assert not np.isnan(once[560:]).any()
+    np.testing.assert_array_equal(_vwap(gapped, runonce=False), once)
+
+
+@pytest.mark.parametrize("period", [1, 3, 70])
+def test_window_fsum(period):
+    rng = random.Random(period)
+    values = [rng.uniform(-1, 1) * 10 ** rng.randint(-12, 12) for _ in range(500)]
+    values[40] = math.nan
+    values[200] = math.inf
+    values[300:310] = [1e308] * 10
+    window = WindowFsum(period)
+    for i, x in enumerate(values):
+        window.push(x)
+        if i < period - 1:
+            continue
+        try:
+            expected = math.fsum(values[i - period + 1 : i + 1])
+        except OverflowError:
+            with pytest.raises(OverflowError):
+                window.sum()
+            continue
+        total = window.sum()
+        assert total == expected or (math.isnan(total) and math.isnan(expected)), i
@@ -0,0 +1,32 @@
+"""`run_vectorized` against backtrader's cerebro on the sample data."""
+import pytest
+
+from Strategy import zwpy_sta
+from Strategy.vectorized import SIGNALS, closed_trades, run_vectorized
+
+STRATEGIES = sorted(SIGNALS, key=lambda cls: cls.__name__)
+
+
+@pytest.mark.parametrize("commission", [0.0, 0.001425])
+@pytest.mark.parametrize("strategy", STRATEGIES, ids=lambda cls: cls.__name__)
+def test_same_as_cerebro(sample, run_cerebro, strategy, commission):
+    value, strat = run_cerebro(strategy, sample.data, commission=commission)
+    result = run_vectorized(strategy, sample.data, commission=commission)
+
+    assert result.value == pytest.approx(value, rel=1e-12)
+    assert result.equity[-1] == pytest.approx(result.value, rel=1e-12)
+    ledger = strat.ledger.to_numpy()
+    closed = [t for t in result.trades if t.exit_bar is not None]
+    assert closed_trades(result.trades) == len(ledger["exit_bar"])
+    assert [t.entry_bar for t in closed] == ledger["entry_bar"].tolist()
+    assert [t.exit_bar for t in closed] == ledger["exit_bar"].tolist()
+    assert [t.size for t in closed] == ledger["size"].tolist()
+    for name in ("entry_price", "exit_price", "pnlcomm"):
+        expected = pytest.approx(ledger[name].tolist(), rel=1e-12, abs=1e-9)
+        assert [getattr(t, name) for t in closed] == expected
+
+
+def test_closed_trades_leaves_out_open_one(samples):
+    result = run_vectorized(zwpy_sta.Tim0Strategy, samples["orcl"])  # buys, holds
+    assert result.trades[-1].exit_bar is None
+    assert closed_trades(result.trades) == len(result.trades) - 1
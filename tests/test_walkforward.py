@@ -0,0 +1,52 @@
+"""`walk_forward`: stitched out-of-sample windows, each starting flat."""
+import numpy as np
+import pytest
+
+from Strategy import zwpy_sta
+from Strategy.vectorized import run_vectorized
+from Strategy.walkforward import _view, walk_forward, windows
+
+
+def test_windows_follow_each_other():
+    layout = windows(1000, 500, 200)
+    assert [(w.start, w.split, w.end) for w in layout] == [
+        (0, 500, 700),
+        (200, 700, 900),
+        (400, 900, 1000),
+    ]
+    assert all(w.start == 0 for w in windows(1000, 500, 200, anchored=True))
+    with pytest.raises(ValueError, match="overlap"):
+        windows(1000, 500, 200, step=100)
+
+
+def test_forced_exit_pays_commission(samples):
+    data = samples["orcl"]
+    commission = 0.001
+    combos = [dict(period=10), dict(period=14)]
+    result = walk_forward(
+        zwpy_sta.RsiStrategy, data, combos, 750, 250, processes=1, commission=commission
+    )
+    layout = windows(len(data.close), 750, 250)
+    assert len(np.unique(result.date)) == len(result.date)
+
+    # re-run each window from the value the last one left
+    value, exits = 10000.0, 0
+    for k, (w, row) in enumerate(zip(layout, result.windows)):
+        params = {name: row[name] for name in combos[0]}
+        run = run_vectorized(
+            zwpy_sta.RsiStrategy,
+            _view(data, w.start, w.end),
+            cash=value,
+            commission=commission,
+            startbar=w.split - w.start,
+            **params
+        )
+        end = run.equity[-1]
+        size = run.position[-1]
+        if size and k < len(layout) - 1:
+            end -= size * data.close[w.end - 1] * commission
+            exits += 1
+        assert result.equity[w.end - layout[0].split - 1] == pytest.approx(end)
+        value = end
+    assert exits
+    assert result.equity[-1] == pytest.approx(value)